@@ -0,0 +1,474 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtesting.vector_backtest import first_exit
+from features.breadth import compute_breadth, regime_status
+from features.engine import benchmark_arrays, compute_selection_arrays, compute_selection_frame
+from features.indicators import add_ema
+from features.market_regime import NIFTY_SYMBOL, as_benchmark
+from features.panel import Panel
+from ml.confidence import compute_confidence
+from ml.predict import FEATURE_NAMES, score_features
+from ranking.trade_plan import compute_trade_plan
+from utils.bars import working_frame
+from utils.yf_loader import load_bulk_daily_data
+
+
+# -------------------------
+# WORKER PROCESS STATE
+# -------------------------
+# Same pattern as ranking/executor.py: the NIFTY frame is sent once per
+# worker process instead of with every symbol. With a bar store
+# (utils/bar_store.py) each worker maps it once and tasks carry only the
+# symbol name.
+_WORKER_STATE = {}
+
+
+def _init_worker(nifty_df, store_dir=None):
+    _WORKER_STATE["nifty_df"] = nifty_df
+    if store_dir:
+        from utils.bar_store import BarStore
+        _WORKER_STATE["store"] = BarStore(store_dir)
+
+
+def _candidates_in_worker(symbol, df):
+    return symbol_candidates(symbol, df, _WORKER_STATE["nifty_df"])
+
+
+def _store_candidates_in_worker(symbol):
+    return store_candidates(symbol, _WORKER_STATE["store"], _WORKER_STATE["nifty_df"])
+
+
+# -------------------------
+# PER-SYMBOL CANDIDATES
+# -------------------------
+def symbol_candidates(symbol, df, nifty_df=None):
+    """
+    Every day on which prepare_symbol would have returned a candidate for
+    `symbol` (before the market-regime filter), one row per day.
+    """
+
+    if df is None or len(df) < 100:
+        return None
+
+    try:
+        selection = compute_selection_frame(df, nifty_df)
+    except Exception as e:
+        print(f"Error backtesting {symbol}: {type(e).__name__}: {e}")
+        return None
+
+    return _eligible_rows(symbol, pd.to_datetime(df["date"]).to_numpy(), selection)
+
+
+def store_candidates(symbol, store, nifty_df=None):
+    """
+    symbol_candidates reading the symbol's bars from an open BarStore
+    (views, not copies).
+    """
+
+    bars = store.bars(symbol)
+    if bars is None or len(bars["close"]) < 100:
+        return None
+
+    nifty_dates, nifty_close = benchmark_arrays(nifty_df)
+
+    try:
+        selection = pd.DataFrame(compute_selection_arrays(
+            bars["open"], bars["high"], bars["low"], bars["close"], bars["volume"], bars["date"],
+            nifty_dates=nifty_dates, nifty_close=nifty_close,
+        ))
+    except Exception as e:
+        print(f"Error backtesting {symbol}: {type(e).__name__}: {e}")
+        return None
+
+    return _eligible_rows(symbol, bars["date"], selection)
+
+
+def _eligible_rows(symbol, dates, selection):
+    selection.insert(0, "date", dates)
+    selection.insert(1, "symbol", symbol)
+
+    return selection[selection["eligible"]].drop(columns="eligible")
+
+
+def collect_candidates(frames, symbols, nifty_df=None, workers=0, store_dir=None):
+    """
+    Runs symbol_candidates for every symbol, on a process pool when
+    workers > 0. Rows come back in universe order either way.
+
+    With store_dir the bars are read from that bar store instead of
+    `frames` (which may then be None), and workers are sent symbol names
+    only.
+    """
+
+    # NIFTY dates converted once, not once per symbol
+    nifty_df = as_benchmark(nifty_df)
+
+    if store_dir:
+        from utils.bar_store import BarStore
+
+        store = BarStore(store_dir)
+        jobs = [symbol for symbol in symbols if symbol in store]
+
+        if workers and workers > 0:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(nifty_df, store_dir)) as pool:
+                results = list(pool.map(_store_candidates_in_worker, jobs, chunksize=4))
+        else:
+            results = [store_candidates(symbol, store, nifty_df) for symbol in jobs]
+
+        return _concat_candidates(results)
+
+    jobs = [(symbol, frames.get(symbol)) for symbol in symbols if frames.get(symbol) is not None]
+
+    if workers and workers > 0:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(nifty_df,)) as pool:
+            results = list(pool.map(_candidates_in_worker, *zip(*jobs), chunksize=4)) if jobs else []
+    else:
+        results = [symbol_candidates(symbol, df, nifty_df) for symbol, df in jobs]
+
+    return _concat_candidates(results)
+
+
+def _concat_candidates(results):
+    results = [r for r in results if r is not None and not r.empty]
+
+    if not results:
+        return pd.DataFrame()
+
+    return pd.concat(results, ignore_index=True)
+
+
+# -------------------------
+# DAILY SELECTION
+# -------------------------
+def market_regime_series(nifty_df, frames=None):
+    """
+    The rank_today regime for every day. With the universe's `frames`:
+    NIFTY trend and universe breadth together (features.breadth). Without:
+    BULLISH if NIFTY closes above its 50-day EMA, BEARISH otherwise,
+    NEUTRAL while fewer than 50 bars exist.
+    """
+
+    if frames:
+        breadth = compute_breadth(Panel.from_frames(frames), nifty_df)
+        return regime_status(breadth)
+
+    if nifty_df is None or nifty_df.empty:
+        return pd.Series(dtype=object)
+
+    df = add_ema(working_frame(nifty_df[["date", "close"]]), 50)
+
+    status = np.where(df["close"] > df["ema_50"], "BULLISH", "BEARISH").astype(object)
+    status[:49] = "NEUTRAL"
+
+    return pd.Series(status, index=pd.to_datetime(df["date"]).to_numpy())
+
+
+def rank_candidates(candidates, regime, top_n=5):
+    """
+    Applies the rank_today rules to each day's candidates: rule_score >= 8
+    on BEARISH days, one batched model call for every candidate-day, the
+    confidence score, then the top_n by confidence (ties keep universe order).
+    """
+
+    if candidates.empty:
+        return candidates
+
+    status = regime.reindex(candidates["date"]).fillna("NEUTRAL").to_numpy()
+    keep = (status != "BEARISH") | (candidates["rule_score"].to_numpy() >= 8)
+
+    picks = candidates[keep].copy()
+    picks["market_status"] = status[keep]
+
+    ml_probs = score_features(picks[FEATURE_NAMES].to_numpy())
+
+    picks["probability"] = np.round(ml_probs, 3)
+    picks["confidence"] = compute_confidence(
+        ml_prob=ml_probs,
+        rule_score_norm=picks["rule_score"].to_numpy() / 10,
+        pattern=picks["pattern"].tolist(),
+        volume_support=picks["volume_support"].to_numpy(),
+        rejection=picks["rejection"].to_numpy(),
+        financial_score=picks[FEATURE_NAMES[6]].to_numpy(),
+    )
+    picks["ml_prob"] = ml_probs
+
+    # Rows are in universe order within each day, so a stable sort keeps
+    # the same tie order as rank_today
+    picks = picks.sort_values(["date", "confidence"], ascending=[True, False], kind="mergesort")
+
+    picks = picks.groupby("date", sort=False).head(top_n)
+    picks.insert(0, "rank", picks.groupby("date", sort=False).cumcount() + 1)
+
+    return picks.reset_index(drop=True)
+
+
+# -------------------------
+# TRADE RESOLUTION
+# -------------------------
+def resolve_exits(picks, frames, max_hold=10):
+    """
+    Adds the trade plan (tp1 / sl from compute_trade_plan) and the exit of
+    every pick as if it were bought at that day's close: TP1 or SL,
+    whichever is hit first (TP1 on ties), else the close `max_hold` bars
+    later. Picks still open at the end of the data are marked OPEN.
+    """
+
+    picks = picks.copy()
+
+    plans = [
+        compute_trade_plan(pd.DataFrame({"close": [c], "atr_14": [a]}), p)
+        for c, a, p in zip(picks["close"], picks["atr_14"], picks["ml_prob"])
+    ]
+    picks["tp1"] = [plan["tp1"] for plan in plans]
+    picks["sl"] = [plan["sl"] for plan in plans]
+
+    picks["exit_date"] = pd.NaT
+    picks["exit_price"] = np.nan
+    picks["result"] = "OPEN"
+
+    for symbol, rows in picks.groupby("symbol", sort=False):
+        df = frames[symbol]
+        dates = pd.to_datetime(df["date"]).to_numpy()
+        close = df["close"].to_numpy(dtype=np.float64)
+
+        entry = np.searchsorted(dates, rows["date"].to_numpy())
+        tp = rows["tp1"].to_numpy(dtype=np.float64)
+        sl = rows["sl"].to_numpy(dtype=np.float64)
+
+        exit_index, is_win = first_exit(df["high"], df["low"], entry, tp, sl)
+
+        price = np.where(is_win, tp, sl)
+        result = np.where(is_win, "WIN", "LOSS").astype(object)
+
+        timed_out = (exit_index < 0) | (exit_index - entry > max_hold)
+        time_exit = entry + max_hold
+        has_bar = time_exit < len(df)
+
+        exit_index = np.where(timed_out, np.where(has_bar, time_exit, -1), exit_index)
+        price = np.where(timed_out, close[np.minimum(time_exit, len(df) - 1)], price)
+        result[timed_out] = np.where(has_bar[timed_out], "TIME", "OPEN")
+
+        closed = exit_index >= 0
+        picks.loc[rows.index, "exit_date"] = np.where(closed, dates[np.maximum(exit_index, 0)], np.datetime64("NaT"))
+        picks.loc[rows.index, "exit_price"] = np.where(closed, price, np.nan)
+        picks.loc[rows.index, "result"] = result
+
+    return picks
+
+
+# -------------------------
+# PORTFOLIO
+# -------------------------
+def simulate_portfolio(picks, closes, capital=1_000_000, max_positions=5):
+    """
+    Walks the calendar once. Each day: positions whose exit falls on the
+    day are sold, then the day's picks are bought at the close in rank
+    order while slots are free (one position per symbol, each sized at
+    1/max_positions of the previous close's equity). Equity is marked to
+    the last known close.
+
+    Returns:
+        (equity_curve, trade_log) DataFrames
+    """
+
+    cash = float(capital)
+    equity = float(capital)
+    positions = {}
+    trades = []
+    curve = []
+
+    by_date = {date: rows for date, rows in picks.groupby("date", sort=False)}
+
+    for date in closes.index:
+        # 1. exits (TP/SL intraday, time exits at the close)
+        for symbol in [s for s, p in positions.items() if p["exit_date"] == date]:
+            position = positions.pop(symbol)
+            cash += position["shares"] * position["exit_price"]
+            trades.append(position)
+
+        # 2. entries at the close
+        rows = by_date.get(date)
+        if rows is not None:
+            budget = equity / max_positions
+
+            for row in rows.itertuples(index=False):
+                if len(positions) >= max_positions:
+                    break
+                if row.symbol in positions:
+                    continue
+
+                shares = int(min(budget, cash) // row.close)
+                if shares <= 0:
+                    continue
+
+                cash -= shares * row.close
+                positions[row.symbol] = {
+                    "symbol": row.symbol,
+                    "rank": row.rank,
+                    "pattern": row.pattern,
+                    "rule_score": row.rule_score,
+                    "confidence": row.confidence,
+                    "market_status": row.market_status,
+                    "entry_date": date,
+                    "entry_price": row.close,
+                    "shares": shares,
+                    "tp1": row.tp1,
+                    "sl": row.sl,
+                    "exit_date": row.exit_date,
+                    "exit_price": row.exit_price,
+                    "result": row.result,
+                }
+
+        # 3. mark to market
+        marks = closes.loc[date]
+        held = sum(p["shares"] * marks[s] for s, p in positions.items())
+        equity = cash + held
+
+        curve.append({
+            "date": date,
+            "cash": round(cash, 2),
+            "equity": round(equity, 2),
+            "positions": len(positions),
+        })
+
+    # Still open at the end
+    for symbol, position in positions.items():
+        position = dict(position, exit_date=pd.NaT, exit_price=closes[symbol].iloc[-1], result="OPEN")
+        trades.append(position)
+
+    trade_log = pd.DataFrame(trades)
+    if not trade_log.empty:
+        trade_log["return_pct"] = trade_log["exit_price"] / trade_log["entry_price"] - 1
+        trade_log["pnl"] = trade_log["shares"] * (trade_log["exit_price"] - trade_log["entry_price"])
+        trade_log = trade_log.sort_values(["entry_date", "rank"], kind="mergesort").reset_index(drop=True)
+
+    return pd.DataFrame(curve), trade_log
+
+
+def summarize_portfolio(equity_curve, trade_log, capital):
+    if equity_curve.empty:
+        return {"trades": 0}
+
+    equity = equity_curve["equity"]
+    drawdown = equity / equity.cummax() - 1
+
+    closed = trade_log[trade_log["result"] != "OPEN"] if not trade_log.empty else trade_log
+
+    return {
+        "start": equity_curve["date"].iloc[0].date(),
+        "end": equity_curve["date"].iloc[-1].date(),
+        "final_equity": round(float(equity.iloc[-1]), 2),
+        "total_return": float(equity.iloc[-1] / capital - 1),
+        "max_drawdown": float(drawdown.min()),
+        "trades": int(len(closed)),
+        "win_rate": float((closed["pnl"] > 0).mean()) if len(closed) else 0.0,
+    }
+
+
+# -------------------------
+# ENTRY POINT
+# -------------------------
+def run_portfolio_backtest(universe_csv="universe/smallcap_250.csv", period="3y", days=500, top_n=5,
+                           max_positions=5, max_hold=10, capital=1_000_000, workers=0,
+                           chunk_size=50, download=None, output_dir="output", store_dir=None):
+    """
+    Replays rank_today on each of the last `days` sessions of the universe
+    and trades its picks as one portfolio. `period` of history is loaded so
+    the indicators have warmed up before the first simulated day.
+
+    Writes backtest_equity_<end>.csv and backtest_trades_<end>.csv to
+    output_dir and returns (equity_curve, trade_log, summary).
+
+    With store_dir the loaded bars are appended to that bar store
+    (utils/bar_store.py) and the selection replay reads them from it.
+    """
+
+    universe = pd.read_csv(universe_csv)
+    symbols = list(dict.fromkeys(universe.iloc[:, 0].tolist()))
+
+    print(f"Downloading {len(symbols)} symbols ({period})...")
+    frames = load_bulk_daily_data(symbols + [NIFTY_SYMBOL], period=period, chunk_size=chunk_size, download=download)
+    nifty_df = frames.pop(NIFTY_SYMBOL, None)
+    frames = {s: df.reset_index(drop=True) for s, df in frames.items() if df is not None and not df.empty}
+
+    if not frames:
+        print("No data to backtest.")
+        return pd.DataFrame(), pd.DataFrame(), {"trades": 0}
+
+    calendar = pd.DatetimeIndex(np.unique(np.concatenate(
+        [pd.to_datetime(df["date"]).to_numpy() for df in frames.values()]
+    )))[-days:]
+
+    print(f"Replaying selection over {len(calendar)} sessions with {workers or 1} process(es)...")
+    if store_dir:
+        from utils.bar_store import update_store
+        update_store(frames, store_dir)
+
+    candidates = collect_candidates(frames, symbols, nifty_df, workers=workers, store_dir=store_dir)
+
+    if not candidates.empty:
+        candidates = candidates[candidates["date"] >= calendar[0]].reset_index(drop=True)
+
+    picks = rank_candidates(candidates, market_regime_series(nifty_df, frames), top_n=top_n)
+
+    if picks.empty:
+        print("No setups found in the backtest window.")
+        return pd.DataFrame(), pd.DataFrame(), {"trades": 0}
+
+    picks = resolve_exits(picks, frames, max_hold=max_hold)
+
+    traded = picks["symbol"].unique()
+    closes = pd.concat(
+        {s: frames[s].set_index(pd.to_datetime(frames[s]["date"]))["close"] for s in traded}, axis=1
+    ).reindex(calendar).ffill()
+
+    equity_curve, trade_log = simulate_portfolio(picks, closes, capital=capital, max_positions=max_positions)
+    summary = summarize_portfolio(equity_curve, trade_log, capital)
+
+    os.makedirs(output_dir, exist_ok=True)
+    end = calendar[-1].strftime("%Y-%m-%d")
+    equity_path = os.path.join(output_dir, f"backtest_equity_{end}.csv")
+    trades_path = os.path.join(output_dir, f"backtest_trades_{end}.csv")
+    equity_curve.to_csv(equity_path, index=False)
+    trade_log.to_csv(trades_path, index=False)
+
+    print("\n--- Portfolio Backtest ---")
+    for key, value in summary.items():
+        print(f"{key}: {value:.2%}" if key in ("total_return", "max_drawdown", "win_rate") else f"{key}: {value}")
+    print(f"Saved: {equity_path}, {trades_path}")
+
+    return equity_curve, trade_log, summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Universe-wide portfolio backtest of the daily ranking")
+    parser.add_argument("--universe", default="universe/smallcap_250.csv")
+    parser.add_argument("--period", default="3y", help="History to load (indicator warm-up included)")
+    parser.add_argument("--days", type=int, default=500, help="Sessions to simulate")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--max-positions", type=int, default=5)
+    parser.add_argument("--max-hold", type=int, default=10, help="Exit at the close after N bars")
+    parser.add_argument("--capital", type=float, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (0 = serial)")
+    parser.add_argument("--store", default=None, metavar="DIR",
+                        help="Keep the bars in a memory-mapped store shared by the workers "
+                             "(e.g. data/store)")
+    args = parser.parse_args()
+
+    run_portfolio_backtest(
+        args.universe,
+        period=args.period,
+        days=args.days,
+        top_n=args.top_n,
+        max_positions=args.max_positions,
+        max_hold=args.max_hold,
+        capital=args.capital,
+        workers=args.workers,
+        store_dir=args.store,
+    )
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+from features.engine import uptrend_array
+from features.indicators import atr, add_rsi
+from utils.bars import working_frame
+
+
+WIN = "WIN"
+LOSS = "LOSS"
+
+TRADE_COLUMNS = [
+    "symbol",
+    "entry_date",
+    "exit_date",
+    "entry_price",
+    "exit_price",
+    "result",
+    "return_pct",
+    "bars_held",
+]
+
+
+# -------------------------
+# ENTRY SIGNALS
+# -------------------------
+def entry_signals(df, rsi_max=70):
+    """
+    Boolean entry array for every bar: is_uptrend and RSI(14) < rsi_max.
+    """
+
+    rsi = add_rsi(df[["close"]].copy())["rsi_14"].to_numpy()
+
+    with np.errstate(invalid="ignore"):
+        return uptrend_array(df["close"].to_numpy()) & (rsi < rsi_max)
+
+
+# -------------------------
+# EXIT RESOLUTION
+# -------------------------
+def first_exit(high, low, entries, tp, sl, block=32):
+    """
+    For each entry bar i, finds the first later bar j > i where
+    high[j] >= tp[i] (take profit) or low[j] <= sl[i] (stop loss).
+    Take profit wins when both are hit on the same bar.
+
+    Scans forward `block` bars at a time for all unresolved entries at
+    once. Returns (exit_index, is_win); exit_index is -1 if never hit.
+    """
+
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = len(high)
+
+    entries = np.asarray(entries)
+    exit_index = np.full(len(entries), -1)
+    is_win = np.zeros(len(entries), dtype=bool)
+
+    pending = np.arange(len(entries))
+    offset = 1
+
+    while len(pending) and offset < n:
+        steps = np.arange(offset, offset + block)
+        bars = entries[pending][:, None] + steps[None, :]
+        in_range = bars < n
+        bars = np.minimum(bars, n - 1)
+
+        hit_tp = (high[bars] >= tp[pending][:, None]) & in_range
+        hit_sl = (low[bars] <= sl[pending][:, None]) & in_range
+        hit = hit_tp | hit_sl
+
+        found = hit.any(axis=1)
+        first = hit.argmax(axis=1)
+
+        resolved = pending[found]
+        rows = np.where(found)[0]
+        exit_index[resolved] = bars[rows, first[found]]
+        is_win[resolved] = hit_tp[rows, first[found]]
+
+        pending = pending[~found]
+        offset += block
+
+    return exit_index, is_win
+
+
+# -------------------------
+# ENGINE
+# -------------------------
+def run_vector_backtest(df, symbol=None, days=200, warmup=50, tp_atr=1.5, sl_atr=1.0, rsi_max=70):
+    """
+    Backtests one symbol with the rule-based entry (uptrend + RSI < rsi_max),
+    entering at the close and exiting at TP (tp_atr x ATR) or SL (sl_atr x ATR).
+    One position at a time; a trade still open at the end is not counted.
+
+    Same trades as the original per-day loop, but signals and exits are
+    computed with array operations; only the chaining of non-overlapping
+    trades is a Python loop (one iteration per trade, not per bar).
+
+    Returns:
+        pd.DataFrame: one row per closed trade (TRADE_COLUMNS)
+    """
+
+    if df is None or len(df) < days + warmup:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+
+    # Slice relevant data but keep enough for indicators
+    df = working_frame(df.tail(days + warmup).reset_index(drop=True))
+
+    close = df["close"].to_numpy(dtype=np.float64)
+    atr_14 = atr(df, 14).to_numpy()
+
+    signal = entry_signals(df, rsi_max)
+    signal[:warmup] = False
+
+    candidates = np.flatnonzero(signal)
+    tp = close[candidates] + tp_atr * atr_14[candidates]
+    sl = close[candidates] - sl_atr * atr_14[candidates]
+
+    exit_index, is_win = first_exit(df["high"], df["low"], candidates, tp, sl)
+
+    # Chain trades: after an exit on bar j, the next entry is the first
+    # signal strictly after j (no re-entry on the exit bar)
+    n = len(df)
+    next_candidate = np.searchsorted(candidates, np.arange(n + 1), side="left")
+
+    taken = []
+    k = 0
+    while k < len(candidates):
+        if exit_index[k] < 0:
+            break
+        taken.append(k)
+        k = next_candidate[exit_index[k] + 1]
+
+    taken = np.array(taken, dtype=int)
+    if len(taken) == 0:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+
+    entry_bar = candidates[taken]
+    exit_bar = exit_index[taken]
+    wins = is_win[taken]
+
+    entry_price = close[entry_bar]
+    exit_price = np.where(wins, tp[taken], sl[taken])
+
+    dates = df["date"] if "date" in df.columns else pd.Series(df.index)
+
+    return pd.DataFrame({
+        "symbol": symbol,
+        "entry_date": dates.iloc[entry_bar].to_numpy(),
+        "exit_date": dates.iloc[exit_bar].to_numpy(),
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "result": np.where(wins, WIN, LOSS),
+        "return_pct": (exit_price - entry_price) / entry_price,
+        "bars_held": exit_bar - entry_bar,
+    })[TRADE_COLUMNS]
+
+
+def summarize_trades(trades):
+    """
+    Aggregate stats for a trade log. Any result label other than WIN/LOSS
+    is rejected instead of silently dropping out of both counts.
+    """
+
+    if trades is None or trades.empty:
+        return {"trades": 0}
+
+    unknown = set(trades["result"]) - {WIN, LOSS}
+    if unknown:
+        raise ValueError(f"Unknown trade result labels: {sorted(unknown)}")
+
+    returns = trades["return_pct"]
+    is_win = trades["result"] == WIN
+
+    gross_win = returns[is_win].sum()
+    gross_loss = -returns[~is_win].sum()
+
+    return {
+        "trades": int(len(trades)),
+        "wins": int(is_win.sum()),
+        "losses": int((~is_win).sum()),
+        "win_rate": float(is_win.mean()),
+        "avg_return": float(returns.mean()),
+        "avg_win": float(returns[is_win].mean()) if is_win.any() else 0.0,
+        "avg_loss": float(returns[~is_win].mean()) if (~is_win).any() else 0.0,
+        "profit_factor": float(gross_win / gross_loss) if gross_loss > 0 else float("inf"),
+        "avg_bars_held": float(trades["bars_held"].mean()),
+    }
+
+
+def run_vector_backtest_many(frames, days=200, **kwargs):
+    """
+    Backtests {symbol: DataFrame} and returns (trades, stats) where stats
+    has one row per symbol plus an "ALL" row.
+    """
+
+    logs = [run_vector_backtest(df, symbol=symbol, days=days, **kwargs) for symbol, df in frames.items()]
+    logs = [log for log in logs if not log.empty]
+
+    trades = pd.concat(logs, ignore_index=True) if logs else pd.DataFrame(columns=TRADE_COLUMNS)
+
+    stats = {symbol: summarize_trades(log) for symbol, log in trades.groupby("symbol", sort=False)}
+    stats["ALL"] = summarize_trades(trades)
+
+    return trades, pd.DataFrame.from_dict(stats, orient="index")
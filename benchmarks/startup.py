@@ -0,0 +1,98 @@
+"""
+Startup-time benchmark.
+
+Every measurement runs in a fresh interpreter so import and unpickling
+costs are cold. Run from the repo root:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 5 --json output/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+
+CASES = {
+    # Interpreter start-up alone, to subtract mentally from the rest
+    "python_baseline": "pass",
+    "import_ml_predict": "import ml.predict",
+    "load_model_pickle": "from ml.model import load_model; load_model()",
+    "load_model_artifact": "from ml.model import load_artifact; assert load_artifact() is not None",
+    "score_250_pickle": (
+        "import numpy as np; from ml.model import load_model; "
+        "load_model().predict_proba(np.zeros((250, 8)))"
+    ),
+    "score_250_artifact": (
+        "import numpy as np; from ml.model import load_artifact; "
+        "load_artifact().predict_proba(np.zeros((250, 8)))"
+    ),
+    "sklearn_imported_by_artifact": (
+        "import sys; from ml.model import load_artifact; load_artifact(); "
+        "assert 'sklearn' not in sys.modules"
+    ),
+}
+
+
+def _next_friday():
+    day = datetime.now()
+    while day.weekday() != 4:
+        day += timedelta(days=1)
+    return day.strftime("%Y-%m-%d")
+
+
+def _time_subprocess(args, env=None):
+    start = datetime.now()
+    result = subprocess.run(args, capture_output=True, text=True, env=env)
+    elapsed = (datetime.now() - start).total_seconds()
+
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+
+    return elapsed
+
+
+def run(repeat=3):
+    """
+    Returns {case: {"median_ms", "min_ms"}} over `repeat` fresh processes.
+    """
+
+    env = dict(os.environ)
+    # A manual run ignores the weekend skip; make sure we measure the skip
+    env.pop("RUN_TYPE", None)
+
+    commands = {name: [sys.executable, "-c", code] for name, code in CASES.items()}
+    # Friday: the next day is Saturday, so the scan is skipped
+    commands["run_daily_skipped_day"] = [sys.executable, "run_daily.py", "--date", _next_friday()]
+
+    results = {}
+    for name, command in commands.items():
+        times = [_time_subprocess(command, env) * 1000 for _ in range(repeat)]
+        results[name] = {
+            "median_ms": round(statistics.median(times), 1),
+            "min_ms": round(min(times), 1),
+        }
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup-time benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", default=None, help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+
+    print(f"\n{'CASE':<32} {'MEDIAN ms':>10} {'MIN ms':>10}")
+    print("-" * 54)
+    for name, timing in results.items():
+        print(f"{name:<32} {timing['median_ms']:>10} {timing['min_ms']:>10}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved {args.json}")
@@ -0,0 +1,421 @@
+"""
+Benchmark suite on synthetic universes (benchmarks/synthetic.py).
+
+Times the indicators, the helpers, predict_today_probability and
+run_backtest per call on a sample of symbols, and full rank_today scans
+(cold and warm bar cache) on the whole universe. Peak memory per case is
+measured with tracemalloc in a separate pass, and the bytes held by the
+universe's bar frames are reported as generated (float64) and in the
+compact in-memory layout (utils/bars.py). Run from the repo root:
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --symbols 250 2500 25000 --json output/bench.json
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite --compare
+
+Data never touches the network or the real caches: downloads are served
+by utils.local_provider.LocalDownloader, and the bar and financials
+caches point at a temporary directory seeded with synthetic financials.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import BENCHMARK, generate_financials, generate_universe
+from utils.bars import compact_frame, frame_nbytes
+from utils.instrumentation import configure_logging
+
+
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+
+# A case is slower than its baseline if the median grew by more than
+# TOLERANCE and by more than the noise floor
+TOLERANCE = 0.25
+NOISE_FLOOR_MS = 0.05
+NOISE_FLOOR_MB = 1.0
+
+
+# -------------------------
+# CASES
+# -------------------------
+# Per-call cases: (name, setup, fn). setup(df, symbol, nifty_df) returns
+# the argument tuple for one call, so copies of frames the function
+# mutates are made outside the timed loop.
+def _frame(df, symbol, nifty_df):
+    return (df,)
+
+
+def _fresh(df, symbol, nifty_df):
+    return (df.copy(),)
+
+
+def _prepared(df):
+    # The columns prepare_symbol adds before extract_features runs
+    from features.indicators import add_atr, add_ema
+    df = add_ema(df.copy(), 10)
+    df = add_ema(df, 15)
+    return add_atr(df, 14)
+
+
+def _call_cases():
+    from features import indicators
+    from utils import helpers
+    from ml.predict import predict_today_probability
+
+    cases = [
+        ("indicators.ema", lambda df, s, n: (df["close"], 20), indicators.ema),
+        ("indicators.add_ema", lambda df, s, n: (df.copy(), 10), indicators.add_ema),
+        ("indicators.atr", _frame, indicators.atr),
+        ("indicators.add_atr", _fresh, indicators.add_atr),
+        ("indicators.is_uptrend", _fresh, indicators.is_uptrend),
+        ("indicators.ema_trend_strength", _fresh, indicators.ema_trend_strength),
+        ("indicators.add_rsi", _fresh, indicators.add_rsi),
+        ("indicators.add_adx", _fresh, indicators.add_adx),
+        ("indicators.get_volatility_squeeze", _fresh, indicators.get_volatility_squeeze),
+        ("helpers.has_bullish_candles", _frame, helpers.has_bullish_candles),
+        ("helpers.is_consolidating", _frame, helpers.is_consolidating),
+        ("helpers.is_volume_supporting", _frame, helpers.is_volume_supporting),
+        ("helpers.get_recent_high", _frame, helpers.get_recent_high),
+        ("helpers.is_near_resistance",
+         lambda df, s, n: (df, df["high"].tail(50).max()), helpers.is_near_resistance),
+        ("helpers.volume_supports_breakout", _frame, helpers.volume_supports_breakout),
+        ("helpers.compute_resistance", _frame, helpers.compute_resistance),
+        ("predict_today_probability",
+         lambda df, s, n: (_prepared(df), s, n), predict_today_probability),
+    ]
+
+    return cases
+
+
+def _time_calls(fn, arg_sets):
+    started = time.perf_counter()
+    for args in arg_sets:
+        fn(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def _peak_mb(run):
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2 ** 20, 3)
+
+
+def _summary(times, calls, peak_mb, unit):
+    per_call = [t / calls for t in times]
+    return {
+        "unit": unit,
+        "calls": calls,
+        "median_ms": round(statistics.median(per_call), 4),
+        "min_ms": round(min(per_call), 4),
+        "peak_mb": peak_mb,
+    }
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def universe_memory(frames):
+    """
+    MB held by {symbol: frame} as generated and after compact_frame().
+    """
+
+    compact = {symbol: compact_frame(df) for symbol, df in frames.items()}
+    raw_mb = frame_nbytes(frames) / 2 ** 20
+    compact_mb = frame_nbytes(compact) / 2 ** 20
+
+    return {
+        "frames_mb": round(raw_mb, 3),
+        "compact_mb": round(compact_mb, 3),
+        "ratio": round(compact_mb / raw_mb, 3) if raw_mb else None,
+    }
+
+
+# -------------------------
+# ISOLATED ENVIRONMENT
+# -------------------------
+@contextlib.contextmanager
+def isolated_caches(symbols, seed=0):
+    """
+    Points the bar and financials caches at a temporary directory, seeded
+    with synthetic financials for every symbol. Restores them on exit.
+    """
+
+    from utils import bar_cache, financials_cache
+
+    root = tempfile.mkdtemp(prefix="bench_")
+    saved = bar_cache.CACHE_DIR, financials_cache.CACHE_DIR
+
+    bar_cache.CACHE_DIR = os.path.join(root, "bars")
+    financials_cache.CACHE_DIR = os.path.join(root, "financials")
+
+    try:
+        for symbol in symbols:
+            financials_cache.write_entry(symbol, generate_financials(symbol, seed))
+        yield root
+    finally:
+        bar_cache.CACHE_DIR, financials_cache.CACHE_DIR = saved
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _clear_bar_cache():
+    from utils import bar_cache
+    shutil.rmtree(bar_cache.CACHE_DIR, ignore_errors=True)
+
+
+# -------------------------
+# RUN
+# -------------------------
+def run_size(n_symbols, n_bars=500, seed=0, sample=50, repeat=3, workers=0, memory=True,
+             full_scan=True):
+    """
+    Benchmarks one universe size. Returns ({case: summary}, memory), see
+    universe_memory().
+    """
+
+    from backtesting.simple_backtest import run_backtest
+    from ranking.rank_today import rank_today
+    from utils.local_provider import LocalDownloader
+
+    frames = generate_universe(n_symbols, n_bars=n_bars, seed=seed)
+    symbols = [s for s in frames if s != BENCHMARK]
+    sampled = symbols[:sample]
+    nifty_df = frames[BENCHMARK]
+
+    results = {}
+    memory_use = universe_memory(frames)
+
+    with isolated_caches(symbols, seed) as root:
+        # Per-call cases on the sample
+        for name, setup, fn in _call_cases():
+            def arg_sets():
+                return [setup(frames[s], s, nifty_df) for s in sampled]
+
+            times = [_time_calls(fn, arg_sets()) for _ in range(repeat)]
+
+            peak = None
+            if memory:
+                args = arg_sets()
+                peak = _peak_mb(lambda: _time_calls(fn, args))
+
+            results[name] = _summary(times, len(sampled), peak, "call")
+
+        # run_backtest per symbol (bars come through the isolated bar cache)
+        download = LocalDownloader(frames)
+
+        def backtest_all():
+            with contextlib.redirect_stdout(io.StringIO()):
+                for symbol in sampled:
+                    run_backtest(symbol, download=download)
+
+        backtest_all()  # seed the bar cache for the sampled symbols
+        times = [_time_calls(backtest_all, [()]) for _ in range(repeat)]
+        peak = _peak_mb(backtest_all) if memory else None
+        results["run_backtest"] = _summary(times, len(sampled), peak, "call")
+
+        # Full scans: cold (empty bar cache) first, which leaves it warm
+        if full_scan:
+            universe_csv = os.path.join(root, "universe.csv")
+            pd.DataFrame({"symbol": symbols}).to_csv(universe_csv, index=False)
+
+            def scan():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    rank_today(universe_csv, download=LocalDownloader(frames), workers=workers)
+
+            for name, cold in (("rank_today.cold", True), ("rank_today.warm", False)):
+                times = []
+                for _ in range(repeat):
+                    if cold:
+                        _clear_bar_cache()
+                    times.append(_time_calls(scan, [()]))
+
+                peak = None
+                if memory:
+                    if cold:
+                        _clear_bar_cache()
+                    peak = _peak_mb(scan)
+
+                results[name] = _summary(times, 1, peak, "run")
+
+    memory_use["max_rss_mb"] = _max_rss_mb()
+    return results, memory_use
+
+
+def run(sizes=(250,), **kwargs):
+    """
+    Returns the full result document: environment metadata,
+    {str(n_symbols): {case: summary}} and the universe memory per size.
+    """
+
+    document = {
+        "meta": {
+            "created": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "settings": dict(kwargs),
+        },
+        "sizes": {},
+        "memory": {},
+    }
+
+    for n_symbols in sizes:
+        print(f"Benchmarking {n_symbols} symbols...")
+        cases, memory_use = run_size(n_symbols, **kwargs)
+        document["sizes"][str(n_symbols)] = cases
+        document["memory"][str(n_symbols)] = memory_use
+
+    return document
+
+
+# -------------------------
+# BASELINE
+# -------------------------
+def compare(document, baseline, tolerance=TOLERANCE):
+    """
+    Cases slower or more memory-hungry than the baseline beyond
+    `tolerance` (and the noise floors). Returns a list of dicts.
+    """
+
+    regressions = []
+
+    for size, cases in document["sizes"].items():
+        for name, current in cases.items():
+            previous = baseline.get("sizes", {}).get(size, {}).get(name)
+            if previous is None:
+                continue
+
+            checks = [
+                ("median_ms", NOISE_FLOOR_MS),
+                ("peak_mb", NOISE_FLOOR_MB),
+            ]
+            for metric, floor in checks:
+                new, old = current.get(metric), previous.get(metric)
+                if new is None or old is None:
+                    continue
+                if new > old * (1 + tolerance) and new - old > floor:
+                    regressions.append({
+                        "size": size,
+                        "case": name,
+                        "metric": metric,
+                        "baseline": old,
+                        "current": new,
+                        "ratio": round(new / old, 3) if old else None,
+                    })
+
+    for size, current in document.get("memory", {}).items():
+        previous = baseline.get("memory", {}).get(size)
+        if previous is None:
+            continue
+
+        new, old = current.get("compact_mb"), previous.get("compact_mb")
+        if new is not None and old is not None and new > old * (1 + tolerance) and new - old > NOISE_FLOOR_MB:
+            regressions.append({
+                "size": size,
+                "case": "universe.frames",
+                "metric": "compact_mb",
+                "baseline": old,
+                "current": new,
+                "ratio": round(new / old, 3) if old else None,
+            })
+
+    return regressions
+
+
+def _print_results(document):
+    for size, cases in document["sizes"].items():
+        print(f"\n{size} symbols")
+        print(f"{'CASE':<38} {'UNIT':>5} {'MEDIAN ms':>11} {'MIN ms':>11} {'PEAK MB':>9}")
+        print("-" * 78)
+        for name, r in cases.items():
+            peak = "-" if r["peak_mb"] is None else r["peak_mb"]
+            print(f"{name:<38} {r['unit']:>5} {r['median_ms']:>11} {r['min_ms']:>11} {peak:>9}")
+
+        memory_use = document.get("memory", {}).get(size)
+        if memory_use:
+            print(f"\nBar frames: {memory_use['frames_mb']} MB as float64, "
+                  f"{memory_use['compact_mb']} MB compact (x{memory_use['ratio']}); "
+                  f"max RSS {memory_use['max_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark suite on synthetic universes")
+    parser.add_argument("--symbols", type=int, nargs="+", default=[250],
+                        help="Universe sizes (e.g. 250 2500 25000)")
+    parser.add_argument("--bars", type=int, default=500, help="Trading days per symbol")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sample", type=int, default=50,
+                        help="Symbols used for the per-call cases")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=0, help="rank_today worker processes")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--no-scan", action="store_true", help="Skip the full rank_today scans")
+    parser.add_argument("--json", default=None, help="Write results to this file")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help=f"Write results to {BASELINE_PATH}")
+    parser.add_argument("--compare", action="store_true",
+                        help=f"Compare against {BASELINE_PATH}; exit 1 on regressions")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    configure_logging("ERROR")
+
+    document = run(
+        sizes=args.symbols,
+        n_bars=args.bars,
+        seed=args.seed,
+        sample=args.sample,
+        repeat=args.repeat,
+        workers=args.workers,
+        memory=not args.no_memory,
+        full_scan=not args.no_scan,
+    )
+
+    _print_results(document)
+
+    for path in filter(None, [args.json, args.baseline if args.save_baseline else None]):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"\nSaved {path}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline} (create one with --save-baseline)")
+            sys.exit(1)
+
+        with open(args.baseline) as f:
+            regressions = compare(document, json.load(f), args.tolerance)
+
+        if not regressions:
+            print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        else:
+            print(f"\nREGRESSIONS against {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for r in regressions:
+                print(f"  {r['size']:>6} {r['case']:<38} {r['metric']:<10} "
+                      f"{r['baseline']} -> {r['current']} (x{r['ratio']})")
+            sys.exit(1)
@@ -0,0 +1,155 @@
+"""
+Deterministic synthetic OHLCV universes for benchmarks.
+
+Every symbol is generated from its own seed (seed, symbol number), so the
+first 250 symbols of a 2,500-symbol universe are the 250-symbol universe.
+Price paths switch between up, down and sideways regimes with clustered
+volatility and overnight gaps; volume follows quiet/normal/active regimes
+and spikes on large moves. Some symbols list late (shorter history), and
+a few are illiquid so the filters have something to reject.
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+BENCHMARK = "^NSEI"
+
+# Daily drift and volatility multiplier per trend regime
+REGIMES = {
+    "up": (0.0015, 1.0),
+    "down": (-0.0012, 1.2),
+    "sideways": (0.0, 0.7),
+}
+# Chance of staying in the current regime from one day to the next
+REGIME_PERSISTENCE = 0.97
+
+# Volume multiplier per volume regime (quiet, normal, active)
+VOLUME_REGIMES = np.array([0.5, 1.0, 2.0])
+
+
+def symbol_names(n_symbols):
+    return [f"SYN{k:05d}.NS" for k in range(n_symbols)]
+
+
+def trading_days(n_bars, end=None):
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize() - pd.Timedelta(days=1)
+    return pd.bdate_range(end=end, periods=n_bars)
+
+
+def _markov_states(rng, n, n_states, persistence):
+    # Regime index per day: stay with `persistence`, else jump to any state
+    stay = rng.random(n) < persistence
+    jumps = rng.integers(0, n_states, n)
+
+    states = np.empty(n, dtype=np.int64)
+    states[0] = jumps[0]
+    for i in range(1, n):
+        states[i] = states[i - 1] if stay[i] else jumps[i]
+
+    return states
+
+
+def generate_symbol(rng, dates, base_price=None, base_volume=None):
+    """
+    One symbol's OHLCV frame over `dates`.
+    """
+
+    n = len(dates)
+    names = list(REGIMES)
+
+    regime = _markov_states(rng, n, len(names), REGIME_PERSISTENCE)
+    drift = np.array([REGIMES[name][0] for name in names])[regime]
+    vol_scale = np.array([REGIMES[name][1] for name in names])[regime]
+
+    # Volatility clustering: GARCH(1,1)-style variance recursion
+    base_vol = rng.uniform(0.012, 0.03)
+    shocks = rng.standard_normal(n)
+    variance = np.empty(n)
+    variance[0] = base_vol ** 2
+    for i in range(1, n):
+        variance[i] = 0.05 * base_vol ** 2 + 0.85 * variance[i - 1] + 0.10 * (shocks[i - 1] ** 2) * variance[i - 1]
+    sigma = np.sqrt(variance) * vol_scale
+
+    # Overnight gaps on ~3% of days, intraday move on top
+    gaps = np.where(rng.random(n) < 0.03, rng.normal(0, 3 * base_vol, n), 0.0)
+    intraday = drift + sigma * shocks
+
+    base_price = base_price or float(np.exp(rng.uniform(np.log(20), np.log(3000))))
+    prev_close = base_price * np.exp(np.concatenate([[0.0], np.cumsum(gaps + intraday)[:-1]]))
+
+    open_ = prev_close * np.exp(gaps)
+    close = open_ * np.exp(intraday)
+
+    wick = np.abs(rng.normal(0, 0.5, (2, n))) * sigma
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+
+    # Volume: regime level, lognormal noise, spikes on large moves
+    base_volume = base_volume or float(np.exp(rng.uniform(np.log(2e5), np.log(5e6))))
+    volume_regime = _markov_states(rng, n, len(VOLUME_REGIMES), 0.95)
+    move = np.abs(gaps + intraday) / np.maximum(sigma, 1e-9)
+    volume = base_volume * VOLUME_REGIMES[volume_regime] * rng.lognormal(0, 0.35, n) * (1 + 0.5 * np.maximum(move - 1, 0))
+
+    return pd.DataFrame({
+        "date": dates,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": np.round(volume),
+    })
+
+
+def generate_benchmark(dates, seed=0):
+    rng = np.random.default_rng([seed, 1_000_000])
+    df = generate_symbol(rng, dates, base_price=18000.0, base_volume=2e5)
+    df["volume"] = 0.0
+    return df
+
+
+def generate_universe(n_symbols, n_bars=500, seed=0, end=None):
+    """
+    {symbol: OHLCV frame} for n_symbols synthetic symbols plus the
+    benchmark (^NSEI), all ending on the same trading day.
+
+    - every 7th symbol lists late (20-40% of the history missing)
+    - every 11th symbol trades thin (fails the liquidity filter)
+    """
+
+    dates = trading_days(n_bars, end)
+    frames = {BENCHMARK: generate_benchmark(dates, seed)}
+
+    for k, symbol in enumerate(symbol_names(n_symbols)):
+        rng = np.random.default_rng([seed, k])
+
+        symbol_dates = dates
+        if k % 7 == 3:
+            symbol_dates = dates[int(n_bars * rng.uniform(0.2, 0.4)):]
+
+        base_volume = float(rng.uniform(2e4, 2e5)) if k % 11 == 5 else None
+        frames[symbol] = generate_symbol(rng, symbol_dates, base_volume=base_volume)
+
+    return frames
+
+
+def generate_financials(symbol, seed=0, quarters=5, end=None):
+    """
+    Quarterly financials shaped like yfinance's quarterly_financials:
+    line items as rows, quarter-end dates as columns, most recent first.
+    """
+
+    rng = np.random.default_rng([seed, zlib.crc32(symbol.encode()), 7])
+
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize()
+    quarter_ends = pd.date_range(end=end - pd.offsets.QuarterEnd(1), periods=quarters, freq="QE")[::-1]
+
+    revenue = rng.uniform(1e9, 5e10) * np.exp(np.cumsum(rng.normal(0.02, 0.08, quarters)))[::-1]
+    margin = rng.uniform(0.02, 0.15, quarters)
+
+    return pd.DataFrame(
+        [revenue, revenue * margin],
+        index=["Total Revenue", "Net Income"],
+        columns=quarter_ends,
+    )
@@ -0,0 +1,180 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from features.indicators import ema
+from features.market_regime import as_benchmark, nifty_status
+from features.panel import Panel
+
+logger = logging.getLogger(__name__)
+
+
+BREADTH_EMAS = (20, 50, 200)
+
+# New highs / lows are 52-week extremes
+HIGH_LOW_LOOKBACK = 252
+
+# The A/D line votes bullish when it is above its level this many days ago
+AD_TREND_DAYS = 20
+
+RS_HORIZON = 50
+
+
+# -------------------------
+# BREADTH
+# -------------------------
+# A single NIFTY close-vs-EMA50 check says little about smallcaps, which
+# can lag or lead the index for months. Breadth comes from the universe
+# itself: the bars are already loaded for the scan, so it costs a few
+# array operations over the (dates x symbols) panel and no extra request.
+def _pct(count, total):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, 100 * count / total, np.nan)
+
+
+def _benchmark_on(dates, nifty_df):
+    # NIFTY close and 50-day EMA on `dates`, carrying the last bar forward
+    # over days the index did not trade
+    benchmark = as_benchmark(nifty_df)
+    nan = np.full(len(dates), np.nan)
+    if benchmark is None or len(benchmark) == 0:
+        return nan, nan
+
+    close = pd.Series(benchmark.close)
+    ema_50 = ema(close, 50).to_numpy(copy=True)
+    ema_50[:49] = np.nan  # nifty_status needs 50 bars
+
+    pos = np.searchsorted(benchmark.dates, np.asarray(dates, dtype="datetime64[ns]"), side="right") - 1
+    found = pos >= 0
+    pos = np.clip(pos, 0, None)
+
+    return np.where(found, benchmark.close[pos], np.nan), np.where(found, ema_50[pos], np.nan)
+
+
+def compute_breadth(panel, nifty_df=None, rs_horizon=RS_HORIZON):
+    """
+    Universe breadth for every date of a features.panel.Panel, in one pass
+    over its arrays.
+
+    Returns a DataFrame indexed by date:
+        members                 symbols with a bar that day
+        pct_above_ema_<n>       % of symbols with n+ bars closing above
+                                their n-day EMA (n in BREADTH_EMAS)
+        advances, declines      closes above / below the previous day's
+        ad_line                 cumulative advances - declines
+        new_highs, new_lows     symbols at a 52-week high / low
+        median_rs               median calculate_rs-style RS over
+                                rs_horizon days (NaN without NIFTY)
+        nifty_close, nifty_ema_50
+    """
+
+    close = panel.close
+    valid = ~np.isnan(close)
+    bars_seen = valid.cumsum(axis=0)
+
+    breadth = {"members": valid.sum(axis=1)}
+
+    with np.errstate(invalid="ignore"):
+        for span in BREADTH_EMAS:
+            eligible = valid & (bars_seen >= span)
+            above = eligible & (close > panel.ema(span))
+            breadth[f"pct_above_ema_{span}"] = _pct(above.sum(axis=1), eligible.sum(axis=1))
+
+        previous = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+        advances = (close > previous).sum(axis=1)
+        declines = (close < previous).sum(axis=1)
+
+        high = pd.DataFrame(panel.high).rolling(HIGH_LOW_LOOKBACK, min_periods=HIGH_LOW_LOOKBACK).max().to_numpy()
+        low = pd.DataFrame(panel.low).rolling(HIGH_LOW_LOOKBACK, min_periods=HIGH_LOW_LOOKBACK).min().to_numpy()
+
+        breadth["advances"] = advances
+        breadth["declines"] = declines
+        breadth["ad_line"] = np.cumsum(advances - declines)
+        breadth["new_highs"] = (panel.high >= high).sum(axis=1)
+        breadth["new_lows"] = (panel.low <= low).sum(axis=1)
+
+    nifty_close, nifty_ema_50 = _benchmark_on(panel.dates, nifty_df)
+
+    # RS as in calculate_rs: close vs the close rs_horizon - 1 bars back,
+    # over NIFTY's move in the same days (a missing bar carries the last close)
+    k = rs_horizon - 1
+    closes = pd.DataFrame(close).ffill()
+    nifty = pd.Series(nifty_close)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = (closes / closes.shift(k)).div(nifty / nifty.shift(k), axis=0)
+    breadth["median_rs"] = rs.where(valid).median(axis=1).to_numpy()
+
+    breadth["nifty_close"] = nifty_close
+    breadth["nifty_ema_50"] = nifty_ema_50
+
+    return pd.DataFrame(breadth, index=panel.dates)
+
+
+# -------------------------
+# REGIME
+# -------------------------
+def regime_status(breadth):
+    """
+    BULLISH / BEARISH / NEUTRAL for every row of compute_breadth, by
+    majority of four votes:
+    - NIFTY closes above / below its 50-day EMA
+    - more / fewer than half the universe above its 50-day EMA
+    - more new highs than new lows, or fewer
+    - the A/D line above / below its level AD_TREND_DAYS ago
+    A vote abstains when its input is missing or tied; ties between the
+    votes are NEUTRAL.
+    """
+
+    leads = np.column_stack([
+        breadth["nifty_close"] - breadth["nifty_ema_50"],
+        breadth["pct_above_ema_50"] - 50,
+        breadth["new_highs"] - breadth["new_lows"],
+        breadth["ad_line"] - breadth["ad_line"].shift(AD_TREND_DAYS),
+    ])
+
+    score = np.nansum(np.sign(leads), axis=1)
+    status = np.where(score > 0, "BULLISH", np.where(score < 0, "BEARISH", "NEUTRAL")).astype(object)
+
+    return pd.Series(status, index=breadth.index)
+
+
+class MarketRegime:
+    """
+    The regime rank_today applies: `status` (BULLISH / BEARISH / NEUTRAL)
+    and the latest breadth row it was decided from (None when only NIFTY
+    was available).
+    """
+
+    def __init__(self, status, breadth=None, nifty_df=None):
+        self.status = status
+        self.breadth = breadth
+        self.nifty_df = nifty_df
+
+    @classmethod
+    def from_frames(cls, frames, nifty_df=None):
+        """
+        Regime from the universe's already-loaded {symbol: frame} and the
+        NIFTY frame. Without universe bars only NIFTY decides, as in
+        get_market_regime.
+        """
+
+        frames = {s: df for s, df in frames.items() if df is not None and not df.empty}
+        if not frames:
+            _, status = nifty_status(nifty_df)
+            return cls(status, nifty_df=nifty_df)
+
+        breadth = compute_breadth(Panel.from_frames(frames), nifty_df)
+        status = regime_status(breadth).iloc[-1]
+
+        return cls(status, breadth.iloc[-1], nifty_df)
+
+    def describe(self):
+        if self.breadth is None:
+            return self.status
+
+        b = self.breadth
+        return (f"{self.status} | above EMA20/50/200: {b['pct_above_ema_20']:.0f}% / "
+                f"{b['pct_above_ema_50']:.0f}% / {b['pct_above_ema_200']:.0f}% | "
+                f"A/D {b['advances']:.0f}/{b['declines']:.0f} | "
+                f"new highs/lows {b['new_highs']:.0f}/{b['new_lows']:.0f} | median RS {b['median_rs']:.3f}")
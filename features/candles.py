@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+
+
+# -------------------------
+# CANDLE GEOMETRY
+# -------------------------
+# Every function takes open/high/low/close as arrays of the same shape:
+# 1-D for one symbol's history, or (dates x symbols) for a panel
+# (features/panel.py). Results have the same shape, one value per bar.
+def candle_geometry(open_, high, low, close):
+    """
+    Body, range and wick measurements for every bar.
+
+    Returns:
+        dict of arrays:
+        - body (close - open), body_abs, range (high - low)
+        - upper_wick, lower_wick
+        - body_ratio, upper_wick_ratio, lower_wick_ratio (share of the
+          range; NaN where the range is 0)
+        - bullish (close > open), bearish (close < open)
+    """
+
+    open_ = np.asarray(open_, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    body = close - open_
+    candle_range = high - low
+    upper_wick = high - np.maximum(open_, close)
+    lower_wick = np.minimum(open_, close) - low
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scale = np.where(candle_range != 0, candle_range, np.nan)
+        body_ratio = np.abs(body) / scale
+        upper_wick_ratio = upper_wick / scale
+        lower_wick_ratio = lower_wick / scale
+
+    return {
+        "body": body,
+        "body_abs": np.abs(body),
+        "range": candle_range,
+        "upper_wick": upper_wick,
+        "lower_wick": lower_wick,
+        "body_ratio": body_ratio,
+        "upper_wick_ratio": upper_wick_ratio,
+        "lower_wick_ratio": lower_wick_ratio,
+        "bullish": close > open_,
+        "bearish": close < open_,
+    }
+
+
+def geometry_from_frame(df):
+    return candle_geometry(df["open"], df["high"], df["low"], df["close"])
+
+
+def _shift(values, n=1):
+    # Previous bar's value along the time axis (NaN for the first bars)
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    out[n:] = values[:-n]
+    return out
+
+
+def _rolling(values, n, how, min_periods=None):
+    frame = pd.DataFrame(np.asarray(values, dtype=np.float64))
+    result = getattr(frame.rolling(n, min_periods=min_periods or n), how)().to_numpy()
+    return result if np.ndim(values) == 2 else result[:, 0]
+
+
+# -------------------------
+# REJECTION
+# -------------------------
+def rejection_candles(geometry, open_, close, wick_ratio_threshold=0.4):
+    """
+    Bearish rejection candles: upper wick >= wick_ratio_threshold of the
+    range, and a bearish or small (< 25% of range) body. Zero-range bars
+    never count.
+    """
+
+    open_ = np.asarray(open_, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    with np.errstate(invalid="ignore"):
+        is_bearish_or_small = (close <= open_) | (geometry["body_ratio"] < 0.25)
+        long_wick = geometry["upper_wick_ratio"] >= wick_ratio_threshold
+
+    return (geometry["range"] != 0) & long_wick & is_bearish_or_small
+
+
+def rejection_count(open_, high, low, close, lookback=3, wick_ratio_threshold=0.4):
+    """
+    Number of rejection candles in the last `lookback` bars, for every bar.
+    """
+
+    geometry = candle_geometry(open_, high, low, close)
+    candles = rejection_candles(geometry, open_, close, wick_ratio_threshold)
+    return _rolling(candles, lookback, "sum", min_periods=1)
+
+
+# -------------------------
+# PATTERNS (every bar)
+# -------------------------
+def inside_bar(high, low):
+    """
+    High below and low above the previous bar's.
+    """
+
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+
+    with np.errstate(invalid="ignore"):
+        return (high < _shift(high)) & (low > _shift(low))
+
+
+def nr7(high, low, lookback=7):
+    """
+    Narrowest range of the last `lookback` bars (ties count).
+    """
+
+    candle_range = np.asarray(high, dtype=np.float64) - np.asarray(low, dtype=np.float64)
+
+    with np.errstate(invalid="ignore"):
+        return candle_range <= _rolling(candle_range, lookback, "min")
+
+
+def bullish_engulfing(open_, close):
+    """
+    A bullish body that covers the previous bar's bearish body.
+    """
+
+    open_ = np.asarray(open_, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    prev_open, prev_close = _shift(open_), _shift(close)
+
+    with np.errstate(invalid="ignore"):
+        return (prev_close < prev_open) & (close > open_) & (open_ <= prev_close) & (close >= prev_open)
+
+
+def bearish_engulfing(open_, close):
+    """
+    A bearish body that covers the previous bar's bullish body.
+    """
+
+    open_ = np.asarray(open_, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    prev_open, prev_close = _shift(open_), _shift(close)
+
+    with np.errstate(invalid="ignore"):
+        return (prev_close > prev_open) & (close < open_) & (open_ >= prev_close) & (close <= prev_open)
+
+
+def pocket_pivot(close, volume, lookback=10):
+    """
+    An up close on volume above every down day's volume of the previous
+    `lookback` bars.
+    """
+
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    prev_close = _shift(close)
+
+    with np.errstate(invalid="ignore"):
+        up = close > prev_close
+        # NaN (not 0) where there is no bar, so panel columns with leading
+        # NaN fill their window exactly like the symbol's own history
+        down_volume = np.where(np.isnan(close), np.nan, np.where(close < prev_close, volume, 0.0))
+
+    max_down = _shift(_rolling(down_volume, lookback, "max"))
+
+    with np.errstate(invalid="ignore"):
+        return up & (volume > max_down)
+
+
+CANDLE_PATTERNS = [
+    "inside_bar",
+    "nr7",
+    "bullish_engulfing",
+    "bearish_engulfing",
+    "pocket_pivot",
+]
+
+
+def candle_patterns(df):
+    """
+    Every candle pattern for every bar of an OHLCV frame, as booleans.
+    """
+
+    open_ = df["open"].to_numpy(dtype=np.float64)
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy(dtype=np.float64)
+    volume = df["volume"].to_numpy(dtype=np.float64)
+
+    return pd.DataFrame({
+        "inside_bar": inside_bar(high, low),
+        "nr7": nr7(high, low),
+        "bullish_engulfing": bullish_engulfing(open_, close),
+        "bearish_engulfing": bearish_engulfing(open_, close),
+        "pocket_pivot": pocket_pivot(close, volume),
+    }, index=df.index)[CANDLE_PATTERNS]
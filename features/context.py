@@ -0,0 +1,117 @@
+import numpy as np
+
+from utils.bars import float64_frame
+from utils.instrumentation import count
+
+
+# -------------------------
+# FEATURE CONTEXT
+# -------------------------
+# The scan asks for the same derived values many times per symbol: the
+# EMA(10)/EMA(15) pair in the uptrend filter, is_uptrend and
+# ema_trend_strength; tail(n) windows in every helper; the 50-bar
+# resistance in predict and in the pattern / rejection checks. A
+# FeatureContext wraps one symbol's bars and computes each of those
+# once. The feature functions accept either a DataFrame or a context
+# (as_context), so callers that only make one call keep passing frames.
+class FeatureContext:
+    """
+    Lazily computed, memoized series and scalars for one symbol's bars.
+
+    The bars are held as float64 (utils/bars.py) and are never
+    modified. Indicator columns the frame already carries (ema_10,
+    atr_14, ...) are used instead of being recomputed.
+
+    stats: {name: [hits, misses]} per derived value; totals also go to
+    utils.instrumentation as cache.features.hit / miss.
+    """
+
+    def __init__(self, df, symbol=None):
+        self.df = float64_frame(df)
+        self.symbol = symbol
+        self._values = {}
+        self.stats = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    def memo(self, key, compute):
+        """
+        The value for `key`, computed by compute() on first use.
+        """
+
+        name = key[0] if isinstance(key, tuple) else key
+        entry = self.stats.setdefault(name, [0, 0])
+
+        if key in self._values:
+            entry[0] += 1
+            count("cache.features.hit")
+            return self._values[key]
+
+        entry[1] += 1
+        count("cache.features.miss")
+        value = self._values[key] = compute()
+        return value
+
+    def hits(self):
+        return sum(entry[0] for entry in self.stats.values())
+
+    def misses(self):
+        return sum(entry[1] for entry in self.stats.values())
+
+    # ---- windows ----
+    def tail(self, lookback):
+        return self.memo(("tail", lookback), lambda: self.df.tail(lookback))
+
+    def last(self, column):
+        return self.memo(("last", column), lambda: self.df[column].iloc[-1])
+
+    # ---- indicator series ----
+    def _column_or(self, column, compute):
+        if column in self.df.columns:
+            return self.df[column]
+        return compute()
+
+    def ema(self, span):
+        from features.indicators import ema
+        return self.memo(("ema", span), lambda: self._column_or(f"ema_{span}", lambda: ema(self.df["close"], span)))
+
+    def atr(self, period=14):
+        from features.indicators import atr
+        return self.memo(("atr", period), lambda: self._column_or(f"atr_{period}", lambda: atr(self.df, period)))
+
+    def rsi(self, period=14):
+        from features.indicators import rsi
+        return self.memo(("rsi", period), lambda: self._column_or(f"rsi_{period}", lambda: rsi(self.df["close"], period)))
+
+    def adx(self, period=14):
+        from features.indicators import adx
+        return self.memo(("adx", period), lambda: self._column_or(f"adx_{period}", lambda: adx(self.df, period)))
+
+    def log_returns(self):
+        close = self.df["close"]
+        return self.memo("log_returns", lambda: np.log(close / close.shift(1)))
+
+    # ---- scalars ----
+    def resistance(self, lookback=50):
+        """
+        Max high over the last `lookback` bars, None with fewer bars
+        (utils.helpers.compute_resistance).
+        """
+
+        def compute():
+            if len(self) < lookback:
+                return None
+            return self.tail(lookback)["high"].max()
+
+        return self.memo(("resistance", lookback), compute)
+
+
+def as_context(df):
+    """
+    `df` if it already is a FeatureContext, else a new one wrapping it.
+    """
+
+    if isinstance(df, FeatureContext):
+        return df
+    return FeatureContext(df)
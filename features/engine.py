@@ -0,0 +1,511 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from features.market_regime import Benchmark, as_benchmark
+from utils.bars import working_frame
+
+
+# -------------------------
+# WINDOW HELPERS
+# -------------------------
+# The scalar feature functions use df.tail(n).mean()/max()/std(). Per-bar
+# values are computed over the same windows with the same arithmetic
+# (sum then divide, NaN skipped) so the last row matches them exactly.
+# Bars with fewer than n rows of history use the shorter window, which
+# is what tail(n) returns.
+def _windows(values, n):
+    """
+    Returns an (len(values), n) view of trailing windows, left-padded with NaN.
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    padded = np.concatenate([np.full(n - 1, np.nan), values])
+    return sliding_window_view(padded, n)
+
+
+def rolling_mean(values, n):
+    win = _windows(values, n)
+    mask = np.isnan(win)
+    count = (~mask).sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(mask, 0.0, win).sum(axis=1) / count
+
+
+def rolling_max(values, n):
+    with np.errstate(invalid="ignore"):
+        return pd.Series(values, dtype=np.float64).rolling(n, min_periods=1).max().to_numpy()
+
+
+def rolling_min(values, n):
+    with np.errstate(invalid="ignore"):
+        return pd.Series(values, dtype=np.float64).rolling(n, min_periods=1).min().to_numpy()
+
+
+def rolling_std(values, n):
+    """
+    Sample std (ddof=1) over trailing windows, NaN skipped, like Series.std().
+    """
+
+    win = _windows(values, n)
+    mask = np.isnan(win)
+    count = (~mask).sum(axis=1)
+    filled = np.where(mask, 0.0, win)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg = filled.sum(axis=1) / count
+        sqr = (avg[:, None] - filled) ** 2
+        sqr[mask] = 0.0
+        var = sqr.sum(axis=1) / (count - 1)
+        var[count < 2] = np.nan
+        return np.sqrt(var)
+
+
+def ema_array(values, span):
+    return pd.Series(values, dtype=np.float64).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+# -------------------------
+# PER-BAR FEATURES (ARRAYS)
+# -------------------------
+def uptrend_array(close, lookback=20):
+    """
+    is_uptrend for every bar: EMA(10) > EMA(15) and close > EMA(15).
+    """
+
+    close = np.asarray(close, dtype=np.float64)
+    ema_10 = ema_array(close, 10)
+    ema_15 = ema_array(close, 15)
+
+    enough = np.arange(1, len(close) + 1) >= lookback
+    return enough & (ema_10 > ema_15) & (close > ema_15)
+
+
+def bullish_candles_array(open_, close, lookback=3):
+    bullish = (np.asarray(close) > np.asarray(open_)).astype(np.float64)
+    count = pd.Series(bullish).rolling(lookback, min_periods=1).sum().to_numpy()
+    return count >= (lookback // 2 + 1)
+
+
+def consolidation_array(high, low, lookback=10, threshold=0.03):
+    hi = rolling_max(high, lookback)
+    lo = rolling_min(low, lookback)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        tight = (hi - lo) / lo <= threshold
+
+    return tight & (lo != 0)
+
+
+def volume_support_array(volume, lookback=5, threshold=1.2):
+    recent = rolling_mean(volume, lookback)
+    past = np.concatenate([np.full(lookback, np.nan), recent[:-lookback]])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        supported = recent / past >= threshold
+
+    enough = np.arange(1, len(recent) + 1) >= lookback * 2
+    return (enough & (past != 0) & supported).astype(int)
+
+
+def resistance_array(high, lookback=50):
+    """
+    compute_resistance for every bar (NaN where it would return None).
+    """
+
+    res = rolling_max(high, lookback)
+    enough = np.arange(1, len(res) + 1) >= lookback
+    return np.where(enough, res, np.nan)
+
+
+def near_resistance_array(close, resistance, threshold=0.03):
+    close = np.asarray(close, dtype=np.float64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        near = np.abs(resistance - close) / resistance <= threshold
+
+    return near & (resistance != 0) & ~np.isnan(resistance)
+
+
+def log_returns(close):
+    close = np.asarray(close, dtype=np.float64)
+    shifted = np.concatenate([[np.nan], close[:-1]])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.log(close / shifted)
+
+
+def volatility_squeeze_array(close, lookback=10, avg_lookback=50):
+    log_ret = log_returns(close)
+
+    recent_std = rolling_std(log_ret, lookback)
+    hist_std = rolling_std(log_ret, avg_lookback)
+
+    enough = np.arange(1, len(log_ret) + 1) >= avg_lookback
+    return enough & (recent_std < hist_std * 0.5)
+
+
+def benchmark_arrays(nifty_df):
+    """
+    (dates, close) arrays of a NIFTY frame or Benchmark, (None, None)
+    without one.
+    """
+
+    benchmark = as_benchmark(nifty_df)
+    if benchmark is None:
+        return None, None
+    return benchmark.dates, benchmark.close
+
+
+def rs_array(dates, close, nifty_dates, nifty_close, lookback=50):
+    """
+    calculate_rs for every bar. Bars the benchmark did not trade on carry
+    the value of the last shared date, as slicing and merging would.
+    """
+
+    n = len(close)
+    if nifty_close is None or len(nifty_close) < lookback:
+        return np.zeros(n)
+
+    benchmark = Benchmark(nifty_dates, nifty_close)
+    pos = benchmark.positions(dates)
+    shared = pos >= 0
+    if not shared.any():
+        return np.zeros(n)
+
+    # The inner join of the two series, in stock order
+    s = np.asarray(close, dtype=np.float64)[shared]
+    m = benchmark.close[pos[shared]]
+
+    rs = np.full(len(s), 0.0)
+    if len(s) >= lookback:
+        k = lookback - 1
+        rs[k:] = np.round((s[k:] / s[:-k]) / (m[k:] / m[:-k]), 3)
+
+    # Map each stock bar to the last shared bar on or before it
+    last_shared = np.cumsum(shared) - 1
+    return np.where(last_shared >= 0, rs[np.clip(last_shared, 0, None)], 0.0)
+
+
+# -------------------------
+# FULL-HISTORY ENGINE
+# -------------------------
+FEATURE_COLUMNS = [
+    "uptrend",
+    "bullish_candles",
+    "consolidation",
+    "volume_support",
+    "resistance",
+    "near_resistance",
+    "volatility_squeeze",
+    "rs",
+]
+
+
+def compute_feature_arrays(open_, high, low, close, volume, dates=None, nifty_dates=None, nifty_close=None):
+    """
+    Computes every scalar feature for every bar in one pass over the arrays.
+    Row i equals the scalar function evaluated on the first i+1 bars.
+
+    Returns:
+        dict: column name -> np.ndarray (see FEATURE_COLUMNS)
+    """
+
+    resistance = resistance_array(high)
+
+    features = {
+        "uptrend": uptrend_array(close),
+        "bullish_candles": bullish_candles_array(open_, close),
+        "consolidation": consolidation_array(high, low),
+        "volume_support": volume_support_array(volume),
+        "resistance": resistance,
+        "near_resistance": near_resistance_array(close, resistance),
+        "volatility_squeeze": volatility_squeeze_array(close),
+    }
+
+    if dates is not None and nifty_dates is not None:
+        features["rs"] = rs_array(dates, close, nifty_dates, nifty_close)
+    else:
+        features["rs"] = np.zeros(len(close))
+
+    return features
+
+
+def compute_feature_frame(df, nifty_df=None):
+    """
+    DataFrame wrapper around compute_feature_arrays.
+    The input frame is not modified; the result shares its index.
+    """
+
+    df = working_frame(df)
+
+    nifty_dates, nifty_close = benchmark_arrays(nifty_df)
+
+    features = compute_feature_arrays(
+        df["open"].to_numpy(),
+        df["high"].to_numpy(),
+        df["low"].to_numpy(),
+        df["close"].to_numpy(),
+        df["volume"].to_numpy(),
+        dates=df["date"].to_numpy() if "date" in df.columns else None,
+        nifty_dates=nifty_dates,
+        nifty_close=nifty_close,
+    )
+
+    return pd.DataFrame(features, index=df.index)[FEATURE_COLUMNS]
+
+
+# -------------------------
+# FULL SELECTION (rank_today per bar)
+# -------------------------
+# Per-bar versions of the remaining checks in ranking.rank_today.prepare_symbol
+# and ml.predict.extract_features, so a backtest or training run can replay
+# the daily selection on every historical day in one pass.
+def liquidity_array(volume, min_avg_volume=1_000_000, lookback=20):
+    enough = np.arange(1, len(volume) + 1) >= lookback
+    with np.errstate(invalid="ignore"):
+        return enough & (rolling_mean(volume, lookback) >= min_avg_volume)
+
+
+def in_uptrend_array(close, lookback=20):
+    """
+    features.trend.in_uptrend for every bar.
+    """
+
+    close = np.asarray(close, dtype=np.float64)
+    ema_10 = ema_array(close, 10)
+    ema_15 = ema_array(close, 15)
+
+    enough = np.arange(1, len(close) + 1) >= lookback
+    return enough & (close > ema_10) & (close > ema_15) & (ema_10 >= ema_15)
+
+
+def ema_trend_strength_array(close, lookback=20):
+    close = np.asarray(close, dtype=np.float64)
+    ema_10 = ema_array(close, 10)
+    ema_15 = ema_array(close, 15)
+
+    enough = np.arange(1, len(close) + 1) >= lookback
+    return np.where(enough, (ema_10 - ema_15) / ema_15, 0.0)
+
+
+def rsi_array(close, period=14):
+    from features.indicators import add_rsi
+
+    df = pd.DataFrame({"close": np.asarray(close, dtype=np.float64)})
+    return add_rsi(df, period)[f"rsi_{period}"].to_numpy()
+
+
+def atr_array(high, low, close, period=14):
+    # features.indicators.atr: the largest of the three ranges, NaN skipped
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    with np.errstate(invalid="ignore"):
+        tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+    return pd.Series(tr).rolling(period).mean().to_numpy()
+
+
+def adx_array(high, low, close, period=14):
+    from features.indicators import add_adx
+
+    df = pd.DataFrame({
+        "high": np.asarray(high, dtype=np.float64),
+        "low": np.asarray(low, dtype=np.float64),
+        "close": np.asarray(close, dtype=np.float64),
+    })
+    return add_adx(df, period)[f"adx_{period}"].to_numpy()
+
+
+def weekly_trend_array(dates, close, span=20):
+    """
+    The weekly trend check of extract_features for every bar: on bar i the
+    current (partial) week closes at close[i], and the trend is up if that
+    close is above the weekly EMA(span) including it. True until more than
+    `span` weekly rows exist.
+
+    Completed weeks are smoothed once with pandas; the partial-week step
+    repeats pandas' adjust=False update so the values match exactly.
+    """
+
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+
+    days = pd.to_datetime(dates).to_numpy(dtype="datetime64[D]")
+
+    # resample("W") bins end on Sunday; weekday 0 is Monday
+    weekday = (days.astype(np.int64) + 3) % 7
+    week_end = days + (6 - weekday)
+    week = ((week_end - week_end[0]).astype(np.int64) // 7).astype(np.int64)
+
+    # Last close of each completed week (NaN for weeks without bars)
+    n_weeks = week[-1] + 1
+    weekly_close = np.full(n_weeks, np.nan)
+    weekly_close[week] = close
+
+    weekly_ema = pd.Series(weekly_close).ewm(span=span, adjust=False).mean().to_numpy()
+
+    alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+    decay = 1.0 - alpha
+
+    # Weight pandas carries into week k: decayed once more for every
+    # empty week in between
+    valid = ~np.isnan(weekly_close)
+    old_wt = np.full(n_weeks, decay)
+    for k in range(1, n_weeks):
+        if not valid[k - 1]:
+            old_wt[k] = old_wt[k - 1] * decay
+
+    prev = np.concatenate([[np.nan], weekly_ema[:-1]])[week]
+    wt = old_wt[week]
+
+    current = np.where(
+        prev == close,
+        prev,
+        (wt * prev + alpha * close) / (wt + alpha),
+    )
+    current = np.where(week == 0, close, current)
+
+    enough = week + 1 > span
+    return np.where(enough, close > current, True)
+
+
+def rejection_array(open_, high, low, close, lookback=3, wick_ratio_threshold=0.4):
+    """
+    has_rejection_near_resistance for every bar: 2+ rejection candles in
+    the last `lookback` bars.
+    """
+
+    from features.candles import rejection_count
+
+    return rejection_count(open_, high, low, close, lookback, wick_ratio_threshold) >= 2
+
+
+SELECTION_COLUMNS = [
+    "eligible",
+    "pattern",
+    "rule_score",
+    "volume_support",
+    "rejection",
+    "close",
+    "atr_14",
+]
+
+
+def compute_selection_arrays(open_, high, low, close, volume, dates, nifty_dates=None, nifty_close=None,
+                             financial_score=0.0, min_bars=100):
+    """
+    compute_selection_frame on plain float64 arrays (e.g. read-only views
+    from utils/bar_store.py), which are not copied or modified.
+
+    Returns:
+        dict: column name -> np.ndarray (SELECTION_COLUMNS, then the ML
+        features in ml.predict.FEATURE_NAMES order)
+    """
+
+    from features.patterns import classify_pattern_array
+    from ml.predict import FEATURE_NAMES
+
+    base = compute_feature_arrays(
+        open_, high, low, close, volume,
+        dates=dates, nifty_dates=nifty_dates, nifty_close=nifty_close,
+    )
+
+    uptrend = base["uptrend"]
+    bullish = base["bullish_candles"]
+    consolidation = base["consolidation"]
+    volume_support = base["volume_support"]
+    near_res = base["near_resistance"]
+
+    rsi = rsi_array(close)
+    with np.errstate(invalid="ignore"):
+        strong_trend = adx_array(high, low, close) > 25
+
+    weekly_trend = weekly_trend_array(dates, close)
+    rejection = rejection_array(open_, high, low, close)
+
+    pattern = classify_pattern_array(uptrend, bullish, consolidation, volume_support, near_res, rejection, rsi)
+
+    rule_score = (
+        2 * uptrend
+        + bullish.astype(int)
+        + consolidation.astype(int)
+        + volume_support
+        + near_res.astype(int)
+        + strong_trend.astype(int)
+        + weekly_trend.astype(int)
+        + base["volatility_squeeze"].astype(int)
+        + (base["rs"] > 1.05).astype(int)
+    )
+    rule_score = np.minimum(rule_score, 10)
+
+    enough = np.arange(1, len(close) + 1) >= min_bars
+    liquid = liquidity_array(volume)
+
+    eligible = enough & liquid & in_uptrend_array(close) & (pattern != None)  # noqa: E711
+
+    features = np.column_stack([
+        rule_score / 10,
+        ema_trend_strength_array(close),
+        bullish.astype(int),
+        consolidation.astype(int),
+        volume_support,
+        near_res.astype(int),
+        np.full(len(close), float(financial_score)),
+        np.zeros(len(close)),
+    ])
+
+    columns = {
+        "eligible": eligible,
+        "pattern": pattern,
+        "rule_score": rule_score,
+        "volume_support": volume_support,
+        "rejection": rejection.astype(int),
+        "close": np.asarray(close, dtype=np.float64),
+        "atr_14": atr_array(high, low, close, 14),
+    }
+    for i, name in enumerate(FEATURE_NAMES):
+        columns[name] = features[:, i]
+
+    return columns
+
+
+def compute_selection_frame(df, nifty_df=None, financial_score=0.0, min_bars=100):
+    """
+    Replays ranking.rank_today.prepare_symbol on every bar of one symbol:
+    row i holds what prepare_symbol would return for the first i+1 bars
+    (before the market-regime filter, which depends only on the date).
+
+    Historical quarterly results are not available, so every bar uses the
+    same `financial_score` (0.0 = Neutral).
+
+    Returns:
+        pd.DataFrame: SELECTION_COLUMNS plus the ML features
+        (ml.predict.FEATURE_NAMES), indexed like df. `eligible` marks the
+        bars that pass every filter and have a pattern.
+    """
+
+    df = working_frame(df)
+
+    nifty_dates, nifty_close = benchmark_arrays(nifty_df)
+
+    columns = compute_selection_arrays(
+        df["open"].to_numpy(dtype=np.float64),
+        df["high"].to_numpy(dtype=np.float64),
+        df["low"].to_numpy(dtype=np.float64),
+        df["close"].to_numpy(dtype=np.float64),
+        df["volume"].to_numpy(dtype=np.float64),
+        df["date"].to_numpy(),
+        nifty_dates=nifty_dates,
+        nifty_close=nifty_close,
+        financial_score=financial_score,
+        min_bars=min_bars,
+    )
+
+    return pd.DataFrame(columns, index=df.index)
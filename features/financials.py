@@ -1,11 +1,19 @@
+import logging
+
 import pandas as pd
 
+from utils.financials_loader import get_quarterly_financials
+
+logger = logging.getLogger(__name__)
+
+
 def analyze_quarterly_financials(financials_df):
     """
     Analyzes the quarterly financials to determine if the performance is "Good", "Bad", or "Neutral".
 
     Args:
-        financials_df (pd.DataFrame): DataFrame with quarterly financial data from yfinance.
+        financials_df (pd.DataFrame or str): DataFrame with quarterly financial data from yfinance,
+            or a ticker symbol, in which case the data is read through the financials cache.
 
     Returns:
         dict: A dictionary containing 'financial_label' ("Good", "Bad", "Neutral") and
@@ -16,17 +24,20 @@ def analyze_quarterly_financials(financials_df):
         "financial_score": 0.0
     }
 
+    if isinstance(financials_df, str):
+        financials_df = get_quarterly_financials(financials_df)
+
     if financials_df is None:
-        print("DEBUG: Financials dataframe is None.")
+        logger.debug("Financials dataframe is None.")
         return result
     if financials_df.empty:
-        print("DEBUG: Financials dataframe is empty.")
+        logger.debug("Financials dataframe is empty.")
         return result
 
     try:
         # yfinance quarterly_financials has the most recent quarter as the first column.
         if len(financials_df.columns) < 2:
-            print(f"DEBUG: Not enough quarterly data to compare (columns: {len(financials_df.columns)}).")
+            logger.debug(f"Not enough quarterly data to compare (columns: {len(financials_df.columns)}).")
             return result
             
         # Get the two most recent quarters
@@ -52,7 +63,7 @@ def analyze_quarterly_financials(financials_df):
             latest_revenue = float(latest_revenue)
             previous_revenue = float(previous_revenue)
         except Exception as conversion_e:
-            print(f"DEBUG: Could not convert revenue to float: {conversion_e}")
+            logger.debug(f"Could not convert revenue to float: {conversion_e}")
             return {"financial_label": "Neutral (TypeErr)", "financial_score": 0.0}
 
         if previous_revenue == 0:
@@ -74,7 +85,7 @@ def analyze_quarterly_financials(financials_df):
             result["financial_score"] = (score - 0.5) * 0.2
 
     except Exception as e:
-        print(f"Could not analyze financial data: {e}")
+        logger.warning(f"Could not analyze financial data: {e}")
         # Return neutral if any error occurs
         return {
             "financial_label": f"Neutral ({type(e).__name__})",
@@ -0,0 +1,607 @@
+import json
+import math
+import os
+from collections import deque
+
+import pandas as pd
+
+
+STATE_DIR = os.path.join("data", "cache", "state")
+
+NAN = float("nan")
+
+
+def _isnan(x):
+    return x != x
+
+
+# -------------------------
+# BUILDING BLOCKS
+# -------------------------
+# Each indicator holds only what it needs to produce the next value, takes
+# one bar per update() in O(1) (amortised for RollingMax), and round-trips
+# through state() / from_state() as plain JSON-able values. The arithmetic
+# follows pandas' own ewm/rolling kernels, so values match the batch
+# functions in features/indicators.py.
+class EWM:
+    """
+    Series.ewm(alpha=..., adjust=False, min_periods=...).mean(), one value
+    at a time. NaN inputs are skipped like pandas does (ignore_na=False).
+    """
+
+    def __init__(self, alpha, min_periods=0):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x):
+        is_observation = not _isnan(x)
+        self.nobs += is_observation
+
+        if not _isnan(self.weighted):
+            self.old_wt *= 1.0 - self.alpha
+            if is_observation:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + self.alpha * x) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif is_observation:
+            self.weighted = x
+
+        return self.value
+
+    @property
+    def value(self):
+        return self.weighted if self.nobs >= max(self.min_periods, 1) else NAN
+
+    def state(self):
+        return {"alpha": self.alpha, "min_periods": self.min_periods,
+                "weighted": self.weighted, "old_wt": self.old_wt, "nobs": self.nobs}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state["alpha"], state["min_periods"])
+        obj.weighted, obj.old_wt, obj.nobs = state["weighted"], state["old_wt"], state["nobs"]
+        return obj
+
+
+class RollingSum:
+    """
+    Series.rolling(n).sum() / .mean() over the last n bars, kept as a
+    compensated running sum (as pandas does). NaN inputs occupy a slot
+    but do not count; the value is NaN until min_periods real values
+    are in the window.
+    """
+
+    def __init__(self, n, min_periods=None):
+        self.n = n
+        self.min_periods = n if min_periods is None else min_periods
+        self.window = deque()
+        self.total = 0.0
+        # pandas compensates additions and removals separately
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.nobs = 0
+        # pandas returns exact results for runs of one repeated value and
+        # clamps means of all-positive / all-negative windows
+        self.neg_ct = 0
+        self.prev_value = NAN
+        self.same_run = 0
+
+    def _add(self, x):
+        if _isnan(x):
+            return
+        self.nobs += 1
+        y = x - self.comp_add
+        t = self.total + y
+        self.comp_add = t - self.total - y
+        self.total = t
+
+        if x < 0:
+            self.neg_ct += 1
+        self.same_run = self.same_run + 1 if x == self.prev_value else 1
+        self.prev_value = x
+
+    def _remove(self, x):
+        if _isnan(x):
+            return
+        self.nobs -= 1
+        y = -x - self.comp_remove
+        t = self.total + y
+        self.comp_remove = t - self.total - y
+        self.total = t
+        if x < 0:
+            self.neg_ct -= 1
+
+    def update(self, x):
+        x = float(x)
+        if len(self.window) == self.n:
+            self._remove(self.window.popleft())
+        self.window.append(x)
+        self._add(x)
+        return self.sum
+
+    @property
+    def sum(self):
+        if self.nobs < max(self.min_periods, 1):
+            return NAN
+        if self.same_run >= self.nobs:
+            return self.prev_value * self.nobs
+        return self.total
+
+    @property
+    def mean(self):
+        if self.nobs < max(self.min_periods, 1):
+            return NAN
+        if self.same_run >= self.nobs:
+            return self.prev_value
+
+        result = self.total / self.nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+    def state(self):
+        return {"n": self.n, "min_periods": self.min_periods, "window": list(self.window),
+                "total": self.total, "comp_add": self.comp_add, "comp_remove": self.comp_remove,
+                "nobs": self.nobs,
+                "neg_ct": self.neg_ct, "prev_value": self.prev_value, "same_run": self.same_run}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state["n"], state["min_periods"])
+        obj.window = deque(state["window"])
+        obj.total, obj.nobs = state["total"], state["nobs"]
+        obj.comp_add, obj.comp_remove = state["comp_add"], state["comp_remove"]
+        obj.neg_ct, obj.prev_value, obj.same_run = state["neg_ct"], state["prev_value"], state["same_run"]
+        return obj
+
+
+class RollingMax:
+    """
+    Series.rolling(n, min_periods=1).max(): a monotonic queue of
+    (bar number, value), so each update is amortised O(1).
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.count = 0
+        self.queue = deque()
+
+    def update(self, x):
+        x = float(x)
+        i = self.count
+        self.count += 1
+
+        if not _isnan(x):
+            while self.queue and self.queue[-1][1] <= x:
+                self.queue.pop()
+            self.queue.append((i, x))
+
+        while self.queue and self.queue[0][0] <= i - self.n:
+            self.queue.popleft()
+
+        return self.value
+
+    @property
+    def value(self):
+        return self.queue[0][1] if self.queue else NAN
+
+    def state(self):
+        return {"n": self.n, "count": self.count, "queue": [list(item) for item in self.queue]}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state["n"])
+        obj.count = state["count"]
+        obj.queue = deque((int(i), x) for i, x in state["queue"])
+        return obj
+
+
+# -------------------------
+# INDICATORS
+# -------------------------
+class IncrementalEMA:
+    """
+    features.indicators.ema(close, span).
+    """
+
+    def __init__(self, span):
+        self.span = span
+        # Same alpha arithmetic as pandas: 1 / (1 + com), com = (span - 1) / 2
+        self.ewm = EWM(1.0 / (1.0 + (span - 1) / 2.0))
+
+    def update(self, close):
+        return self.ewm.update(float(close))
+
+    @property
+    def value(self):
+        return self.ewm.value
+
+    def state(self):
+        return {"span": self.span, "ewm": self.ewm.state()}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state["span"])
+        obj.ewm = EWM.from_state(state["ewm"])
+        return obj
+
+
+def _true_range(high, low, prev_close):
+    # max(skipna) of the three ranges, as atr() computes it
+    ranges = [high - low, abs(high - prev_close), abs(low - prev_close)]
+    ranges = [r for r in ranges if not _isnan(r)]
+    return max(ranges) if ranges else NAN
+
+
+class IncrementalATR:
+    """
+    features.indicators.atr(df, period): simple mean of the true range.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = NAN
+        self.tr = RollingSum(period)
+
+    def update(self, high, low, close):
+        self.tr.update(_true_range(float(high), float(low), self.prev_close))
+        self.prev_close = float(close)
+        return self.value
+
+    @property
+    def value(self):
+        return self.tr.mean
+
+    def state(self):
+        return {"period": self.period, "prev_close": self.prev_close, "tr": self.tr.state()}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state["period"])
+        obj.prev_close = state["prev_close"]
+        obj.tr = RollingSum.from_state(state["tr"])
+        return obj
+
+
+class IncrementalRSI:
+    """
+    features.indicators.add_rsi: Wilder smoothing of gains and losses.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = NAN
+        alpha = 1.0 / (1.0 + (period - 1))
+        self.up = EWM(alpha, min_periods=period)
+        self.down = EWM(alpha, min_periods=period)
+
+    def update(self, close):
+        close = float(close)
+        delta = close - self.prev_close
+        self.prev_close = close
+
+        if _isnan(delta):
+            self.up.update(NAN)
+            self.down.update(NAN)
+        else:
+            self.up.update(max(delta, 0.0))
+            self.down.update(-1 * min(delta, 0.0))
+
+        return self.value
+
+    @property
+    def value(self):
+        up, down = self.up.value, self.down.value
+        if _isnan(up) or _isnan(down):
+            return NAN
+        if down == 0:
+            return 100.0 if up > 0 else NAN
+        return 100 - (100 / (1 + up / down))
+
+    def state(self):
+        return {"period": self.period, "prev_close": self.prev_close,
+                "up": self.up.state(), "down": self.down.state()}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state["period"])
+        obj.prev_close = state["prev_close"]
+        obj.up = EWM.from_state(state["up"])
+        obj.down = EWM.from_state(state["down"])
+        return obj
+
+
+class IncrementalADX:
+    """
+    features.indicators.add_adx, including its directional-movement
+    definition (minus_dm is the raw low.diff()).
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_high = NAN
+        self.prev_low = NAN
+        self.prev_close = NAN
+        self.tr = RollingSum(period)
+        self.plus_dm = RollingSum(period)
+        self.minus_dm = RollingSum(period)
+        self.dx = RollingSum(period)
+
+    def update(self, high, low, close):
+        high, low, close = float(high), float(low), float(close)
+
+        plus_dm = high - self.prev_high
+        minus_dm = low - self.prev_low
+
+        plus = plus_dm if (plus_dm > minus_dm and plus_dm > 0) else 0.0
+        minus = -minus_dm if (minus_dm > plus_dm and minus_dm > 0) else 0.0
+
+        tr = self.tr.update(_true_range(high, low, self.prev_close))
+        plus_sum = self.plus_dm.update(plus)
+        minus_sum = self.minus_dm.update(minus)
+
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+
+        plus_di = 100 * _div(plus_sum, tr)
+        minus_di = 100 * _div(minus_sum, tr)
+        dx = _div(100 * abs(plus_di - minus_di), plus_di + minus_di)
+
+        self.dx.update(dx)
+        return self.value
+
+    @property
+    def value(self):
+        return self.dx.mean
+
+    def state(self):
+        return {
+            "period": self.period,
+            "prev": [self.prev_high, self.prev_low, self.prev_close],
+            "tr": self.tr.state(),
+            "plus_dm": self.plus_dm.state(),
+            "minus_dm": self.minus_dm.state(),
+            "dx": self.dx.state(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state["period"])
+        obj.prev_high, obj.prev_low, obj.prev_close = state["prev"]
+        obj.tr = RollingSum.from_state(state["tr"])
+        obj.plus_dm = RollingSum.from_state(state["plus_dm"])
+        obj.minus_dm = RollingSum.from_state(state["minus_dm"])
+        obj.dx = RollingSum.from_state(state["dx"])
+        return obj
+
+
+def _div(a, b):
+    # pandas semantics: x/0 is +-inf, 0/0 and NaN operands are NaN
+    if _isnan(a) or _isnan(b):
+        return NAN
+    if b == 0:
+        return NAN if a == 0 else math.copysign(math.inf, a)
+    return a / b
+
+
+class WeeklyTrend:
+    """
+    The weekly trend check of extract_features (close above the EMA(span)
+    of weekly closes, weeks ending Sunday, the current week closing at the
+    latest bar). Completed weeks are folded into an EWM as they end; empty
+    weeks count as missing observations, as resample() produces them.
+    """
+
+    def __init__(self, span=20):
+        self.span = span
+        self.ewm = EWM(1.0 / (1.0 + (span - 1) / 2.0))
+        self.first_week = None
+        self.week = None
+        self.close = NAN
+
+    @staticmethod
+    def _week_of(date):
+        # Monday-to-Sunday weeks, numbered from Monday 1970-01-05
+        days = (pd.Timestamp(date).normalize() - pd.Timestamp("1970-01-05")).days
+        return days // 7
+
+    def update(self, date, close):
+        week = self._week_of(date)
+
+        if self.week is None:
+            self.first_week = week
+        elif week > self.week:
+            self.ewm.update(self.close)
+            for _ in range(week - self.week - 1):
+                self.ewm.update(NAN)
+
+        self.week = week
+        self.close = float(close)
+        return self.value
+
+    @property
+    def value(self):
+        if self.week is None:
+            return True
+
+        if self.week - self.first_week + 1 <= self.span:
+            return True
+
+        current = EWM.from_state(self.ewm.state())
+        return self.close > current.update(self.close)
+
+    def state(self):
+        return {"span": self.span, "ewm": self.ewm.state(), "first_week": self.first_week,
+                "week": self.week, "close": self.close}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state["span"])
+        obj.ewm = EWM.from_state(state["ewm"])
+        obj.first_week, obj.week, obj.close = state["first_week"], state["week"], state["close"]
+        return obj
+
+
+# -------------------------
+# PER-SYMBOL STATE
+# -------------------------
+_KINDS = {
+    "EMA": IncrementalEMA,
+    "ATR": IncrementalATR,
+    "RSI": IncrementalRSI,
+    "ADX": IncrementalADX,
+    "SUM": RollingSum,
+    "MAX": RollingMax,
+    "WEEKLY": WeeklyTrend,
+}
+
+
+class SymbolState:
+    """
+    The daily indicator set of one symbol (EMA 10/15, ATR 14, RSI 14,
+    ADX 14, 20-bar volume sum, 50-bar high) plus the date of the last bar
+    it has seen. update() takes one bar; advance() feeds only the bars of
+    a frame that are newer than that date.
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.last_date = None
+        self.bars = 0
+        self.indicators = {
+            "ema_10": IncrementalEMA(10),
+            "ema_15": IncrementalEMA(15),
+            "atr_14": IncrementalATR(14),
+            "rsi_14": IncrementalRSI(14),
+            "adx_14": IncrementalADX(14),
+            "volume_20": RollingSum(20),
+            "high_50": RollingMax(50),
+        }
+
+    def update(self, date, open_, high, low, close, volume):
+        ind = self.indicators
+        ind["ema_10"].update(close)
+        ind["ema_15"].update(close)
+        ind["atr_14"].update(high, low, close)
+        ind["rsi_14"].update(close)
+        ind["adx_14"].update(high, low, close)
+        ind["volume_20"].update(volume)
+        ind["high_50"].update(high)
+
+        self.last_date = pd.Timestamp(date)
+        self.bars += 1
+        return self.values()
+
+    def advance(self, df):
+        """
+        Feeds the bars of df (load_daily_data layout) dated after
+        last_date. Returns the number of new bars.
+        """
+
+        new = df
+        if self.last_date is not None:
+            new = df[pd.to_datetime(df["date"]) > self.last_date]
+
+        for row in new[["date", "open", "high", "low", "close", "volume"]].itertuples(index=False):
+            self.update(*row)
+
+        return len(new)
+
+    def values(self):
+        ind = self.indicators
+        return {
+            "ema_10": ind["ema_10"].value,
+            "ema_15": ind["ema_15"].value,
+            "atr_14": ind["atr_14"].value,
+            "rsi_14": ind["rsi_14"].value,
+            "adx_14": ind["adx_14"].value,
+            "avg_volume_20": ind["volume_20"].mean,
+            "high_50": ind["high_50"].value,
+        }
+
+    def state(self):
+        return {
+            "symbol": self.symbol,
+            "last_date": self.last_date.strftime("%Y-%m-%d") if self.last_date is not None else None,
+            "bars": self.bars,
+            "indicators": {
+                name: {"kind": _kind_of(obj), "state": obj.state()}
+                for name, obj in self.indicators.items()
+            },
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state["symbol"])
+        obj.last_date = pd.Timestamp(state["last_date"]) if state["last_date"] else None
+        obj.bars = state["bars"]
+        obj.indicators = {
+            name: _KINDS[entry["kind"]].from_state(entry["state"])
+            for name, entry in state["indicators"].items()
+        }
+        return obj
+
+
+def _kind_of(obj):
+    for kind, cls in _KINDS.items():
+        if type(obj) is cls:
+            return kind
+    raise TypeError(f"Unknown indicator type: {type(obj).__name__}")
+
+
+def _state_path(symbol, state_dir):
+    safe = symbol.replace("^", "_").replace("/", "_")
+    return os.path.join(state_dir, f"{safe}.json")
+
+
+def save_state(state, state_dir=None):
+    state_dir = state_dir or STATE_DIR
+    os.makedirs(state_dir, exist_ok=True)
+
+    path = _state_path(state.symbol, state_dir)
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "w") as f:
+        json.dump(state.state(), f)
+
+    os.replace(tmp_path, path)
+
+
+def load_state(symbol, state_dir=None):
+    """
+    Returns the saved SymbolState, or None if there is none (or it is
+    unreadable).
+    """
+
+    path = _state_path(symbol, state_dir or STATE_DIR)
+
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path) as f:
+            return SymbolState.from_state(json.load(f))
+    except Exception as e:
+        print(f"Warning: Indicator state unreadable for {symbol}, rebuilding: {e}")
+        return None
+
+
+def update_symbol_state(symbol, df, state_dir=None):
+    """
+    Loads the symbol's saved state (or starts a new one), feeds it the
+    bars of df it has not seen and saves it. Returns the state.
+
+    df should come from the bar cache, so the history before the saved
+    date is the same one the state was built from.
+    """
+
+    state = load_state(symbol, state_dir) or SymbolState(symbol)
+
+    if state.advance(df):
+        save_state(state, state_dir)
+
+    return state
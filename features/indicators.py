@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from features.context import as_context
+
 
 # -------------------------
 # EMA CORE
@@ -72,16 +74,15 @@ def is_uptrend(df, lookback=20):
     - Close above EMA(15)
     """
 
-    if len(df) < lookback:
+    ctx = as_context(df)
+
+    if len(ctx) < lookback:
         return False
 
-    df = add_ema(df, 10)
-    df = add_ema(df, 15)
+    ema_10 = ctx.ema(10).iloc[-1]
+    ema_15 = ctx.ema(15).iloc[-1]
 
-    return (
-        df["ema_10"].iloc[-1] > df["ema_15"].iloc[-1]
-        and df["close"].iloc[-1] > df["ema_15"].iloc[-1]
-    )
+    return ema_10 > ema_15 and ctx.last("close") > ema_15
 
 
 # -------------------------
@@ -92,32 +93,26 @@ def ema_trend_strength(df):
     Normalized EMA distance (ML feature).
     """
 
-    if len(df) < 20:
+    ctx = as_context(df)
+
+    if len(ctx) < 20:
         return 0.0
 
-    df = add_ema(df, 10)
-    df = add_ema(df, 15)
+    ema_10 = ctx.ema(10).iloc[-1]
+    ema_15 = ctx.ema(15).iloc[-1]
 
-    return float(
-        (df["ema_10"].iloc[-1] - df["ema_15"].iloc[-1])
-        / df["ema_15"].iloc[-1]
-    )
+    return float((ema_10 - ema_15) / ema_15)
 
 
 # -------------------------
 # RSI INDICATOR
 # -------------------------
-def add_rsi(df, period=14):
+def rsi(close, period=14):
     """
-    Adds RSI column.
-    Uses Wilder's Smoothing.
+    RSI series. Uses Wilder's Smoothing.
     """
-    col = f"rsi_{period}"
-    
-    if col in df.columns:
-        return df
 
-    delta = df["close"].diff()
+    delta = close.diff()
     up = delta.clip(lower=0)
     down = -1 * delta.clip(upper=0)
 
@@ -126,7 +121,17 @@ def add_rsi(df, period=14):
     ma_down = down.ewm(com=period - 1, adjust=False, min_periods=period).mean()
 
     rs = ma_up / ma_down
-    df[col] = 100 - (100 / (1 + rs))
+    return 100 - (100 / (1 + rs))
+
+
+def add_rsi(df, period=14):
+    """
+    Adds RSI column.
+    """
+    col = f"rsi_{period}"
+
+    if col not in df.columns:
+        df[col] = rsi(df["close"], period)
 
     return df
 
@@ -134,13 +139,11 @@ def add_rsi(df, period=14):
 # -------------------------
 # ADX INDICATOR
 # -------------------------
-def add_adx(df, period=14):
+def adx(df, period=14):
     """
-    Computes ADX (Trend Strength).
+    ADX series (Trend Strength).
     """
-    if f"adx_{period}" in df.columns:
-        return df
-        
+
     plus_dm = df["high"].diff()
     minus_dm = df["low"].diff()
     
@@ -158,9 +161,16 @@ def add_adx(df, period=14):
     minus_di = 100 * (minus_dm_smooth / tr_smooth)
     
     dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
-    adx = dx.rolling(period).mean()
-    
-    df[f"adx_{period}"] = adx
+    return dx.rolling(period).mean()
+
+
+def add_adx(df, period=14):
+    """
+    Adds ADX column.
+    """
+    if f"adx_{period}" not in df.columns:
+        df[f"adx_{period}"] = adx(df, period)
+
     return df
 
 
@@ -171,12 +181,14 @@ def get_volatility_squeeze(df, lookback=10, avg_lookback=50):
     """
     Returns True if recent volatility (std dev) is < 50% of historical average.
     """
-    if len(df) < avg_lookback:
+    ctx = as_context(df)
+
+    if len(ctx) < avg_lookback:
         return False
-        
-    df["log_ret"] = np.log(df["close"] / df["close"].shift(1))
-    
-    recent_std = df["log_ret"].tail(lookback).std()
-    hist_std = df["log_ret"].tail(avg_lookback).std()
+
+    log_ret = ctx.log_returns()
+
+    recent_std = log_ret.tail(lookback).std()
+    hist_std = log_ret.tail(avg_lookback).std()
     
     return recent_std < (hist_std * 0.5)
@@ -1,3 +1,6 @@
+from features.context import as_context
+
+
 def liquidity_pass(df, min_avg_volume=1_000_000, lookback=20):
     """
     Core liquidity filter:
@@ -7,7 +10,7 @@ def liquidity_pass(df, min_avg_volume=1_000_000, lookback=20):
     if df is None or len(df) < lookback:
         return False
 
-    avg_volume = df["volume"].tail(lookback).mean()
+    avg_volume = as_context(df).tail(lookback)["volume"].mean()
 
     return avg_volume >= min_avg_volume
 
@@ -1,22 +1,43 @@
+import logging
+
+import numpy as np
 import pandas as pd
+from utils.bars import working_frame
 from utils.yf_loader import load_daily_data
+from features.context import as_context
 from features.indicators import add_ema
 
-def get_market_regime():
+logger = logging.getLogger(__name__)
+
+NIFTY_SYMBOL = "^NSEI"
+
+
+def get_market_regime(download=None):
     """
     Fetches NIFTY 50 index (^NSEI) and determines market status.
     Returns:
         nifty_df (pd.DataFrame): DataFrame with columns [date, close, ema_50]
         status (str): "BULLISH" or "BEARISH"
+
+    rank_today loads NIFTY with the universe instead and decides the
+    regime from breadth as well (features/breadth.py).
+    """
+    logger.info("Fetching NIFTY 50 data...")
+    df = load_daily_data(NIFTY_SYMBOL, period="1y", download=download)
+    return nifty_status(df)
+
+
+def nifty_status(df):
+    """
+    BULLISH if NIFTY closes above its 50-day EMA, BEARISH below it.
+    Returns (df with ema_50, status), or (None, "NEUTRAL") with fewer
+    than 50 bars.
     """
-    print("Fetching NIFTY 50 data...")
-    df = load_daily_data("^NSEI", period="1y")
-    
     if df is None or len(df) < 50:
-        print("Warning: Could not fetch NIFTY 50 data. Assuming Neutral/Bullish to allow scan.")
+        logger.warning("Warning: Could not fetch NIFTY 50 data. Assuming Neutral/Bullish to allow scan.")
         return None, "NEUTRAL"
 
-    df = add_ema(df, 50)
+    df = add_ema(working_frame(df), 50)
     current_close = df["close"].iloc[-1]
     ema_50 = df["ema_50"].iloc[-1]
     
@@ -30,22 +51,96 @@ def calculate_rs(stock_df, nifty_df, lookback=50):
     
     Simple implementation: 
     Rel Strength = (Stock/Stock_50d_ago) / (Nifty/Nifty_50d_ago)
+
+    nifty_df may be the NIFTY frame or a Benchmark (as_benchmark); pass a
+    Benchmark when calling this for many symbols, so the NIFTY dates are
+    not converted again for each one.
     """
-    if nifty_df is None or len(nifty_df) < lookback:
+    benchmark = as_benchmark(nifty_df)
+    if benchmark is None or len(benchmark) < lookback:
         return 0.0
     
-    # Align dates (simple merge on date)
-    # Ensure date columns are datetime
-    stock_df["date"] = pd.to_datetime(stock_df["date"])
-    nifty_df["date"] = pd.to_datetime(nifty_df["date"])
-    
-    merged = pd.merge(stock_df[["date", "close"]], nifty_df[["date", "close"]], on="date", how="inner", suffixes=("_stock", "_nifty"))
-    
-    if len(merged) < lookback:
+    # Align dates: the stock's bars on days NIFTY traded (an inner join)
+    df = as_context(stock_df).df
+    pos = benchmark.positions(df["date"])
+    shared = pos >= 0
+
+    if shared.sum() < lookback:
         return 0.0
+
+    stock = df["close"].to_numpy(dtype=np.float64)[shared]
+    nifty = benchmark.close[pos[shared]]
         
-    current_ratio = merged["close_stock"].iloc[-1] / merged["close_stock"].iloc[-lookback]
-    nifty_ratio = merged["close_nifty"].iloc[-1] / merged["close_nifty"].iloc[-lookback]
+    current_ratio = stock[-1] / stock[-lookback]
+    nifty_ratio = nifty[-1] / nifty[-lookback]
     
     rs_score = current_ratio / nifty_ratio
     return round(rs_score, 3)
+
+
+# -------------------------
+# BENCHMARK ALIGNMENT
+# -------------------------
+def _datetime64(dates):
+    values = np.asarray(dates)
+    if values.dtype.kind != "M":
+        values = pd.to_datetime(values).to_numpy()
+    return values.astype("datetime64[ns]", copy=False)
+
+
+class Benchmark:
+    """
+    The NIFTY closes prepared once for relative-strength lookups: sorted
+    datetime64 dates (the trading calendar) and float64 closes. Stock
+    dates are located in it with a binary search instead of a merge per
+    symbol. The inputs are never modified.
+    """
+
+    def __init__(self, dates, close):
+        self.dates = _datetime64(dates)
+        self.close = np.asarray(close, dtype=np.float64)
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df["date"], df["close"])
+
+    def __len__(self):
+        return len(self.dates)
+
+    def positions(self, dates):
+        """
+        Index of each date in the benchmark calendar, -1 where the
+        benchmark has no bar on that date.
+        """
+
+        dates = _datetime64(dates)
+        if len(self.dates) == 0:
+            return np.full(len(dates), -1)
+
+        pos = np.searchsorted(self.dates, dates)
+        found = self.dates[np.minimum(pos, len(self.dates) - 1)] == dates
+        return np.where(found, pos, -1)
+
+    def align(self, dates, close):
+        """
+        `close` on the benchmark calendar: one value per benchmark date,
+        NaN where the stock has no bar. Bars on dates the benchmark did not
+        trade are dropped.
+        """
+
+        pos = self.positions(dates)
+        shared = pos >= 0
+
+        out = np.full(len(self.dates), np.nan)
+        out[pos[shared]] = np.asarray(close, dtype=np.float64)[shared]
+        return out
+
+
+def as_benchmark(nifty_df):
+    """
+    A Benchmark for the NIFTY frame; Benchmarks and None pass through.
+    """
+
+    if nifty_df is None or isinstance(nifty_df, Benchmark):
+        return nifty_df
+    return Benchmark.from_frame(nifty_df)
@@ -0,0 +1,312 @@
+import numpy as np
+import pandas as pd
+
+from features import candles
+
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+# -------------------------
+# 2-D KERNELS (dates x symbols)
+# -------------------------
+# Every kernel takes (T, N) float64 arrays and returns (T, N) arrays.
+# Leading NaN (symbol not listed yet) behave exactly like the symbol's
+# own shorter history, because the pandas kernels used below skip NaN
+# observations and the windows only become valid after the first bar.
+def _as_datetime64(column):
+    # pd.to_datetime is slow on columns that already hold datetimes
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column.to_numpy(dtype="datetime64[ns]")
+    return pd.to_datetime(column).to_numpy(dtype="datetime64[ns]")
+
+
+def _frame(values):
+    return pd.DataFrame(values, copy=False)
+
+
+def window_sum(values, n):
+    """
+    Trailing n-row sums, added in the same order as NumPy's pairwise sum,
+    so they equal series.tail(n).sum() bit for bit. NaN where the window
+    is incomplete. Memory stays O(T x N) regardless of n.
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    T = values.shape[0]
+    out = np.full(values.shape, np.nan)
+    if T < n:
+        return out
+
+    def lag(k):
+        # values[t - n + 1 + k] for every t >= n - 1
+        return values[k:T - n + 1 + k]
+
+    if n < 8:
+        acc = np.zeros_like(lag(0))
+        for k in range(n):
+            acc = acc + lag(k)
+    else:
+        r = [lag(k).copy() for k in range(8)]
+        i = 8
+        while i < n - (n % 8):
+            for j in range(8):
+                r[j] += lag(i + j)
+            i += 8
+        acc = ((r[0] + r[1]) + (r[2] + r[3])) + ((r[4] + r[5]) + (r[6] + r[7]))
+        while i < n:
+            acc = acc + lag(i)
+            i += 1
+
+    out[n - 1:] = acc
+    return out
+
+
+def window_mean(values, n):
+    return window_sum(values, n) / n
+
+
+def ema(close, span):
+    return _frame(close).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def true_range(high, low, close):
+    prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+
+    with np.errstate(invalid="ignore"):
+        return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high, low, close, period=14):
+    return _frame(true_range(high, low, close)).rolling(period).mean().to_numpy()
+
+
+def rsi(close, period=14):
+    delta = _frame(close).diff()
+    up = delta.clip(lower=0)
+    down = -1 * delta.clip(upper=0)
+
+    ma_up = up.ewm(com=period - 1, adjust=False, min_periods=period).mean()
+    ma_down = down.ewm(com=period - 1, adjust=False, min_periods=period).mean()
+
+    return (100 - (100 / (1 + ma_up / ma_down))).to_numpy()
+
+
+def adx(high, low, close, period=14):
+    """
+    Same arithmetic as features.indicators.add_adx, column by column.
+    """
+
+    plus_dm = _frame(high).diff().to_numpy()
+    minus_dm = _frame(low).diff().to_numpy()
+
+    with np.errstate(invalid="ignore"):
+        plus_dm = np.where((plus_dm > minus_dm) & (plus_dm > 0), plus_dm, 0.0)
+        minus_dm = np.where((minus_dm > plus_dm) & (minus_dm > 0), -minus_dm, 0.0)
+
+    tr = true_range(high, low, close)
+
+    tr_smooth = _frame(tr).rolling(period).sum()
+    plus_dm_smooth = _frame(plus_dm).rolling(period).sum()
+    minus_dm_smooth = _frame(minus_dm).rolling(period).sum()
+
+    plus_di = 100 * (plus_dm_smooth / tr_smooth)
+    minus_di = 100 * (minus_dm_smooth / tr_smooth)
+
+    dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return dx.rolling(period).mean().to_numpy()
+
+
+def rolling_high(high, lookback=50):
+    """
+    Max high over the last `lookback` bars (get_recent_high for every bar).
+    """
+
+    return _frame(high).rolling(lookback, min_periods=1).max().to_numpy()
+
+
+def volume_ratio(volume, short=5, long=20):
+    """
+    Mean volume of the last `short` bars over the mean of the last `long`
+    bars, as in utils.helpers.is_volume_supporting. NaN until `long` bars.
+    """
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = window_mean(volume, short) / window_mean(volume, long)
+
+    valid_long = ~np.isnan(window_sum(volume, long))
+    return np.where(valid_long, ratio, np.nan)
+
+
+def breakout_volume_ratio(volume, lookback=5):
+    """
+    Mean volume of the last `lookback` bars over the `lookback` bars before
+    them, as in utils.helpers.volume_supports_breakout.
+    """
+
+    recent = window_mean(volume, lookback)
+    past = np.vstack([np.full((lookback, volume.shape[1]), np.nan), recent[:-lookback]])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return recent / past
+
+
+# -------------------------
+# PANEL
+# -------------------------
+class Panel:
+    """
+    Universe OHLCV history as dates x symbols arrays on a shared calendar.
+
+    Missing bars are NaN. Indicators are computed for all symbols in one
+    call per kernel. Symbols with gaps inside their history (suspensions,
+    bad prints) are recomputed on their own rows, so every symbol gets the
+    same values the per-DataFrame functions return on its own frame.
+    """
+
+    def __init__(self, dates, symbols, open, high, low, close, volume):
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = list(symbols)
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+        self._position = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._valid = ~np.isnan(close)
+        self._gapped = self._find_gaps()
+
+    # ---- construction ----
+    @classmethod
+    def from_frames(cls, frames, calendar=None):
+        """
+        Builds a panel from {symbol: DataFrame} (load_daily_data layout).
+        The calendar defaults to the union of all dates.
+        """
+
+        symbols = [s for s, df in frames.items() if df is not None and not df.empty]
+        dates = {s: _as_datetime64(frames[s]["date"]) for s in symbols}
+
+        if calendar is None:
+            calendar = pd.DatetimeIndex(np.unique(np.concatenate(list(dates.values()))))
+        else:
+            calendar = pd.DatetimeIndex(calendar)
+
+        arrays = {field: np.full((len(calendar), len(symbols)), np.nan) for field in FIELDS}
+
+        for j, symbol in enumerate(symbols):
+            df = frames[symbol]
+            rows = calendar.get_indexer(dates[symbol])
+            keep = rows >= 0
+
+            for field in FIELDS:
+                # Duplicate dates: the later row wins, as in the bar cache
+                arrays[field][rows[keep], j] = df[field].to_numpy(dtype=np.float64)[keep]
+
+        return cls(calendar, symbols, **arrays)
+
+    def _find_gaps(self):
+        # A symbol is gapped if a NaN sits between its first and last bar
+        valid = self._valid
+        count = valid.sum(axis=0)
+        first = np.argmax(valid, axis=0)
+        last = len(valid) - 1 - np.argmax(valid[::-1], axis=0)
+        span = np.where(count > 0, last - first + 1, 0)
+        return np.where(span != count)[0]
+
+    # ---- access ----
+    def frame(self, symbol):
+        """
+        The symbol's own bars as a DataFrame (load_daily_data layout).
+        """
+
+        j = self._position[symbol]
+        rows = self._valid[:, j]
+
+        df = pd.DataFrame({field: getattr(self, field)[rows, j] for field in FIELDS})
+        df.insert(0, "date", self.dates[rows])
+        return df
+
+    def latest(self, values):
+        """
+        Last valid value per symbol of a (T, N) array, as a Series.
+        """
+
+        valid = ~np.isnan(values)
+        last = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+        out = values[last, np.arange(values.shape[1])]
+        out[~valid.any(axis=0)] = np.nan
+        return pd.Series(out, index=self.symbols)
+
+    def _apply(self, kernel, fields, **kwargs):
+        arrays = [getattr(self, field) for field in fields]
+        # Copy: pandas may hand back read-only views
+        out = np.array(kernel(*arrays, **kwargs), dtype=np.float64)
+
+        # Recompute gapped symbols on their own rows
+        for j in self._gapped:
+            rows = self._valid[:, j]
+            column = [a[rows, j:j + 1] for a in arrays]
+            out[:, j] = np.nan
+            out[rows, j] = kernel(*column, **kwargs)[:, 0]
+
+        out[~self._valid] = np.nan
+        return out
+
+    # ---- indicators ----
+    def ema(self, span):
+        return self._apply(ema, ("close",), span=span)
+
+    def atr(self, period=14):
+        return self._apply(atr, ("high", "low", "close"), period=period)
+
+    def rsi(self, period=14):
+        return self._apply(rsi, ("close",), period=period)
+
+    def adx(self, period=14):
+        return self._apply(adx, ("high", "low", "close"), period=period)
+
+    def rolling_high(self, lookback=50):
+        return self._apply(rolling_high, ("high",), lookback=lookback)
+
+    def volume_ratio(self, short=5, long=20):
+        return self._apply(volume_ratio, ("volume",), short=short, long=long)
+
+    def breakout_volume_ratio(self, lookback=5):
+        return self._apply(breakout_volume_ratio, ("volume",), lookback=lookback)
+
+    def resistance(self, lookback=50):
+        """
+        compute_resistance for every bar: NaN until `lookback` bars exist.
+        """
+
+        high = self.rolling_high(lookback)
+        bars_seen = self._valid.cumsum(axis=0)
+        return np.where(bars_seen >= lookback, high, np.nan)
+
+    # ---- candles ----
+    def candles(self):
+        """
+        candle_geometry for every bar of every symbol (NaN where no bar).
+        """
+
+        return candles.candle_geometry(self.open, self.high, self.low, self.close)
+
+    def candle_patterns(self):
+        """
+        Every candle pattern (features.candles.CANDLE_PATTERNS) as a dict of
+        (dates x symbols) boolean arrays. Gapped symbols are evaluated on
+        their own bars.
+        """
+
+        def flags(kernel, fields, **kwargs):
+            return self._apply(lambda *a: kernel(*a, **kwargs).astype(np.float64), fields) == 1
+
+        return {
+            "inside_bar": flags(candles.inside_bar, ("high", "low")),
+            "nr7": flags(candles.nr7, ("high", "low")),
+            "bullish_engulfing": flags(candles.bullish_engulfing, ("open", "close")),
+            "bearish_engulfing": flags(candles.bearish_engulfing, ("open", "close")),
+            "pocket_pivot": flags(candles.pocket_pivot, ("close", "volume")),
+        }
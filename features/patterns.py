@@ -1,3 +1,18 @@
+import numpy as np
+
+from features.candles import candle_geometry, rejection_candles
+from features.context import as_context
+
+
+PATTERN_NAMES = [
+    "TIGHT_BASE",
+    "BREAKOUT_SETUP",
+    "NEAR_52W_HIGH",
+    "PULLBACK_CONTINUATION",
+    "MOMENTUM",
+]
+
+
 def classify_pattern(
     df,
     uptrend,
@@ -12,37 +27,61 @@ def classify_pattern(
     Classifies stock into one dominant pattern.
     Applies rejection filter near resistance.
     """
-    
-    # 🔴 RSI FILTER: Avoid buying overbought
-    if rsi_val is not None and rsi_val > 75:
-        return None
 
-    # 🔴 HARD FILTER: reject fake breakouts
-    if near_res:
-        if has_rejection_near_resistance(df, resistance):
-            return None
+    # The rejection check only matters near resistance
+    rejection = bool(near_res) and has_rejection_near_resistance(df, resistance)
 
-    # 1. Tight Base
-    if consolidation and volume_support:
-        return "TIGHT_BASE"
+    pattern = classify_pattern_array(
+        uptrend=np.array([bool(uptrend)]),
+        bullish_candles=np.array([bool(bullish_candles)]),
+        consolidation=np.array([bool(consolidation)]),
+        volume_support=np.array([bool(volume_support)]),
+        near_res=np.array([bool(near_res)]),
+        rejection=np.array([rejection]),
+        rsi=np.array([np.nan if rsi_val is None else rsi_val], dtype=np.float64),
+    )
 
-    # 2. Breakout Setup
-    if near_res and uptrend and bullish_candles:
-        return "BREAKOUT_SETUP"
+    return pattern[0]
 
-    # 3. Near 52W / Resistance high
-    if near_res and uptrend and not consolidation:
-        return "NEAR_52W_HIGH"
 
-    # 4. Pullback continuation
-    if uptrend and bullish_candles and not near_res:
-        return "PULLBACK_CONTINUATION"
+def classify_pattern_array(uptrend, bullish_candles, consolidation, volume_support, near_res, rejection, rsi):
+    """
+    classify_pattern for every bar at once. Takes boolean arrays (and the
+    RSI values) and returns an object array of pattern names, None where
+    no pattern applies.
+    """
 
-    # 5. Momentum fallback
-    if uptrend:
-        return "MOMENTUM"
+    uptrend = np.asarray(uptrend, dtype=bool)
+    bullish_candles = np.asarray(bullish_candles, dtype=bool)
+    consolidation = np.asarray(consolidation, dtype=bool)
+    volume_support = np.asarray(volume_support).astype(bool)
+    near_res = np.asarray(near_res, dtype=bool)
+    rejection = np.asarray(rejection, dtype=bool)
+
+    with np.errstate(invalid="ignore"):
+        # 🔴 RSI FILTER: Avoid buying overbought
+        # 🔴 HARD FILTER: reject fake breakouts
+        blocked = (np.asarray(rsi, dtype=np.float64) > 75) | (near_res & rejection)
+
+    choices = [
+        # 1. Tight Base
+        consolidation & volume_support,
+        # 2. Breakout Setup
+        near_res & uptrend & bullish_candles,
+        # 3. Near 52W / Resistance high
+        near_res & uptrend & ~consolidation,
+        # 4. Pullback continuation
+        uptrend & bullish_candles & ~near_res,
+        # 5. Momentum fallback
+        uptrend,
+    ]
+
+    code = np.select(choices, np.arange(len(PATTERN_NAMES)), default=-1)
+    code[blocked] = -1
+
+    names = np.array(PATTERN_NAMES + [None], dtype=object)
+    return names[code]
 
-    return None
 
 def has_rejection_near_resistance(df, resistance, lookback=3, wick_ratio_threshold=0.4):
     """
@@ -51,28 +90,13 @@ def has_rejection_near_resistance(df, resistance, lookback=3, wick_ratio_thresho
     Returns True if rejection exists (i.e., setup should be rejected).
     """
 
-    recent = df.tail(lookback)
-
-    rejection_count = 0
-
-    for _, row in recent.iterrows():
-        high = row["high"]
-        low = row["low"]
-        open_ = row["open"]
-        close = row["close"]
+    recent = as_context(df).tail(lookback)
 
-        candle_range = high - low
-        if candle_range == 0:
-            continue
+    open_ = recent["open"].to_numpy(dtype=np.float64)
+    close = recent["close"].to_numpy(dtype=np.float64)
+    geometry = candle_geometry(open_, recent["high"], recent["low"], close)
 
-        upper_wick = high - max(open_, close)
-        upper_wick_ratio = upper_wick / candle_range
-
-        is_bearish_or_small = close <= open_ or abs(close - open_) / candle_range < 0.25
-
-        if upper_wick_ratio >= wick_ratio_threshold and is_bearish_or_small:
-            rejection_count += 1
+    rejection_count = int(rejection_candles(geometry, open_, close, wick_ratio_threshold).sum())
 
     # If 2 or more rejection candles near resistance → reject
     return rejection_count >= 2
-
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from features.market_regime import as_benchmark
+
+
+RS_HORIZONS = (20, 50, 120)
+
+
+# -------------------------
+# CROSS-SECTIONAL RELATIVE STRENGTH
+# -------------------------
+# calculate_rs scores one symbol against NIFTY over one lookback, and the
+# rule score only asks whether that ratio beats 1.05. Ranking the whole
+# universe on several horizons says more: a symbol in the top decile over
+# 20, 50 and 120 days is a leader whatever the market did.
+class CrossSectionalRS:
+    """
+    Multi-horizon relative strength vs the benchmark for a whole universe.
+
+    Symbols are added as their bars arrive (add / add_frames); each one's
+    closes are aligned to the benchmark calendar once and only the last
+    max(horizons) days are kept. table() then computes every horizon for
+    every symbol with one array expression per horizon and ranks the
+    results across the universe.
+
+    The horizon convention is calculate_rs's: RS over h days compares the
+    last close with the close h - 1 trading days earlier, so rs_50 equals
+    calculate_rs for symbols that traded on every benchmark day. Days a
+    symbol did not trade carry its previous close.
+    """
+
+    def __init__(self, benchmark, horizons=RS_HORIZONS):
+        self.benchmark = as_benchmark(benchmark)
+        self.horizons = tuple(horizons)
+        self.window = max(self.horizons)
+        self._closes = {}
+
+    def __len__(self):
+        return len(self._closes)
+
+    def add(self, symbol, df):
+        if df is None or df.empty or self.benchmark is None:
+            return
+        self._closes[symbol] = self.benchmark.align(df["date"], df["close"])[-self.window:]
+
+    def add_frames(self, frames):
+        for symbol, df in frames.items():
+            self.add(symbol, df)
+
+    def columns(self):
+        return [f"rs_{h}" for h in self.horizons] + [f"rs_{h}_pct" for h in self.horizons]
+
+    def table(self):
+        """
+        DataFrame indexed by symbol: rs_<h> (the RS ratio, NaN without h
+        bars) and rs_<h>_pct (its percentile rank in the universe, 0-100,
+        highest RS = 100) for every horizon.
+        """
+
+        table = pd.DataFrame(index=pd.Index(list(self._closes), name="symbol"), columns=self.columns(), dtype=float)
+        if not self._closes:
+            return table
+
+        closes = pd.DataFrame(np.vstack(list(self._closes.values()))).ffill(axis=1).to_numpy()
+        bench = self.benchmark.close[-self.window:]
+        width = closes.shape[1]
+
+        for h in self.horizons:
+            if width < h:
+                continue
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rs = (closes[:, -1] / closes[:, -h]) / (bench[-1] / bench[-h])
+            table[f"rs_{h}"] = np.round(rs, 3)
+            table[f"rs_{h}_pct"] = (pd.Series(rs, index=table.index).rank(pct=True) * 100).round(1)
+
+        return table
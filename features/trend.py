@@ -1,3 +1,6 @@
+from features.context import as_context
+
+
 def in_uptrend(df):
     """
     Checks if stock is in short-term uptrend based on EMA alignment.
@@ -6,15 +9,18 @@ def in_uptrend(df):
     if df is None or len(df) < 20:
         return False
 
-    latest = df.iloc[-1]
+    ctx = as_context(df)
+    close = ctx.last("close")
+    ema_10 = ctx.ema(10).iloc[-1]
+    ema_15 = ctx.ema(15).iloc[-1]
 
-    if latest["close"] <= latest["ema_10"]:
+    if close <= ema_10:
         return False
 
-    if latest["close"] <= latest["ema_15"]:
+    if close <= ema_15:
         return False
 
-    if latest["ema_10"] < latest["ema_15"]:
+    if ema_10 < ema_15:
         return False
 
     return True
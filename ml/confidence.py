@@ -1,3 +1,6 @@
+import numpy as np
+
+
 PATTERN_BONUS = {
     "TIGHT_BASE": 0.12,
     "BREAKOUT_SETUP": 0.10,
@@ -8,35 +11,44 @@ PATTERN_BONUS = {
 
 
 def compute_confidence(
-    ml_prob: float,
-    rule_score_norm: float,
-    pattern: str,
-    volume_support: int,
-    rejection: int,
-    financial_score: float,
+    ml_prob,
+    rule_score_norm,
+    pattern,
+    volume_support,
+    rejection,
+    financial_score,
 ):
     """
     Converts raw ML probability into trader-friendly confidence score (0–1)
+
+    Accepts scalars (returns a float) or equal-length arrays/lists, one
+    entry per candidate (returns a list of floats).
     """
 
+    scalar = np.ndim(ml_prob) == 0
+
+    if scalar:
+        pattern = [pattern]
+
+    bonus = np.array([PATTERN_BONUS.get(p, 0) for p in pattern], dtype=np.float64)
+
     base = (
-        0.55 * ml_prob
-        + 0.30 * rule_score_norm
-        + 0.15 * PATTERN_BONUS.get(pattern, 0)
+        0.55 * np.atleast_1d(np.asarray(ml_prob, dtype=np.float64))
+        + 0.30 * np.asarray(rule_score_norm, dtype=np.float64)
+        + 0.15 * bonus
     )
 
     # bonus / penalty from financial results
-    base += financial_score
+    base = base + np.asarray(financial_score, dtype=np.float64)
 
     # penalties
-    if volume_support == 0:
-        base -= 0.05
-
-    if rejection == 1:
-        base -= 0.08
-
+    base = base - np.where(np.asarray(volume_support) == 0, 0.05, 0.0)
+    base = base - np.where(np.asarray(rejection) == 1, 0.08, 0.0)
 
     # clamp
-    base = max(0.0, min(1.0, base))
+    base = np.clip(base, 0.0, 1.0)
+
+    # round() per element, as the scalar formula did
+    confidence = [round(b, 3) for b in base]
 
-    return round(base, 3)
+    return confidence[0] if scalar else confidence
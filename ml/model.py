@@ -1,7 +1,12 @@
-import joblib
+import hashlib
 import os
 
+import numpy as np
+
 MODEL_PATH = os.path.join("ml", "model.pkl")
+ARTIFACT_PATH = os.path.join("ml", "model.npz")
+
+_MODEL = None
 
 
 def load_model():
@@ -9,9 +14,121 @@ def load_model():
     Loads trained ML model from disk.
     """
 
+    import joblib
+
     if not os.path.exists(MODEL_PATH):
         raise FileNotFoundError(
             f"Trained model not found at {MODEL_PATH}."
         )
 
     return joblib.load(MODEL_PATH)
+
+
+def get_model():
+    """
+    Returns the scoring model, loading it on first use.
+
+    Prefers the NumPy-only artifact (ml/model.npz) when it was exported
+    from the current model.pkl, so scoring does not import sklearn.
+    Falls back to unpickling model.pkl otherwise.
+    """
+
+    global _MODEL
+
+    if _MODEL is None:
+        scorer = load_artifact()
+        _MODEL = scorer if scorer is not None else load_model()
+
+    return _MODEL
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# -------------------------
+# NUMPY-ONLY SCORER
+# -------------------------
+class LinearScorer:
+    """
+    predict_proba for a CalibratedClassifierCV(LogisticRegression,
+    method="sigmoid") using only NumPy: the average over the calibrated
+    folds of sigmoid(-(a * (X @ coef + intercept) + b)).
+    """
+
+    def __init__(self, coef, intercept, a, b, feature_names=None):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.a = np.asarray(a, dtype=np.float64)
+        self.b = np.asarray(b, dtype=np.float64)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+
+        positive = np.zeros(len(X))
+        for coef, intercept, a, b in zip(self.coef, self.intercept, self.a, self.b):
+            decision = X @ coef + intercept
+            positive += 1.0 / (1.0 + np.exp(a * decision + b))
+        positive /= len(self.coef)
+
+        return np.column_stack([1.0 - positive, positive])
+
+
+def export_artifact(model=None, path=ARTIFACT_PATH, source=MODEL_PATH):
+    """
+    Converts the calibrated logistic regression in model.pkl into a small
+    .npz of coefficients and calibration parameters for LinearScorer.
+    `source` is the pickle the model came from; its digest is recorded.
+    """
+
+    model = model if model is not None else load_model()
+
+    if getattr(model, "method", None) != "sigmoid":
+        raise ValueError("Only sigmoid-calibrated models can be exported.")
+
+    folds = model.calibrated_classifiers_
+
+    coef = np.vstack([fold.estimator.coef_.ravel() for fold in folds])
+    intercept = np.array([fold.estimator.intercept_[0] for fold in folds])
+    a = np.array([fold.calibrators[0].a_ for fold in folds])
+    b = np.array([fold.calibrators[0].b_ for fold in folds])
+
+    feature_names = getattr(model, "feature_names_in_", None)
+
+    np.savez(
+        path,
+        coef=coef,
+        intercept=intercept,
+        a=a,
+        b=b,
+        feature_names=np.array(feature_names if feature_names is not None else [], dtype=str),
+        source_sha256=np.array(_file_digest(source) if os.path.exists(source) else ""),
+    )
+
+    return path
+
+
+def load_artifact(path=ARTIFACT_PATH, source=MODEL_PATH):
+    """
+    Loads the exported artifact as a LinearScorer, or None if it is missing
+    or was exported from a different pickle than `source`.
+    """
+
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path) as data:
+        digest = str(data["source_sha256"])
+        if os.path.exists(source) and digest != _file_digest(source):
+            print(f"Warning: {path} is out of date with {source}; using the pickled model.")
+            return None
+
+        feature_names = [str(name) for name in data["feature_names"]] or None
+
+        return LinearScorer(data["coef"], data["intercept"], data["a"], data["b"], feature_names)
+
+
+if __name__ == "__main__":
+    print(f"Exported {export_artifact()}")
@@ -1,14 +1,14 @@
+import logging
+
 import numpy as np
 import pandas as pd
 
 from ml.confidence import compute_confidence
-from ml.model import load_model
+from ml.model import get_model
 
 from features.indicators import (
     is_uptrend,
-    ema_trend_strength,
-    add_rsi,
-    add_adx
+    ema_trend_strength
 )
 
 from features.patterns import (
@@ -26,83 +26,142 @@ from utils.helpers import (
     is_near_resistance,
     compute_resistance
 )
-from utils.financials_loader import get_quarterly_financials
 
-# Load trained & calibrated model
-MODEL = load_model()
+from features.context import as_context
+from features.market_regime import calculate_rs
+from utils.instrumentation import timed, timer
 
+logger = logging.getLogger(__name__)
 
-from features.market_regime import calculate_rs
+FEATURE_NAMES = [
+    "rule_score_norm",
+    "ema_trend_strength",
+    "bullish_candles",
+    "consolidation",
+    "volume_support",
+    "near_resistance",
+    "results_score",
+    "placeholder",
+]
 
-def predict_today_probability(df, symbol, nifty_df=None):
+
+def financials_ticker(symbol):
+    return symbol if symbol.endswith(".NS") else symbol + ".NS"
+
+
+@timed("features")
+def extract_features(df, symbol, nifty_df=None):
     """
-    Returns:
-    - ml_probability (float)
-    - confidence (float)
-    - pattern (str)
+    Runs the filters and builds the ML feature vector for one symbol.
+    This is the per-symbol half of predict_today_probability; scoring is
+    done separately (and in batches) by score_features.
+
+    Quarterly financials (a network call on a cache miss) are only
+    fetched for symbols that passed every filter and have a pattern.
+
+    Returns a dict with:
+    - features (np.ndarray of len 8, or None if the symbol was filtered out)
+    - pattern (str or None)
     - rule_score (int)
-    - financial_label (str)
+    - financial_label, financial_score (Neutral for filtered-out symbols)
+    - volume_support, rejection (int flags for compute_confidence)
     """
 
-    # ------------------------
-    # 1. BASIC FILTERS
-    # ------------------------
-    if not liquidity_pass(df):
-        return None, None, None, 0, "Neutral"
+    ctx = as_context(df)
 
-    # ------------------------
-    # 1.5. FINANCIAL ANALYSIS
-    # ------------------------
-    ticker = symbol if symbol.endswith(".NS") else symbol + ".NS"
-    financials_df = get_quarterly_financials(ticker)
-    financial_analysis = analyze_quarterly_financials(financials_df)
-    financial_label = financial_analysis["financial_label"]
-    financial_score = financial_analysis["financial_score"]
+    if not liquidity_pass(ctx):
+        return _empty_candidate(symbol)
 
-    uptrend = is_uptrend(df)
-    bullish_candles = has_bullish_candles(df)
-    consolidation = is_consolidating(df)
-    volume_support = volume_supports_breakout(df)
+    candidate = extract_signals(ctx, symbol, nifty_df)
 
-    resistance = compute_resistance(df)
-    near_res = is_near_resistance(df, resistance)
+    if candidate["features"] is not None:
+        attach_financials(candidate, analyze_quarterly_financials(financials_ticker(symbol)))
+
+    return candidate
+
+
+def attach_financials(candidate, financial_analysis):
+    """
+    Sets a candidate's financial label and score (analyze_quarterly_financials
+    output), and the score's slot in its feature vector.
+    """
+
+    candidate["financial_label"] = financial_analysis["financial_label"]
+    candidate["financial_score"] = financial_analysis["financial_score"]
+
+    if candidate["features"] is not None:
+        candidate["features"][FEATURE_NAMES.index("results_score")] = candidate["financial_score"]
+
+    return candidate
+
+
+def _empty_candidate(symbol):
+    return {
+        "symbol": symbol,
+        "features": None,
+        "pattern": None,
+        "rule_score": 0,
+        "financial_label": "Neutral",
+        "financial_score": 0.0,
+        "volume_support": 0,
+        "rejection": 0,
+    }
+
+
+@timed("features")
+def extract_signals(df, symbol, nifty_df=None):
+    """
+    extract_features without the liquidity check and the financials:
+    the candidate is Neutral until attach_financials is called on it.
+    Used by the scan pipeline (ranking/pipeline.py), which checks
+    liquidity itself and fetches financials for the survivors only.
+
+    `df` may be a FeatureContext (features/context.py) already used by
+    earlier filters, so their EMAs and windows are not recomputed.
+    """
+
+    candidate = _empty_candidate(symbol)
+    ctx = as_context(df)
+
+    uptrend = is_uptrend(ctx)
+    bullish_candles = has_bullish_candles(ctx)
+    consolidation = is_consolidating(ctx)
+    volume_support = volume_supports_breakout(ctx)
+
+    resistance = compute_resistance(ctx)
+    near_res = is_near_resistance(ctx, resistance)
 
     # ------------------------
     # ADVANCED INDICATORS (Step 1 of Integration)
     # ------------------------
-    df = add_rsi(df)
-    df = add_adx(df)
-    
-    rsi_val = df["rsi_14"].iloc[-1] if "rsi_14" in df.columns else None
-    
+    rsi_val = ctx.rsi(14).iloc[-1]
+
     # ADX Check (> 25 is strong trend)
-    adx_val = df["adx_14"].iloc[-1] if "adx_14" in df.columns else 0
+    adx_val = ctx.adx(14).iloc[-1]
     strong_trend = adx_val > 25
     
     # Volatility Squeeze
     from features.indicators import get_volatility_squeeze
-    vcp = get_volatility_squeeze(df)
+    vcp = get_volatility_squeeze(ctx)
     
     # Relative Strength (vs Nifty 50)
-    rs_score = calculate_rs(df, nifty_df)
+    rs_score = calculate_rs(ctx, nifty_df)
     
     # Weekly Trend Check (Resampling)
     # Convert daily to weekly
     try:
-        # Ensure index is datetime
-        df.index = pd.to_datetime(df["date"])
-        weekly = df.resample('W').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'})
+        weekly = pd.DataFrame({"close": ctx.memo("weekly_close", lambda: _weekly_close(ctx.df))})
         weekly["ema_20"] = weekly["close"].ewm(span=20, adjust=False).mean()
         weekly_trend = weekly["close"].iloc[-1] > weekly["ema_20"].iloc[-1] if len(weekly) > 20 else True
     except Exception as e:
-        print(f"Warning: Weekly resample failed for {symbol}: {e}")
+        logger.warning(f"Warning: Weekly resample failed for {symbol}: {e}")
         weekly_trend = True # Default to True to not block
 
     # ------------------------
     # 2. PATTERN CLASSIFICATION
     # ------------------------
     pattern = classify_pattern(
-        df=df,
+        df=ctx,
         uptrend=uptrend,
         bullish_candles=bullish_candles,
         consolidation=consolidation,
@@ -113,10 +172,54 @@ def predict_today_probability(df, symbol, nifty_df=None):
     )
 
     if pattern is None:
-        return None, None, None, 0, financial_label
+        return candidate
+
+    # ------------------------
+    # 3-4. RULE SCORE AND ML FEATURES
+    # ------------------------
+    rule_score, features = rule_score_and_features(
+        uptrend=uptrend,
+        bullish_candles=bullish_candles,
+        consolidation=consolidation,
+        volume_support=volume_support,
+        near_res=near_res,
+        strong_trend=strong_trend,
+        weekly_trend=weekly_trend,
+        vcp=vcp,
+        rs_score=rs_score,
+        trend_strength=ema_trend_strength(ctx),
+        financial_score=candidate["financial_score"],
+    )
+
+    # Confidence penalty input (STEP 6)
+    rejection = has_rejection_near_resistance(ctx, resistance)
+
+    candidate.update({
+        "features": features,
+        "pattern": pattern,
+        "rule_score": rule_score,
+        "volume_support": int(volume_support),
+        "rejection": int(rejection),
+    })
+
+    return candidate
+
+
+def _weekly_close(df):
+    # Last close of each week (resample("W") bins end on Sunday)
+    dates = pd.DatetimeIndex(pd.to_datetime(df["date"]))
+    return pd.Series(df["close"].to_numpy(), index=dates).resample("W").last()
+
+
+def rule_score_and_features(uptrend, bullish_candles, consolidation, volume_support, near_res,
+                            strong_trend, weekly_trend, vcp, rs_score, trend_strength, financial_score):
+    """
+    Rule score (0–10) and the 8-feature ML vector from the individual
+    signals. Shared by extract_features and the streaming ranker.
+    """
 
     # ------------------------
-    # 3. RULE SCORE (0–10)
+    # RULE SCORE (0–10)
     # ------------------------
     rule_score = 0
 
@@ -144,36 +247,80 @@ def predict_today_probability(df, symbol, nifty_df=None):
     rule_score = min(rule_score, 10)
 
     # ------------------------
-    # 4. ML FEATURES (MATCH TRAINING)
+    # ML FEATURES (MATCH TRAINING)
     # ------------------------
     features = np.array([
         rule_score / 10,                 # rule_score_norm
-        ema_trend_strength(df),           # ema_trend_strength
+        trend_strength,                   # ema_trend_strength
         int(bullish_candles),             # bullish_candles
         int(consolidation),               # consolidation
         int(volume_support),              # volume_support
         int(near_res),                    # near_resistance
         financial_score,                  # results_score
         0.0                               # future expansion placeholder
-    ]).reshape(1, -1)
+    ])
 
-    # ------------------------
-    # 5. ML PROBABILITY
-    # ------------------------
-    ml_prob = MODEL.predict_proba(features)[0][1]
+    return rule_score, features
 
-    # ------------------------
-    # 6. CONFIDENCE SHAPING (STEP 6)
-    # ------------------------
-    rejection = has_rejection_near_resistance(df, resistance)
-
-    confidence = compute_confidence(
-        ml_prob=ml_prob,
-        rule_score_norm=rule_score / 10,
-        pattern=pattern,
-        volume_support=int(volume_support),
-        rejection=int(rejection),
-        financial_score=financial_score
+
+def score_features(features):
+    """
+    Scores an (N, 8) feature matrix in one model call.
+    Returns the N positive-class probabilities.
+    """
+
+    features = np.asarray(features, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+
+    if len(features) == 0:
+        return np.empty(0)
+
+    with timer("inference"):
+        return get_model().predict_proba(features)[:, 1]
+
+
+def score_candidates(candidates):
+    """
+    Batch-scores candidates from extract_features (filtered-out ones are
+    skipped). Returns a list of (candidate, ml_prob, confidence).
+    """
+
+    candidates = [c for c in candidates if c is not None and c["features"] is not None]
+
+    if not candidates:
+        return []
+
+    ml_probs = score_features(np.vstack([c["features"] for c in candidates]))
+
+    confidences = compute_confidence(
+        ml_prob=ml_probs,
+        rule_score_norm=np.array([c["rule_score"] for c in candidates]) / 10,
+        pattern=[c["pattern"] for c in candidates],
+        volume_support=np.array([c["volume_support"] for c in candidates]),
+        rejection=np.array([c["rejection"] for c in candidates]),
+        financial_score=np.array([c["financial_score"] for c in candidates]),
     )
 
-    return float(ml_prob), confidence, pattern, rule_score, financial_label
+    return [
+        (candidate, float(ml_prob), confidence)
+        for candidate, ml_prob, confidence in zip(candidates, ml_probs, confidences)
+    ]
+
+
+def predict_today_probability(df, symbol, nifty_df=None):
+    """
+    Returns:
+    - ml_probability (float)
+    - confidence (float)
+    - pattern (str)
+    - rule_score (int)
+    - financial_label (str)
+    """
+
+    candidate = extract_features(df, symbol, nifty_df)
+
+    if candidate["features"] is None:
+        return None, None, None, 0, candidate["financial_label"]
+
+    (_, ml_prob, confidence), = score_candidates([candidate])
+
+    return ml_prob, confidence, candidate["pattern"], candidate["rule_score"], candidate["financial_label"]
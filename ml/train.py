@@ -0,0 +1,452 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ml.predict import FEATURE_NAMES
+
+
+MODELS_DIR = os.path.join("ml", "models")
+FEATURE_CACHE_DIR = os.path.join("data", "cache", "features")
+
+# Bump when compute_selection_frame changes, so cached matrices are rebuilt
+FEATURE_VERSION = 1
+
+
+# -------------------------
+# FEATURE CACHE
+# -------------------------
+# One Parquet file per symbol: the bar index, date and the 8 ML features of
+# every bar that passes the daily filters. The file name carries a digest
+# of the inputs (prices, benchmark, FEATURE_VERSION), so changed data gets
+# new features while label changes reuse the cached ones.
+def _safe_name(symbol):
+    return symbol.replace("^", "_").replace("/", "_")
+
+
+def _digest(df, nifty_digest):
+    h = hashlib.sha256()
+    h.update(f"v{FEATURE_VERSION}|{nifty_digest}|".encode())
+    h.update(pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[ns]").tobytes())
+    for field in ("open", "high", "low", "close", "volume"):
+        h.update(df[field].to_numpy(dtype=np.float64).tobytes())
+    return h.hexdigest()[:16]
+
+
+def frame_digest(df):
+    if df is None:
+        return "none"
+    h = hashlib.sha256()
+    h.update(pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[ns]").tobytes())
+    h.update(df["close"].to_numpy(dtype=np.float64).tobytes())
+    return h.hexdigest()[:16]
+
+
+def _cache_path(symbol, digest, cache_dir):
+    return os.path.join(cache_dir, f"{_safe_name(symbol)}_{digest}.parquet")
+
+
+def read_cached_features(symbol, digest, cache_dir=None):
+    path = _cache_path(symbol, digest, cache_dir or FEATURE_CACHE_DIR)
+
+    if not os.path.exists(path):
+        return None
+
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"Warning: Feature cache unreadable for {symbol}, recomputing: {e}")
+        return None
+
+
+def write_cached_features(symbol, digest, features, cache_dir=None):
+    cache_dir = cache_dir or FEATURE_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Drop matrices built from older data for this symbol
+    for stale in glob.glob(os.path.join(cache_dir, f"{_safe_name(symbol)}_*.parquet")):
+        os.remove(stale)
+
+    path = _cache_path(symbol, digest, cache_dir)
+    tmp_path = path + ".tmp"
+    features.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+# -------------------------
+# DATASET
+# -------------------------
+def symbol_features(symbol, df, nifty_df=None):
+    """
+    The ML feature vector (ml.predict.FEATURE_NAMES) of every bar on which
+    rank_today would have scored `symbol`, with its bar index and date.
+    Financial scores are Neutral (no point-in-time quarterly results).
+    """
+
+    from features.engine import compute_selection_frame
+
+    selection = compute_selection_frame(df, nifty_df)
+    eligible = selection["eligible"].to_numpy()
+
+    features = selection.loc[eligible, FEATURE_NAMES].reset_index(drop=True)
+    features.insert(0, "bar", np.flatnonzero(eligible))
+    features.insert(1, "date", pd.to_datetime(df["date"]).to_numpy()[eligible])
+
+    return features
+
+
+def forward_labels(df, horizon=5, threshold=0.03):
+    """
+    1 if the high of any of the next `horizon` bars reaches close x
+    (1 + threshold), else 0. NaN for the last `horizon` bars, whose
+    outcome is not known yet.
+    """
+
+    high = df["high"].to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy(dtype=np.float64)
+    n = len(close)
+
+    labels = np.full(n, np.nan)
+    if n <= horizon:
+        return labels
+
+    future_high = pd.Series(high[1:]).rolling(horizon).max().to_numpy()[horizon - 1:]
+    labels[:n - horizon] = (future_high >= close[:n - horizon] * (1 + threshold)).astype(np.float64)
+
+    return labels
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(nifty_df, nifty_digest, cache_dir):
+    _WORKER_STATE["nifty_df"] = nifty_df
+    _WORKER_STATE["nifty_digest"] = nifty_digest
+    _WORKER_STATE["cache_dir"] = cache_dir
+
+
+def _features_in_worker(symbol, df):
+    return cached_symbol_features(
+        symbol,
+        df,
+        _WORKER_STATE["nifty_df"],
+        _WORKER_STATE["nifty_digest"],
+        _WORKER_STATE["cache_dir"],
+    )
+
+
+def cached_symbol_features(symbol, df, nifty_df=None, nifty_digest=None, cache_dir=None, use_cache=True):
+    """
+    symbol_features, read from / written to the feature cache.
+    """
+
+    nifty_digest = nifty_digest or frame_digest(nifty_df)
+    digest = _digest(df, nifty_digest)
+
+    if use_cache:
+        cached = read_cached_features(symbol, digest, cache_dir)
+        if cached is not None:
+            return cached
+
+    features = symbol_features(symbol, df, nifty_df)
+
+    if use_cache:
+        write_cached_features(symbol, digest, features, cache_dir)
+
+    return features
+
+
+def build_dataset(symbols, nifty_df=None, period="5y", horizon=5, threshold=0.03, chunk_size=50,
+                  workers=None, download=None, use_cache=True, cache_dir=None):
+    """
+    Streams the universe chunk by chunk: downloads a chunk, builds (or
+    loads cached) feature matrices on a process pool, attaches forward
+    labels and keeps only the labelled rows. Only one chunk of price
+    history is held in memory at a time.
+
+    Returns:
+        pd.DataFrame: date, symbol, FEATURE_NAMES, label (sorted by date)
+    """
+
+    from utils.yf_loader import load_bulk_daily_data
+
+    workers = workers or os.cpu_count() or 1
+    nifty_digest = frame_digest(nifty_df)
+    symbols = list(dict.fromkeys(symbols))
+
+    parts = []
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(nifty_df, nifty_digest, cache_dir if use_cache else None),
+    ) as pool:
+
+        for start in range(0, len(symbols), chunk_size):
+            chunk = symbols[start:start + chunk_size]
+            print(f"Building features for symbols {start + 1}-{start + len(chunk)} of {len(symbols)}...")
+
+            frames = load_bulk_daily_data(chunk, period=period, chunk_size=chunk_size, download=download)
+            jobs = [(s, frames[s].reset_index(drop=True)) for s in chunk
+                    if frames.get(s) is not None and len(frames[s]) >= 100]
+
+            if not jobs:
+                continue
+
+            if use_cache:
+                results = pool.map(_features_in_worker, *zip(*jobs))
+            else:
+                results = pool.map(symbol_features, *zip(*jobs), [nifty_df] * len(jobs))
+
+            for (symbol, df), features in zip(jobs, results):
+                labels = forward_labels(df, horizon, threshold)[features["bar"].to_numpy()]
+                labelled = ~np.isnan(labels)
+
+                part = features.loc[labelled, ["date"] + FEATURE_NAMES].copy()
+                part.insert(1, "symbol", symbol)
+                part["label"] = labels[labelled].astype(np.int8)
+                parts.append(part)
+
+            del frames, jobs
+
+    if not parts:
+        return pd.DataFrame(columns=["date", "symbol"] + FEATURE_NAMES + ["label"])
+
+    dataset = pd.concat(parts, ignore_index=True)
+    return dataset.sort_values(["date", "symbol"], kind="mergesort").reset_index(drop=True)
+
+
+# -------------------------
+# WALK-FORWARD TRAINING
+# -------------------------
+def make_model():
+    """
+    Same estimator as the shipped model.pkl: class-balanced logistic
+    regression, sigmoid-calibrated over 3 folds.
+    """
+
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.linear_model import LogisticRegression
+
+    return CalibratedClassifierCV(
+        LogisticRegression(max_iter=1000, class_weight="balanced"),
+        method="sigmoid",
+        cv=3,
+    )
+
+
+def walk_forward_splits(dates, mode="expanding", train_days=250, test_days=60, embargo=5):
+    """
+    Yields (train_mask, test_mask) over the sorted unique dates.
+
+    - expanding: train on every date before the test window
+    - rolling: train on the last `train_days` dates before it
+
+    `embargo` dates between train and test are dropped, so training labels
+    (which look `horizon` bars ahead) cannot overlap the test window.
+    """
+
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+    calendar = np.unique(dates)
+
+    test_start = train_days + embargo
+    while test_start < len(calendar):
+        test_end = min(test_start + test_days, len(calendar))
+        train_end = test_start - embargo
+        train_begin = 0 if mode == "expanding" else max(0, train_end - train_days)
+
+        train = (dates >= calendar[train_begin]) & (dates < calendar[train_end])
+        test = (dates >= calendar[test_start]) & (dates <= calendar[test_end - 1])
+
+        yield train, test
+        test_start = test_end
+
+
+def evaluate(y_true, prob):
+    from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
+
+    metrics = {
+        "rows": int(len(y_true)),
+        "base_rate": float(np.mean(y_true)),
+        "brier": float(brier_score_loss(y_true, prob)),
+        "log_loss": float(log_loss(y_true, prob, labels=[0, 1])),
+    }
+    metrics["auc"] = float(roc_auc_score(y_true, prob)) if len(np.unique(y_true)) == 2 else None
+
+    return metrics
+
+
+def walk_forward(dataset, mode="expanding", train_days=250, test_days=60, embargo=5):
+    """
+    Fits a fresh model per walk-forward window and scores the following
+    out-of-sample window. Returns one metrics dict per fold.
+    """
+
+    X = dataset[FEATURE_NAMES].to_numpy(dtype=np.float64)
+    y = dataset["label"].to_numpy()
+    dates = dataset["date"].to_numpy()
+
+    folds = []
+
+    for train, test in walk_forward_splits(dates, mode, train_days, test_days, embargo):
+        if len(np.unique(y[train])) < 2 or not test.any():
+            continue
+
+        model = make_model().fit(X[train], y[train])
+        metrics = evaluate(y[test], model.predict_proba(X[test])[:, 1])
+        metrics["train_rows"] = int(train.sum())
+        metrics["test_start"] = str(pd.Timestamp(dates[test].min()).date())
+        metrics["test_end"] = str(pd.Timestamp(dates[test].max()).date())
+
+        folds.append(metrics)
+        auc = f"{metrics['auc']:.3f}" if metrics["auc"] is not None else "n/a"
+        print(f"Fold {metrics['test_start']}..{metrics['test_end']}: "
+              f"AUC {auc}, Brier {metrics['brier']:.4f} ({metrics['rows']} rows)")
+
+    return folds
+
+
+# -------------------------
+# ARTIFACTS
+# -------------------------
+def save_versioned(model, metadata, models_dir=None):
+    """
+    Writes model_<version>.pkl, its NumPy export (.npz) and a .json with
+    the training metadata to ml/models/. Returns the .pkl path.
+    """
+
+    import joblib
+    from ml.model import export_artifact
+
+    models_dir = models_dir or MODELS_DIR
+    os.makedirs(models_dir, exist_ok=True)
+
+    base = os.path.join(models_dir, f"model_{metadata['version']}")
+
+    joblib.dump(model, base + ".pkl")
+    export_artifact(model, path=base + ".npz", source=base + ".pkl")
+
+    with open(base + ".json", "w") as f:
+        json.dump(metadata, f, indent=1, default=str)
+
+    return base + ".pkl"
+
+
+def promote(model_path):
+    """
+    Makes a versioned model the one used by the daily scan: copies it to
+    ml/model.pkl and re-exports ml/model.npz from it.
+    """
+
+    from ml import model as model_module
+
+    shutil.copyfile(model_path, model_module.MODEL_PATH)
+    model_module.export_artifact(model_module.load_model(), path=model_module.ARTIFACT_PATH)
+    print(f"Promoted {model_path} -> {model_module.MODEL_PATH}")
+
+
+def train(universe_csv="universe/smallcap_250.csv", period="5y", horizon=5, threshold=0.03,
+          mode="expanding", train_days=250, test_days=60, final_days=None, workers=None,
+          chunk_size=50, download=None, use_cache=True, promote_model=False):
+    """
+    Builds the dataset, reports walk-forward out-of-sample metrics, then
+    fits the final model on all labelled rows (or the last `final_days`
+    dates for rolling windows) and saves it as a new version.
+    """
+
+    from utils.yf_loader import load_daily_data
+
+    universe = pd.read_csv(universe_csv)
+    symbols = universe.iloc[:, 0].tolist()
+
+    nifty_df = load_daily_data("^NSEI", period=period, download=download)
+
+    dataset = build_dataset(
+        symbols,
+        nifty_df,
+        period=period,
+        horizon=horizon,
+        threshold=threshold,
+        chunk_size=chunk_size,
+        workers=workers,
+        download=download,
+        use_cache=use_cache,
+    )
+
+    if dataset.empty or dataset["label"].nunique() < 2:
+        print("Not enough labelled data to train.")
+        return None
+
+    print(f"Dataset: {len(dataset)} rows, {dataset['symbol'].nunique()} symbols, "
+          f"positive rate {dataset['label'].mean():.2%}")
+
+    folds = walk_forward(dataset, mode, train_days, test_days, embargo=horizon)
+
+    final = dataset
+    if final_days:
+        calendar = np.unique(dataset["date"].to_numpy())
+        final = dataset[dataset["date"] >= calendar[-final_days]]
+
+    model = make_model().fit(final[FEATURE_NAMES].to_numpy(dtype=np.float64), final["label"].to_numpy())
+
+    import sklearn
+
+    metadata = {
+        "version": datetime.now().strftime("%Y%m%d_%H%M%S"),
+        "feature_names": FEATURE_NAMES,
+        "feature_version": FEATURE_VERSION,
+        "label": {"horizon": horizon, "threshold": threshold},
+        "walk_forward": {"mode": mode, "train_days": train_days, "test_days": test_days, "embargo": horizon},
+        "folds": folds,
+        "train_rows": int(len(final)),
+        "train_start": str(pd.Timestamp(final["date"].min()).date()),
+        "train_end": str(pd.Timestamp(final["date"].max()).date()),
+        "universe": universe_csv,
+        "sklearn": sklearn.__version__,
+    }
+
+    path = save_versioned(model, metadata)
+    print(f"Saved {path}")
+
+    if promote_model:
+        promote(path)
+
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward training of the ranking model")
+    parser.add_argument("--universe", default="universe/smallcap_250.csv")
+    parser.add_argument("--period", default="5y", help="History to load per symbol")
+    parser.add_argument("--horizon", type=int, default=5, help="Label: bars to look ahead")
+    parser.add_argument("--threshold", type=float, default=0.03, help="Label: required move (0.03 = +3%%)")
+    parser.add_argument("--mode", choices=["expanding", "rolling"], default="expanding")
+    parser.add_argument("--train-days", type=int, default=250)
+    parser.add_argument("--test-days", type=int, default=60)
+    parser.add_argument("--final-days", type=int, default=None,
+                        help="Fit the final model on the last N dates only (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for features (default: all cores)")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute feature matrices")
+    parser.add_argument("--promote", action="store_true", help="Install the new model as ml/model.pkl")
+    args = parser.parse_args()
+
+    train(
+        args.universe,
+        period=args.period,
+        horizon=args.horizon,
+        threshold=args.threshold,
+        mode=args.mode,
+        train_days=args.train_days,
+        test_days=args.test_days,
+        final_days=args.final_days,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        promote_model=args.promote,
+    )
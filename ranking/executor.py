@@ -0,0 +1,119 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from utils import instrumentation
+from utils.yf_loader import load_bulk_daily_data
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------
+# WORKER PROCESS STATE
+# -------------------------
+# Set once per worker process by _init_worker, so the NIFTY frame is not
+# pickled with every task. Workers only extract features; the model is
+# called once, in the parent, for all candidates.
+_WORKER_STATE = {}
+
+
+def _init_worker(nifty_df, instrumented=False, log_level=None):
+    _WORKER_STATE["nifty_df"] = nifty_df
+
+    if instrumented:
+        instrumentation.enable()
+    if log_level is not None:
+        logging.getLogger().setLevel(log_level)
+
+
+def _prepare_in_worker(symbol, df):
+    """
+    Returns (candidate, instrumentation snapshot or None). The snapshot
+    covers this task only and is merged into the parent's run report.
+    """
+
+    from ranking.rank_today import safe_prepare_symbol
+
+    if instrumentation.is_enabled():
+        instrumentation.reset()
+
+    candidate = safe_prepare_symbol(symbol, df, _WORKER_STATE["nifty_df"])
+
+    return candidate, instrumentation.snapshot() if instrumentation.is_enabled() else None
+
+
+# -------------------------
+# PARALLEL SCAN
+# -------------------------
+def run_parallel_scan(symbols, nifty_df, cpu_workers=4, io_workers=4,
+                      chunk_size=50, download=None, on_frames=None):
+    """
+    Overlaps downloads with scoring:
+    - each chunk of symbols is downloaded on a thread pool (io_workers)
+    - as soon as a chunk arrives its symbols are filtered and their
+      features extracted on a process pool (cpu_workers)
+
+    Returns the surviving candidates in universe order, exactly like the
+    serial loop in rank_today. Errors are reported per chunk/symbol and
+    skipped.
+
+    on_frames, if given, is called in this process with each downloaded
+    chunk's {symbol: frame} (rank_today feeds its cross-sectional RS).
+    """
+
+    symbols = list(dict.fromkeys(symbols))
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    position = {symbol: i for i, symbol in enumerate(symbols)}
+
+    results = [None] * len(symbols)
+
+    logger.info(f"Scanning {len(symbols)} symbols with {io_workers} I/O threads "
+                f"and {cpu_workers} worker processes...")
+
+    with ThreadPoolExecutor(max_workers=io_workers) as io_pool, \
+            ProcessPoolExecutor(
+                max_workers=cpu_workers,
+                initializer=_init_worker,
+                initargs=(nifty_df, instrumentation.is_enabled(),
+                          logging.getLogger().level),
+            ) as cpu_pool:
+
+        fetches = {
+            io_pool.submit(load_bulk_daily_data, chunk, chunk_size=chunk_size, download=download): chunk
+            for chunk in chunks
+        }
+
+        scoring = {}
+
+        for fetch in as_completed(fetches):
+            chunk = fetches[fetch]
+
+            try:
+                frames = fetch.result()
+            except Exception as e:
+                logger.warning(f"Error downloading chunk starting {chunk[0]}: {type(e).__name__}: {e}")
+                instrumentation.count("errors.download")
+                instrumentation.count("rejected.no_data", len(chunk))
+                continue
+
+            if on_frames is not None:
+                on_frames(frames)
+
+            for symbol in chunk:
+                df = frames.get(symbol)
+                if df is None:
+                    instrumentation.reject("no_data")
+                    continue
+                scoring[cpu_pool.submit(_prepare_in_worker, symbol, df)] = symbol
+
+        for task in as_completed(scoring):
+            symbol = scoring[task]
+
+            try:
+                results[position[symbol]], snap = task.result()
+                instrumentation.merge(snap)
+            except Exception as e:
+                # Worker crashed or the task could not be pickled
+                logger.warning(f"Error scoring {symbol}: {type(e).__name__}: {e}")
+                instrumentation.count("errors.scoring")
+
+    return [row for row in results if row is not None]
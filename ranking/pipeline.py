@@ -0,0 +1,229 @@
+"""
+The daily scan as a declarative pipeline of filter / feature stages.
+
+Every stage declares a relative cost and the stages it depends on; the
+pipeline runs them in dependency order, cheapest ready stage first, so
+cheap rejections (history length, liquidity, trend) come before the
+pattern features, and the network-bound financials lookup runs last,
+once, for the symbols still alive:
+
+    stage        cost  requires              rejects
+    history         0  -                     no_data, short_history
+    liquidity       1  history               liquidity
+    indicators      2  history               -
+    uptrend         1  indicators            uptrend
+    signals        10  indicators            pattern
+    regime          0  signals (batch)       regime
+    financials    100  signals (batch)       -
+
+The regime filter is a batch stage because the regime is decided from
+the whole universe's breadth (features/breadth.py), which is only known
+once every symbol has been loaded.
+
+Per-stage pass/reject counts go to utils.instrumentation as
+"pipeline.<stage>.passed" / ".rejected" (plus "rejected.<reason>"), and
+appear under "pipeline" in the run report.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from features.context import FeatureContext
+from features.financials import analyze_quarterly_financials
+from features.liquidity import passes_liquidity_filter
+from features.trend import in_uptrend
+from ml.predict import attach_financials, extract_signals, financials_ticker
+from utils.instrumentation import count, reject, timer
+
+
+# -------------------------
+# PIPELINE
+# -------------------------
+class Stage:
+    """
+    One step of the scan.
+
+    Per-symbol stages are called as fn(state) with the symbol's state dict
+    and return True to keep the symbol, or False / a rejection reason
+    (str, counted under "rejected.<reason>") to drop it. Batch stages run after every per-symbol stage, once,
+    as fn(candidates, **options) on the surviving candidates, and return
+    the candidates to keep. Every batch stage gets all the options and
+    ignores the ones it does not use.
+    """
+
+    def __init__(self, name, fn, cost, requires=(), batch=False):
+        self.name = name
+        self.fn = fn
+        self.cost = cost
+        self.requires = tuple(requires)
+        self.batch = batch
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, cost={self.cost}, requires={self.requires}, batch={self.batch})"
+
+
+def order_stages(stages):
+    """
+    Dependency order, taking the cheapest ready stage first (declaration
+    order breaks ties). Batch stages always follow the per-symbol ones.
+    """
+
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = set(stage.requires) - set(by_name)
+        if missing:
+            raise ValueError(f"Stage {stage.name!r} requires unknown stage(s): {sorted(missing)}")
+        if not stage.batch and any(by_name[name].batch for name in stage.requires):
+            raise ValueError(f"Per-symbol stage {stage.name!r} cannot depend on a batch stage")
+
+    ordered, done = [], set()
+    pending = list(stages)
+
+    while pending:
+        ready = [s for s in pending if set(s.requires) <= done]
+        if not ready:
+            raise ValueError(f"Circular stage dependencies: {[s.name for s in pending]}")
+
+        stage = min(ready, key=lambda s: (s.batch, s.cost))
+        ordered.append(stage)
+        done.add(stage.name)
+        pending.remove(stage)
+
+    return ordered
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = order_stages(stages)
+        self.per_symbol = [stage for stage in self.stages if not stage.batch]
+        self.batch = [stage for stage in self.stages if stage.batch]
+
+    def run(self, state):
+        """
+        Runs the per-symbol stages on one symbol's state dict.
+        Returns True if the symbol survived them all.
+        """
+
+        for stage in self.per_symbol:
+            with timer(f"pipeline.{stage.name}"):
+                result = stage.fn(state)
+
+            if result is not False and not isinstance(result, str):
+                count(f"pipeline.{stage.name}.passed")
+                continue
+
+            count(f"pipeline.{stage.name}.rejected")
+            reject(result or stage.name)
+            return False
+
+        return True
+
+    def run_batch(self, candidates, **options):
+        """
+        Runs the batch stages on the survivors of run(). Returns the
+        candidates that are left.
+        """
+
+        for stage in self.batch:
+            with timer(f"pipeline.{stage.name}"):
+                kept = stage.fn(candidates, **options)
+
+            kept_ids = {id(c) for c in kept}
+            for candidate in candidates:
+                if id(candidate) in kept_ids:
+                    count(f"pipeline.{stage.name}.passed")
+                else:
+                    count(f"pipeline.{stage.name}.rejected")
+                    reject(stage.name)
+
+            candidates = kept
+
+        return candidates
+
+
+# -------------------------
+# SCAN STAGES
+# -------------------------
+# State keys: symbol, df, nifty_df; stages add context
+# (features/context.py, shared by every later stage) and candidate.
+def _history(state):
+    df = state["df"]
+    if df is None:
+        return "no_data"
+    if len(df) < 100:
+        return "short_history"
+    return True
+
+
+def _liquidity(state):
+    return passes_liquidity_filter(state["df"]) or "liquidity"
+
+
+def _indicators(state):
+    # Derived series are memoized on the context, not added to the frame
+    ctx = state["context"] = FeatureContext(state["df"], state["symbol"])
+    ctx.ema(10)
+    ctx.ema(15)
+    ctx.atr(14)
+    return True
+
+
+def _uptrend(state):
+    return in_uptrend(state["context"]) or "uptrend"
+
+
+def _signals(state):
+    ctx = state["context"]
+
+    # Pass nifty_df (a Benchmark in rank_today) for Relative Strength calc
+    candidate = extract_signals(ctx, state["symbol"], state["nifty_df"])
+    if candidate["features"] is None:
+        return "pattern"
+
+    # The trade plan only needs the last close and ATR
+    candidate["last_bar"] = pd.DataFrame({"close": ctx.tail(1)["close"], "atr_14": ctx.atr(14).tail(1)})
+    state["candidate"] = candidate
+    return True
+
+
+def _regime(candidates, market_status=None, **options):
+    # Hard Filter for Bearish Market: Only take 8+ score setups
+    if market_status == "BEARISH":
+        return [c for c in candidates if c["rule_score"] >= 8]
+    return candidates
+
+
+def _financials(candidates, fetcher=None, io_workers=None, **options):
+    """
+    Quarterly financials for the surviving candidates only: through the
+    AsyncFetcher when given, else on io_workers threads, else serially.
+    """
+
+    tickers = [financials_ticker(c["symbol"]) for c in candidates]
+
+    if fetcher is not None and tickers:
+        data = fetcher.fetch_quarterly_financials(tickers)
+        analyses = [analyze_quarterly_financials(data.get(t)) for t in tickers]
+    elif io_workers and len(tickers) > 1:
+        with ThreadPoolExecutor(max_workers=io_workers) as pool:
+            analyses = list(pool.map(analyze_quarterly_financials, tickers))
+    else:
+        analyses = [analyze_quarterly_financials(t) for t in tickers]
+
+    for candidate, analysis in zip(candidates, analyses):
+        attach_financials(candidate, analysis)
+
+    return candidates
+
+
+SCAN_STAGES = [
+    Stage("history", _history, cost=0),
+    Stage("liquidity", _liquidity, cost=1, requires=["history"]),
+    Stage("indicators", _indicators, cost=2, requires=["history"]),
+    Stage("uptrend", _uptrend, cost=1, requires=["indicators"]),
+    Stage("signals", _signals, cost=10, requires=["indicators"]),
+    Stage("regime", _regime, cost=0, requires=["signals"], batch=True),
+    Stage("financials", _financials, cost=100, requires=["signals"], batch=True),
+]
+
+SCAN_PIPELINE = Pipeline(SCAN_STAGES)
@@ -1,66 +1,80 @@
+import logging
+
 import pandas as pd
 
-from utils.yf_loader import load_daily_data
-from features.liquidity import passes_liquidity_filter
-from features.indicators import add_ema, add_atr
-from features.trend import in_uptrend
-from ml.predict import predict_today_probability
+from utils.instrumentation import count, timed
+from utils.yf_loader import load_bulk_daily_data
+from ml.predict import score_candidates
+from ranking.pipeline import SCAN_PIPELINE
 from ranking.trade_plan import compute_trade_plan
 
 
-from features.market_regime import get_market_regime
+from features.breadth import MarketRegime
+from features.market_regime import NIFTY_SYMBOL, as_benchmark, nifty_status
+from features.relative_strength import CrossSectionalRS
 
+logger = logging.getLogger(__name__)
 
-def rank_today(universe_csv, top_n=5):
-    # 1. Fetch Market Regime (NIFTY 50)
-    nifty_df, market_status = get_market_regime()
-    
-    if market_status == "BEARISH":
-        print("\n⚠️  MARKET REGIME WARNING: NIFTY 50 is below 50-day EMA (Bearish).")
-        print("    Stricter filters will apply. Cash is a position.\n")
 
-    universe = pd.read_csv(universe_csv)
-    symbols = universe.iloc[:, 0].tolist()
+@timed("features")
+def prepare_symbol(symbol, df, nifty_df):
+    """
+    Runs the per-symbol stages of the scan pipeline (ranking/pipeline.py)
+    for one symbol. Returns a candidate (see ml.predict.extract_features),
+    still without financials, or None if the symbol is filtered out.
+    finish_candidates completes the survivors before scoring.
+    """
 
-    rows = []
+    state = {"symbol": symbol, "df": df, "nifty_df": nifty_df}
+
+    if not SCAN_PIPELINE.run(state):
+        return None
+
+    return state["candidate"]
 
-    for symbol in symbols:
-        print(f"Scoring {symbol}...")
 
-        df = load_daily_data(symbol)
-        if df is None or len(df) < 100:
-            continue
+def finish_candidates(candidates, market_status=None, fetcher=None, io_workers=None):
+    """
+    Runs the batch stages of the scan pipeline (the market-regime filter,
+    then the financials lookup) on the candidates that survived
+    prepare_symbol.
+    """
 
-        if not passes_liquidity_filter(df):
-            continue
+    return SCAN_PIPELINE.run_batch(candidates, market_status=market_status, fetcher=fetcher, io_workers=io_workers)
 
-        df = add_ema(df, 10)
-        df = add_ema(df, 15)
-        df = add_atr(df, 14)
 
-        if not in_uptrend(df):
-            continue
+def safe_prepare_symbol(symbol, df, nifty_df):
+    """
+    prepare_symbol that reports and swallows errors, so one bad symbol
+    cannot abort the scan.
+    """
 
-        # ML + confidence (STEP 6)
-        # Pass nifty_df for Relative Strength calc
-        ml_prob, confidence, pattern, rule_score, financial_label = predict_today_probability(df, symbol, nifty_df)
+    try:
+        return prepare_symbol(symbol, df, nifty_df)
+    except Exception as e:
+        logger.warning(f"Error scoring {symbol}: {type(e).__name__}: {e}")
+        count("errors.scoring")
+        return None
 
-        if ml_prob is None:
-            continue
-        
-        # Hard Filter for Bearish Market: Only take 8+ score setups
-        if market_status == "BEARISH" and rule_score < 8:
-            continue
 
-        trade = compute_trade_plan(df, ml_prob)
+def build_rows(candidates):
+    """
+    Scores all surviving candidates in one model call (STEP 6 confidence
+    included) and attaches their trade plans. Keeps candidate order.
+    """
+
+    rows = []
+
+    for candidate, ml_prob, confidence in score_candidates(candidates):
+        trade = compute_trade_plan(candidate["last_bar"], ml_prob)
 
         rows.append({
-            "symbol": symbol,
+            "symbol": candidate["symbol"],
             "probability": round(ml_prob, 3),
             "confidence": confidence,
-            "pattern": pattern,
-            "rule_score": rule_score,
-            "financials": financial_label,
+            "pattern": candidate["pattern"],
+            "rule_score": candidate["rule_score"],
+            "financials": candidate["financial_label"],
             "tp1": trade["tp1"],
             "tp2": trade["tp2"],
             "tp3": trade["tp3"],
@@ -71,12 +85,116 @@ def rank_today(universe_csv, top_n=5):
             "p_tp3": trade["p_tp3"],
         })
 
+    return rows
+
+
+def rank_today(universe_csv, top_n=5, chunk_size=50, download=None, workers=0, io_workers=None,
+               fetcher=None):
+    """
+    Scans the universe and returns the top_n setups ranked by confidence.
+
+    workers > 0 switches to the parallel executor (ranking/executor.py):
+    downloads run on io_workers threads while symbol features are
+    extracted on `workers` processes. The result is identical to the
+    serial path. Either way the ML model is called once for all candidates.
+
+    fetcher (utils.async_fetch.AsyncFetcher) replaces the chunked bulk
+    download in the serial path with rate-limited, timed-out, retried
+    per-symbol requests, and also fetches the financials.
+
+    Filters run cheapest first (ranking/pipeline.py); quarterly financials
+    are only fetched for the symbols that pass all of them.
+
+    NIFTY is downloaded with the universe. The market regime (BEARISH
+    keeps only rule_score >= 8) is decided from NIFTY's trend and the
+    universe's breadth together (features/breadth.py), from the same bars.
+
+    Every downloaded symbol also feeds the cross-sectional RS engine
+    (features/relative_strength.py); the picks carry their universe
+    percentile ranks over 20, 50 and 120 days (rs_<h>_pct).
+
+    Stage timings, cache hits and per-filter rejections are collected by
+    utils.instrumentation when it is enabled.
+    """
+
+    universe = pd.read_csv(universe_csv)
+    symbols = universe.iloc[:, 0].tolist()
+    count("symbols.scanned", len(symbols))
+
+    if workers and workers > 0:
+        from ranking.executor import run_parallel_scan
+
+        # Workers need NIFTY (for RS) before the first chunk arrives
+        nifty_df, _ = nifty_status(load_bulk_daily_data([NIFTY_SYMBOL], download=download).get(NIFTY_SYMBOL))
+        benchmark = as_benchmark(nifty_df)
+        rs = CrossSectionalRS(benchmark)
+        frames = {}
+
+        def collect(chunk):
+            rs.add_frames(chunk)
+            frames.update(chunk)
+
+        candidates = run_parallel_scan(
+            symbols,
+            benchmark,
+            cpu_workers=workers,
+            io_workers=io_workers or workers,
+            chunk_size=chunk_size,
+            download=download,
+            on_frames=collect,
+        )
+    else:
+        # 1. Fetch the whole universe and NIFTY 50 in chunked multi-ticker requests
+        logger.info(f"Downloading {len(symbols)} symbols...")
+        batch = symbols + [NIFTY_SYMBOL]
+        if fetcher is not None:
+            frames = fetcher.fetch_daily_data(batch, download=download)
+        else:
+            frames = load_bulk_daily_data(batch, chunk_size=chunk_size, download=download)
+
+        nifty_df, _ = nifty_status(frames.pop(NIFTY_SYMBOL, None))
+
+        # NIFTY aligned once; calculate_rs looks every symbol's dates up in it
+        benchmark = as_benchmark(nifty_df)
+        rs = CrossSectionalRS(benchmark)
+        rs.add_frames(frames)
+
+        candidates = []
+
+        for symbol in symbols:
+            logger.debug(f"Scoring {symbol}...")
+
+            candidate = safe_prepare_symbol(symbol, frames.get(symbol), benchmark)
+            if candidate is not None:
+                candidates.append(candidate)
+
+    count("symbols.candidates", len(candidates))
+
+    # 2. Market Regime: NIFTY trend and universe breadth, from the loaded bars
+    regime = MarketRegime.from_frames(frames, nifty_df)
+    logger.info(f"Market regime: {regime.describe()}")
+
+    if regime.status == "BEARISH":
+        logger.warning("\n⚠️  MARKET REGIME WARNING: NIFTY 50 trend and universe breadth are Bearish.\n"
+                       "    Stricter filters will apply. Cash is a position.\n")
+
+    # 3. Regime filter, then financials only for the symbols still in the running
+    candidates = finish_candidates(candidates, market_status=regime.status, fetcher=fetcher,
+                                   io_workers=(io_workers or workers) if workers else None)
+
+    # 4. Score every surviving candidate in one batch
+    rows = build_rows(candidates)
+
     if not rows:
         return pd.DataFrame()
 
     result = pd.DataFrame(rows)
 
-    result = result.sort_values("confidence", ascending=False).head(top_n)
+    ranks = rs.table()[[f"rs_{h}_pct" for h in rs.horizons]]
+    result = result.join(ranks, on="symbol")
+
+    # Stable sort: ties keep universe order, so serial and parallel runs match
+    result = result.sort_values("confidence", ascending=False, kind="mergesort").head(top_n)
     result.insert(0, "rank", range(1, len(result) + 1))
 
     return result
@@ -0,0 +1,504 @@
+import argparse
+import json
+import queue
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from features.financials import analyze_quarterly_financials
+from features.incremental import IncrementalEMA, SymbolState, WeeklyTrend
+from features.liquidity import liquidity_pass
+from features.market_regime import as_benchmark, calculate_rs
+from features.patterns import classify_pattern, has_rejection_near_resistance
+from features.indicators import get_volatility_squeeze
+from ml.predict import rule_score_and_features, score_candidates
+from utils.helpers import (
+    has_bullish_candles,
+    is_consolidating,
+    volume_supports_breakout,
+    is_near_resistance,
+    compute_resistance
+)
+
+
+BENCHMARK = "^NSEI"
+
+# Bars kept per symbol for the windowed checks (resistance, squeeze and
+# RS look back 50 bars); indicators with longer memory live in SymbolState
+TAIL_BARS = 150
+
+BAR_FIELDS = ["date", "open", "high", "low", "close", "volume"]
+
+
+# -------------------------
+# REPLAY SOURCES
+# -------------------------
+def frames_to_bars(frames):
+    """
+    Long bar table (symbol + BAR_FIELDS) from {symbol: DataFrame}, in date
+    order; on each date the benchmark comes first, then universe order.
+    """
+
+    parts = []
+    for order, (symbol, df) in enumerate(frames.items()):
+        if df is None or df.empty:
+            continue
+        part = df[BAR_FIELDS].copy()
+        part.insert(0, "symbol", symbol)
+        part["_order"] = -1 if symbol == BENCHMARK else order
+        parts.append(part)
+
+    bars = pd.concat(parts, ignore_index=True)
+    bars["date"] = pd.to_datetime(bars["date"])
+    bars = bars.sort_values(["date", "_order"], kind="mergesort")
+
+    return bars.drop(columns="_order").reset_index(drop=True)
+
+
+def file_source(path):
+    """
+    Yields lists of bars, one list per date, from a CSV or Parquet file
+    with columns symbol, date, open, high, low, close, volume.
+    """
+
+    bars = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    yield from frame_source(bars)
+
+
+def frame_source(bars):
+    bars = bars.copy()
+    bars["date"] = pd.to_datetime(bars["date"])
+
+    # Benchmark first within each date so RS and regime see today's close
+    bars["_bench"] = bars["symbol"] != BENCHMARK
+    bars = bars.sort_values(["date", "_bench"], kind="mergesort").drop(columns="_bench")
+
+    for _, day in bars.groupby("date", sort=True):
+        yield list(day.itertuples(index=False))
+
+
+def queue_source(q, timeout=None):
+    """
+    Yields batches of bars from a queue.Queue fed by another thread (a live
+    feed stand-in). Blocks for the first bar of a batch, then drains what
+    is already queued. A None item ends the stream.
+    """
+
+    while True:
+        try:
+            item = q.get(timeout=timeout)
+        except queue.Empty:
+            return
+
+        if item is None:
+            return
+
+        batch = [item]
+        while True:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                yield batch
+                return
+            batch.append(item)
+
+        yield batch
+
+
+# -------------------------
+# PER-SYMBOL STREAM STATE
+# -------------------------
+class StreamSymbol:
+    """
+    Incremental state of one symbol: the indicator set (SymbolState), the
+    weekly trend, and the last TAIL_BARS bars. Bars for the current date
+    may be revised (intraday updates); they are applied to a copy of the
+    state as of the previous date until a later date arrives.
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.base = SymbolState(symbol)
+        self.weekly = WeeklyTrend()
+        self.tail = deque(maxlen=TAIL_BARS)
+        self.current = None
+        self.live = None
+        self.live_weekly = None
+
+    def update(self, bar):
+        date = pd.Timestamp(bar.date)
+
+        if self.current is not None:
+            if date < self.current[0]:
+                return False
+            if date > self.current[0]:
+                self._commit(self.current)
+
+        self.current = (date, float(bar.open), float(bar.high), float(bar.low),
+                        float(bar.close), float(bar.volume))
+
+        self.live = SymbolState.from_state(self.base.state())
+        self.live.update(*self.current)
+        self.live_weekly = WeeklyTrend.from_state(self.weekly.state())
+        self.live_weekly.update(date, self.current[4])
+        return True
+
+    def _commit(self, bar):
+        self.base.update(*bar)
+        self.weekly.update(bar[0], bar[4])
+        self.tail.append(bar)
+
+    @property
+    def bars(self):
+        return self.live.bars if self.live is not None else 0
+
+    def frame(self):
+        rows = list(self.tail) + ([self.current] if self.current is not None else [])
+        return pd.DataFrame(rows, columns=BAR_FIELDS)
+
+
+def evaluate_symbol(stream, nifty_df, financials):
+    """
+    prepare_symbol / extract_features on the incremental state: EMA, RSI
+    and ADX come from the indicator state, the windowed checks run on the
+    recent bars only. Returns a candidate for score_candidates, or None.
+    """
+
+    if stream.bars < 100:
+        return None
+
+    df = stream.frame()
+    if not liquidity_pass(df):
+        return None
+
+    values = stream.live.values()
+    close = df["close"].iloc[-1]
+    ema_10, ema_15 = values["ema_10"], values["ema_15"]
+
+    # in_uptrend (ranking filter) and is_uptrend (rule score)
+    if close <= ema_10 or close <= ema_15 or ema_10 < ema_15:
+        return None
+    uptrend = ema_10 > ema_15 and close > ema_15
+
+    bullish_candles = has_bullish_candles(df)
+    consolidation = is_consolidating(df)
+    volume_support = volume_supports_breakout(df)
+
+    resistance = compute_resistance(df)
+    near_res = is_near_resistance(df, resistance)
+
+    rsi_val = values["rsi_14"]
+    strong_trend = values["adx_14"] > 25
+    vcp = get_volatility_squeeze(df)
+    rs_score = calculate_rs(df, nifty_df)
+    weekly_trend = stream.live_weekly.value
+
+    pattern = classify_pattern(
+        df=df,
+        uptrend=uptrend,
+        bullish_candles=bullish_candles,
+        consolidation=consolidation,
+        volume_support=volume_support,
+        near_res=near_res,
+        resistance=resistance,
+        rsi_val=rsi_val
+    )
+
+    if pattern is None:
+        return None
+
+    # Only symbols with a pattern need their (possibly fetched) financials
+    financial = financials(stream.symbol)
+
+    rule_score, features = rule_score_and_features(
+        uptrend=uptrend,
+        bullish_candles=bullish_candles,
+        consolidation=consolidation,
+        volume_support=volume_support,
+        near_res=near_res,
+        strong_trend=strong_trend,
+        weekly_trend=weekly_trend,
+        vcp=vcp,
+        rs_score=rs_score,
+        trend_strength=(ema_10 - ema_15) / ema_15,
+        financial_score=financial["financial_score"],
+    )
+
+    return {
+        "symbol": stream.symbol,
+        "features": features,
+        "pattern": pattern,
+        "rule_score": rule_score,
+        "financial_label": financial["financial_label"],
+        "financial_score": financial["financial_score"],
+        "volume_support": int(volume_support),
+        "rejection": int(has_rejection_near_resistance(df, resistance)),
+    }
+
+
+# -------------------------
+# STREAMING RANKER
+# -------------------------
+class StreamingRanker:
+    """
+    Keeps a live top-N ranking while bars arrive.
+
+    on_bars() takes a batch of bars (any symbols, any dates in order),
+    updates only those symbols, re-scores them in one model call and
+    returns the rank-change events. The benchmark (^NSEI) can be part of
+    the stream; it drives relative strength and the market regime.
+
+    Equal confidences rank in `universe` order (as rank_today), symbols
+    outside it in order of first appearance.
+    """
+
+    def __init__(self, top_n=5, nifty_df=None, financials=None, universe=None):
+        self.top_n = top_n
+        self.symbols = {}
+        self.order = {symbol: i for i, symbol in enumerate(universe or [])}
+        self.scores = {}
+        self.ranking = []
+
+        self.nifty_rows = []
+        self.nifty_df = None
+        self.nifty_ema = IncrementalEMA(50)
+        self.nifty_bars = 0
+        self.market_status = "NEUTRAL"
+
+        if nifty_df is not None:
+            for row in nifty_df[BAR_FIELDS].itertuples(index=False):
+                self._update_benchmark(row)
+
+        self._financials = financials or analyze_quarterly_financials
+        self._financial_cache = {}
+
+        self.stats = {"batches": 0, "bars": 0, "rescored": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+    # ---- benchmark ----
+    def _update_benchmark(self, bar):
+        row = (pd.Timestamp(bar.date), float(bar.close))
+
+        if self.nifty_rows and self.nifty_rows[-1][0] == row[0]:
+            # Intraday revision: rebuild the EMA for the last bar only
+            self.nifty_rows[-1] = row
+        else:
+            if self.nifty_rows:
+                self.nifty_ema.update(self.nifty_rows[-1][1])
+            self.nifty_rows.append(row)
+
+        live_ema = IncrementalEMA.from_state(self.nifty_ema.state())
+        ema_50 = live_ema.update(row[1])
+
+        self.nifty_bars = len(self.nifty_rows)
+        if self.nifty_bars < 50:
+            self.market_status = "NEUTRAL"
+        else:
+            self.market_status = "BULLISH" if row[1] > ema_50 else "BEARISH"
+
+        self.nifty_df = None
+
+    def _nifty(self):
+        if self.nifty_df is None and self.nifty_rows:
+            # Aligned once per NIFTY bar, not once per symbol evaluated
+            self.nifty_df = as_benchmark(pd.DataFrame(self.nifty_rows[-TAIL_BARS * 2:], columns=["date", "close"]))
+        return self.nifty_df
+
+    def _financial(self, symbol):
+        # Quarterly results do not change intraday: once per symbol
+        if symbol not in self._financial_cache:
+            ticker = symbol if symbol.endswith(".NS") else symbol + ".NS"
+            self._financial_cache[symbol] = self._financials(ticker)
+        return self._financial_cache[symbol]
+
+    # ---- updates ----
+    def warm_up(self, bars):
+        """
+        Feeds history without scoring or emitting events.
+        """
+
+        for bar in bars:
+            self._apply(bar)
+
+    def _apply(self, bar):
+        if bar.symbol == BENCHMARK:
+            self._update_benchmark(bar)
+            return None
+
+        stream = self.symbols.get(bar.symbol)
+        if stream is None:
+            stream = self.symbols[bar.symbol] = StreamSymbol(bar.symbol)
+            self.order.setdefault(bar.symbol, len(self.order))
+
+        return bar.symbol if stream.update(bar) else None
+
+    def on_bars(self, bars):
+        started = time.perf_counter()
+
+        changed = []
+        status_before = self.market_status
+
+        for bar in bars:
+            symbol = self._apply(bar)
+            if symbol is not None and symbol not in changed:
+                changed.append(symbol)
+
+        nifty_df = self._nifty()
+        candidates = [
+            evaluate_symbol(self.symbols[s], nifty_df, self._financial)
+            for s in changed
+        ]
+
+        for symbol in changed:
+            self.scores.pop(symbol, None)
+
+        for candidate, ml_prob, confidence in score_candidates(candidates):
+            self.scores[candidate["symbol"]] = {
+                "symbol": candidate["symbol"],
+                "probability": round(ml_prob, 3),
+                "confidence": confidence,
+                "pattern": candidate["pattern"],
+                "rule_score": candidate["rule_score"],
+                "financials": candidate["financial_label"],
+            }
+
+        date = max(pd.Timestamp(bar.date) for bar in bars) if bars else None
+        events = self._rerank(date)
+
+        if self.market_status != status_before:
+            events.insert(0, {"event": "REGIME", "date": date, "status": self.market_status})
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["batches"] += 1
+        self.stats["bars"] += len(bars)
+        self.stats["rescored"] += len(changed)
+        self.stats["total_ms"] += elapsed
+        self.stats["max_ms"] = max(self.stats["max_ms"], elapsed)
+
+        return events
+
+    def _rerank(self, date):
+        rows = list(self.scores.values())
+
+        # Hard Filter for Bearish Market: Only take 8+ score setups
+        if self.market_status == "BEARISH":
+            rows = [r for r in rows if r["rule_score"] >= 8]
+
+        # Confidence, ties in universe order
+        rows.sort(key=lambda r: (-r["confidence"], self.order[r["symbol"]]))
+        ranking = rows[:self.top_n]
+
+        before = {r["symbol"]: i + 1 for i, r in enumerate(self.ranking)}
+        after = {r["symbol"]: i + 1 for i, r in enumerate(ranking)}
+
+        events = []
+        for row in ranking:
+            symbol = row["symbol"]
+            rank = after[symbol]
+            if symbol not in before:
+                events.append(dict(event="ENTER", date=date, rank=rank, **row))
+            elif before[symbol] != rank:
+                events.append(dict(event="MOVE", date=date, rank=rank, prev_rank=before[symbol], **row))
+
+        for row in self.ranking:
+            if row["symbol"] not in after:
+                events.append({"event": "EXIT", "date": date, "symbol": row["symbol"],
+                               "prev_rank": before[row["symbol"]]})
+
+        self.ranking = ranking
+        return events
+
+    def top(self):
+        """
+        Current ranking as a DataFrame (rank_today columns, no trade plan).
+        """
+
+        if not self.ranking:
+            return pd.DataFrame()
+
+        result = pd.DataFrame(self.ranking)
+        result.insert(0, "rank", range(1, len(result) + 1))
+        return result
+
+
+def run_stream(source, ranker, events_path=None, verbose=True):
+    """
+    Feeds every batch from `source` to the ranker and writes the events
+    as JSON lines (events_path) and/or prints them. Returns all events.
+    """
+
+    out = open(events_path, "w") if events_path else None
+    events = []
+
+    try:
+        for batch in source:
+            for event in ranker.on_bars(batch):
+                events.append(event)
+                if out:
+                    out.write(json.dumps(event, default=str) + "\n")
+                if verbose:
+                    _print_event(event)
+    finally:
+        if out:
+            out.close()
+
+    stats = ranker.stats
+    if stats["batches"]:
+        print(f"\nProcessed {stats['bars']} bars in {stats['batches']} updates "
+              f"({stats['rescored']} symbol re-scores): "
+              f"mean {stats['total_ms'] / stats['batches']:.2f} ms, max {stats['max_ms']:.2f} ms per update")
+
+    return events
+
+
+def _print_event(event):
+    date = pd.Timestamp(event["date"]).strftime("%Y-%m-%d") if event.get("date") is not None else "-"
+
+    if event["event"] == "REGIME":
+        print(f"{date}  REGIME  {event['status']}")
+    elif event["event"] == "EXIT":
+        print(f"{date}  EXIT    {event['symbol']} (was #{event['prev_rank']})")
+    else:
+        moved = f" (was #{event['prev_rank']})" if event["event"] == "MOVE" else ""
+        print(f"{date}  {event['event']:<7} #{event['rank']} {event['symbol']} "
+              f"confidence {event['confidence']}{moved}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay bars and stream rank changes")
+    parser.add_argument("--replay", default=None,
+                        help="CSV/Parquet bar file (symbol, date, OHLCV); default: universe history")
+    parser.add_argument("--universe", default="universe/smallcap_250.csv")
+    parser.add_argument("--days", type=int, default=250, help="Replay the last N sessions (rest is warm-up)")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--events", default=None, help="Write events as JSON lines to this file")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    universe = None
+    if args.replay:
+        bars = pd.read_parquet(args.replay) if args.replay.endswith(".parquet") else pd.read_csv(args.replay)
+    else:
+        from utils.yf_loader import load_bulk_daily_data, load_daily_data
+
+        universe = pd.read_csv(args.universe).iloc[:, 0].tolist()
+        frames = {BENCHMARK: load_daily_data(BENCHMARK, period="2y")}
+        frames.update(load_bulk_daily_data(universe))
+        bars = frames_to_bars(frames)
+
+    bars["date"] = pd.to_datetime(bars["date"])
+    dates = np.unique(bars["date"].to_numpy())
+    start = dates[-args.days] if len(dates) > args.days else dates[0]
+
+    ranker = StreamingRanker(top_n=args.top_n, universe=universe)
+
+    print("Warming up...")
+    history = frame_source(bars[bars["date"] < start])
+    for batch in history:
+        ranker.warm_up(batch)
+
+    run_stream(frame_source(bars[bars["date"] >= start]), ranker, args.events, verbose=not args.quiet)
+    print(ranker.top().to_string(index=False))
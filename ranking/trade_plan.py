@@ -1,10 +1,16 @@
+from features.context import as_context
+from utils.instrumentation import timed
+
+
+@timed("trade_plan")
 def compute_trade_plan(df, probability):
     """
     Computes TP1, TP2, TP3, SL and their probabilities.
     """
 
-    close = df["close"].iloc[-1]
-    atr = df["atr_14"].iloc[-1]
+    ctx = as_context(df)
+    close = ctx.last("close")
+    atr = ctx.atr(14).iloc[-1]
     atr_pct = atr / close
 
     # Target percentages (ATR capped)
@@ -1,79 +1,138 @@
+import argparse
+import logging
 import os
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from ranking.rank_today import rank_today
+# Heavy imports (pandas, yfinance, the feature stack, the model) are
+# deferred until the holiday check (utils/trading_calendar.py) has passed,
+# so skipped days exit fast.
+
+logger = logging.getLogger("run_daily")
 
 # Output folders
 os.makedirs("output", exist_ok=True)
 
-def run_daily():
-    today_date = datetime.now()
+def run_daily(workers=0, io_workers=None, fetcher=None, as_of=None, report_path=None, profile_path=None):
+    """
+    report_path: write a JSON run report (stage timings, cache hits,
+    filter rejections; see utils/instrumentation.py). "auto" names it
+    output/run_report_<date>.json.
+    profile_path: dump a cProfile of the scan.
+    """
+
+    today_date = as_of or datetime.now()
     today = today_date.strftime("%Y-%m-%d")
-    print(f"\nRunning daily scan for {today}\n")
+    logger.info(f"\nRunning daily scan for {today}\n")
 
     # --- HOLIDAY LOGIC START ---
     # User Rule: "dont want it to run if the next day the market is closed"
-    import calendar
-    from datetime import timedelta
-    
-    next_day = today_date + timedelta(days=1)
-    weekday = next_day.weekday() # 0=Mon, ... 5=Sat, 6=Sun
-
-    # 1. Weekend Check (If next day is Sat or Sun, skip)
     # Exception: Always run if triggered manually
+    from utils.trading_calendar import get_calendar
+
+    calendar = get_calendar()
     is_manual_run = (os.environ.get("RUN_TYPE") == "workflow_dispatch")
-    
-    if weekday >= 5 and not is_manual_run:
-        print(f"Skipping: Next day ({next_day.strftime('%A')}) is a weekend.")
-        return
-    elif weekday >= 5 and is_manual_run:
-        print(f"Manual Run detected: Ignoring weekend check (Next day is {next_day.strftime('%A')}).")
-
-    # 2. NSE Holidays 2025 (Hardcoded for reliability)
-    # Format: YYYY-MM-DD
-    nse_holidays_2025 = [
-        "2025-01-26", # Republic Day
-        "2025-02-26", # Mahashivratri
-        "2025-03-14", # Holi
-        "2025-03-31", # Eid-ul-Fitr
-        "2025-04-10", # Mahavir Jayanti
-        "2025-04-14", # Good Friday / Ambedkar Jayanti
-        "2025-05-12", # Buddha Purnima
-        "2025-06-07", # Bakri Id
-        "2025-08-15", # Independence Day
-        "2025-08-27", # Ganesh Chaturthi
-        "2025-10-02", # Gandhi Jayanti
-        "2025-10-21", # Diwali (Laxmi Pujan)
-        "2025-10-22", # Diwali (Balipratipada)
-        "2025-11-05", # Guru Nanak Jayanti
-        "2025-12-25", # Christmas
-    ]
-    
+
+    next_day = today_date + timedelta(days=1)
     next_day_str = next_day.strftime("%Y-%m-%d")
-    if next_day_str in nse_holidays_2025 and not is_manual_run:
-        print(f"Skipping: Next day ({next_day_str}) is a Market Holiday.")
-        return
-    elif next_day_str in nse_holidays_2025 and is_manual_run:
-         print(f"Manual Run detected: Ignoring holiday check ({next_day_str}).")
+
+    if not calendar.covers(next_day):
+        logger.warning(f"No NSE holidays listed for {next_day.year} in the trading calendar; "
+                       f"only weekends are skipped.")
+
+    if not calendar.is_session(next_day):
+        if next_day.weekday() >= 5:
+            reason = f"Next day ({next_day.strftime('%A')}) is a weekend"
+        else:
+            reason = f"Next day ({next_day_str}) is a Market Holiday ({calendar.holiday_name(next_day)})"
+
+        if not is_manual_run:
+            logger.info(f"Skipping: {reason}.")
+            return
+        logger.info(f"Manual Run detected: Ignoring market-closed check ({reason}).")
     # --- HOLIDAY LOGIC END ---
 
-    df = rank_today("universe/smallcap_250.csv", top_n=5)
+    from ranking.rank_today import rank_today
+    from utils import instrumentation
+
+    if report_path:
+        instrumentation.enable()
+
+    with instrumentation.profile(profile_path):
+        df = rank_today(
+            "universe/smallcap_250.csv",
+            top_n=5,
+            workers=workers,
+            io_workers=io_workers,
+            fetcher=fetcher,
+        )
+
+    if profile_path:
+        logger.info(f"Saved profile: {profile_path}")
+
+    if report_path:
+        if report_path == "auto":
+            report_path = f"output/run_report_{today}.json"
+        instrumentation.write_report(report_path, date=today, workers=workers, picks=len(df))
+        instrumentation.disable()
+        logger.info(f"Saved run report: {report_path}")
 
     if df.empty:
-        print("No valid setups today.")
+        logger.info("No valid setups today.")
         return
 
     # Save CSV
     csv_path = f"output/top_picks_{today}.csv"
     df.to_csv(csv_path, index=False)
-    print(f"Saved CSV: {csv_path}")
+    logger.info(f"Saved CSV: {csv_path}")
 
     # Console summary
     from utils.helpers import print_colored_df
+    instrumentation.flush_logs()
     print("\nTOP PICKS TODAY:")
     print_colored_df(df[["rank", "symbol", "confidence", "pattern", "rule_score", "financials", "trailing_sl"]])
 
 
 if __name__ == "__main__":
-    run_daily()
+    parser = argparse.ArgumentParser(description="Daily NIFTY Smallcap 250 scan")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Worker processes for scoring (0 = serial scan)")
+    parser.add_argument("--io-workers", type=int, default=None,
+                        help="Download threads in parallel mode (default: --workers)")
+    parser.add_argument("--async-fetch", action="store_true",
+                        help="Download with the rate-limited async fetcher (serial scan only)")
+    parser.add_argument("--rate", type=float, default=5.0,
+                        help="Async fetch: requests per second")
+    parser.add_argument("--timeout", type=float, default=20.0,
+                        help="Async fetch: per-request timeout in seconds")
+    parser.add_argument("--hedge-after", type=float, default=None,
+                        help="Async fetch: start a duplicate request after N seconds")
+    parser.add_argument("--date", default=None,
+                        help="Run as of YYYY-MM-DD instead of today (holiday check and output name)")
+    parser.add_argument("--record", default=None, metavar="DIR",
+                        help="Record every download to DIR for later --replay")
+    parser.add_argument("--replay", default=None, metavar="DIR",
+                        help="Serve all market data from a recording instead of the network")
+    parser.add_argument("--log-level", default="INFO",
+                        help="Console log level (DEBUG shows every symbol as it is scored)")
+    parser.add_argument("--report", nargs="?", const="auto", default=None,
+                        help="Write a JSON run report (default path: output/run_report_<date>.json)")
+    parser.add_argument("--profile", default=None,
+                        help="Dump a cProfile of the scan to this file (python -m pstats FILE)")
+    args = parser.parse_args()
+
+    from utils.instrumentation import configure_logging
+    configure_logging(args.log_level)
+
+    as_of = datetime.strptime(args.date, "%Y-%m-%d") if args.date else None
+
+    if args.record or args.replay:
+        from utils.providers import configure
+        configure(record=args.record, replay=args.replay)
+
+    fetcher = None
+    if args.async_fetch:
+        from utils.async_fetch import AsyncFetcher
+        fetcher = AsyncFetcher(rate=args.rate, timeout=args.timeout, hedge_after=args.hedge_after)
+
+    run_daily(workers=args.workers, io_workers=args.io_workers, fetcher=fetcher, as_of=as_of,
+              report_path=args.report, profile_path=args.profile)
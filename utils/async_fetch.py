@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.yf_loader import load_daily_data
+from utils.financials_loader import get_quarterly_financials, fetch_quarterly_financials
+from utils import financials_cache
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------
+# RATE LIMITER
+# -------------------------
+class TokenBucket:
+    """
+    Token-bucket rate limiter for asyncio.
+    `rate` tokens are added per second, up to `capacity` (the burst size).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# -------------------------
+# FETCHER
+# -------------------------
+class AsyncFetcher:
+    """
+    Runs blocking loader calls (yfinance, the on-disk caches) on a thread
+    pool under asyncio control:
+
+    - max_concurrency: global limit on in-flight requests
+    - rate / burst: token-bucket limit on request starts
+    - timeout: per-attempt timeout in seconds
+    - retries / backoff / max_backoff: exponential backoff with jitter
+    - hedge_after: if an attempt has not finished after this many seconds,
+      a duplicate request is started and the first result wins
+
+    A timed-out thread cannot be killed; its result is simply discarded, so
+    the executor is sized with headroom above max_concurrency.
+    """
+
+    def __init__(self, max_concurrency=8, rate=5.0, burst=10, timeout=20.0, retries=3,
+                 backoff=0.5, max_backoff=8.0, hedge_after=None, seed=None):
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self._random = random.Random(seed)
+        self.stats = {"requests": 0, "timeouts": 0, "errors": 0, "retries": 0, "hedges": 0}
+
+    # ---- single attempt ----
+    async def _attempt(self, fn, args, kwargs):
+        async with self._semaphore:
+            await self._bucket.acquire()
+            self.stats["requests"] += 1
+
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+
+            try:
+                return await asyncio.wait_for(call, self.timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                raise
+
+    async def _hedged_attempt(self, fn, args, kwargs):
+        if self.hedge_after is None:
+            return await self._attempt(fn, args, kwargs)
+
+        primary = asyncio.ensure_future(self._attempt(fn, args, kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        self.stats["hedges"] += 1
+        backup = asyncio.ensure_future(self._attempt(fn, args, kwargs))
+        pending = {primary, backup}
+        error = None
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                error = task.exception()
+
+        raise error
+
+    # ---- retries ----
+    async def call(self, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) with rate limiting, timeout, hedging and
+        retries. Raises the last error once retries are exhausted.
+        """
+
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._hedged_attempt(fn, args, kwargs)
+            except Exception as e:
+                if not isinstance(e, asyncio.TimeoutError):
+                    self.stats["errors"] += 1
+                if attempt == self.retries:
+                    raise
+
+                self.stats["retries"] += 1
+                delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+                await asyncio.sleep(delay * (0.5 + self._random.random()))
+
+    async def _gather(self, fn, symbols, **kwargs):
+        async def one(symbol):
+            try:
+                return symbol, await self.call(fn, symbol, **kwargs)
+            except Exception as e:
+                logger.warning(f"Fetch failed for {symbol} after {self.retries + 1} attempts: "
+                               f"{type(e).__name__}: {e}")
+                return symbol, None
+
+        return await asyncio.gather(*(one(symbol) for symbol in symbols))
+
+    def run(self, fn, symbols, **kwargs):
+        """
+        Fetches fn(symbol, **kwargs) for every symbol.
+        Returns {symbol: result}; failed symbols are left out.
+        """
+
+        symbols = list(dict.fromkeys(symbols))
+
+        async def main():
+            # asyncio primitives must be created inside the running loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._bucket = TokenBucket(self.rate, self.burst)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency * 2)
+            try:
+                return await self._gather(fn, symbols, **kwargs)
+            finally:
+                # Do not block on threads stuck in timed-out calls
+                self._executor.shutdown(wait=False, cancel_futures=True)
+
+        return {symbol: value for symbol, value in asyncio.run(main()) if value is not None}
+
+    # ---- loader contracts ----
+    def fetch_daily_data(self, symbols, period="2y", download=None, use_cache=True):
+        """
+        Same contract as load_bulk_daily_data: {symbol: DataFrame}.
+        """
+
+        return self.run(
+            _load_daily_strict,
+            symbols,
+            period=period,
+            download=download,
+            use_cache=use_cache,
+        )
+
+    def fetch_quarterly_financials(self, symbols, fetch=None, use_cache=True):
+        """
+        {symbol: quarterly financials DataFrame} via get_quarterly_financials.
+        """
+
+        results = self.run(
+            _financials_strict,
+            symbols,
+            fetch=fetch,
+            use_cache=use_cache,
+        )
+
+        # Symbols that kept failing fall back to a stale cache entry, if any
+        if use_cache:
+            for symbol in symbols:
+                if symbol not in results:
+                    entry = financials_cache.read_entry(symbol)
+                    if entry is not None and entry["data"] is not None:
+                        results[symbol] = entry["data"]
+
+        return results
+
+
+def _load_daily_strict(symbol, **kwargs):
+    # Turn "no data" into an error so it is retried like a failed request
+    df = load_daily_data(symbol, **kwargs)
+    if df is None:
+        raise ValueError(f"No data returned for {symbol}")
+    return df
+
+
+def _financials_strict(symbol, fetch=None, use_cache=True):
+    # get_quarterly_financials swallows fetch errors; re-raise them so
+    # the fetcher can retry
+    errors = []
+
+    def tracked(sym):
+        try:
+            return (fetch or fetch_quarterly_financials)(sym)
+        except Exception as e:
+            errors.append(e)
+            raise
+
+    df = get_quarterly_financials(symbol, use_cache=use_cache, fetch=tracked)
+    if errors:
+        raise errors[-1]
+    return df
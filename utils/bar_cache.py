@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from utils.bars import compact_frame
+
+
+CACHE_DIR = os.path.join("data", "cache", "bars")
+INDEX_FILE = "index.json"
+
+logger = logging.getLogger(__name__)
+
+# Bulk loads may run on several threads at once (ranking/executor.py)
+_INDEX_LOCK = threading.Lock()
+
+
+def _safe_name(symbol):
+    # "^NSEI" and similar index tickers are not friendly file names
+    return symbol.replace("^", "_").replace("/", "_")
+
+
+def _path(symbol, cache_dir):
+    return os.path.join(cache_dir, f"{_safe_name(symbol)}.parquet")
+
+
+# -------------------------
+# INDEX (coverage per symbol)
+# -------------------------
+# Each entry is {"since": first date the cache is complete from,
+#                "last": last cached bar date,
+#                "as_of": last completed session when it was downloaded
+#                         (utils/trading_calendar.py)}, all as "YYYY-MM-DD".
+def load_index(cache_dir=None):
+    """
+    Returns the cache index as {symbol: {"since": ..., "last": ...}}.
+    """
+
+    path = os.path.join(cache_dir or CACHE_DIR, INDEX_FILE)
+
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Warning: Bar cache index unreadable, rebuilding: {e}")
+        return {}
+
+
+def save_index(index, cache_dir=None):
+    """
+    Merges the given entries into the index on disk.
+    Entries written concurrently by other loaders are kept.
+    """
+
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    path = os.path.join(cache_dir, INDEX_FILE)
+    tmp_path = path + ".tmp"
+
+    with _INDEX_LOCK:
+        merged = load_index(cache_dir)
+        merged.update(index)
+
+        with open(tmp_path, "w") as f:
+            json.dump(merged, f, indent=1, sort_keys=True)
+
+        os.replace(tmp_path, path)
+
+
+def last_cached_date(symbol, cache_dir=None, index=None):
+    """
+    Returns the last cached bar date for a symbol as a Timestamp, or None.
+    """
+
+    index = load_index(cache_dir) if index is None else index
+    entry = index.get(symbol)
+
+    return pd.Timestamp(entry["last"]) if entry else None
+
+
+def is_current(symbol, cache_dir=None, index=None, calendar=None, now=None):
+    """
+    True if the cached bars were downloaded after the last completed
+    session, so no newer bar can exist yet. Entries written before the
+    as_of stamp are never current.
+    """
+
+    from utils.trading_calendar import get_calendar
+
+    index = load_index(cache_dir) if index is None else index
+    entry = index.get(symbol)
+
+    if not entry or "as_of" not in entry:
+        return False
+
+    return (calendar or get_calendar()).is_current(entry["as_of"], now)
+
+
+def covers_period(symbol, period_start, cache_dir=None, index=None):
+    """
+    True if the cache for a symbol is complete back to period_start.
+    A period_start of None ("max") is never considered covered.
+    """
+
+    index = load_index(cache_dir) if index is None else index
+    entry = index.get(symbol)
+
+    if not entry or period_start is None:
+        return False
+
+    # A few days of slack for weekends/holidays at the period boundary
+    return pd.Timestamp(entry["since"]) <= period_start + pd.Timedelta(days=7)
+
+
+# -------------------------
+# READ / WRITE
+# -------------------------
+def read_bars(symbol, cache_dir=None):
+    """
+    Reads the cached history for a symbol, or None if nothing is cached.
+    """
+
+    path = _path(symbol, cache_dir or CACHE_DIR)
+
+    if not os.path.exists(path):
+        return None
+
+    try:
+        # Histories cached before the compact layout are converted on read
+        return compact_frame(pd.read_parquet(path))
+    except Exception as e:
+        logger.warning(f"Warning: Could not read cached bars for {symbol}: {e}")
+        return None
+
+
+def write_bars(symbol, df, since=None, cache_dir=None, index=None, as_of=None):
+    """
+    Writes the full history for a symbol and records its coverage.
+    `since` is the start of the period that was fully downloaded; it is
+    only passed when (re)seeding the cache, appends keep the old value.
+    `as_of` is the last completed session when the bars were downloaded
+    (see is_current).
+    When an index dict is passed it is updated in place and the caller
+    is responsible for saving it (used by bulk loads).
+    """
+
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    path = _path(symbol, cache_dir)
+    tmp_path = path + ".tmp"
+
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    save = index is None
+    index = load_index(cache_dir) if save else index
+
+    entry = dict(index.get(symbol) or {})
+    if since is not None or "since" not in entry:
+        first = pd.Timestamp(df["date"].iloc[0])
+        entry["since"] = (min(since, first) if since is not None else first).strftime("%Y-%m-%d")
+    entry["last"] = pd.Timestamp(df["date"].iloc[-1]).strftime("%Y-%m-%d")
+    if as_of is not None:
+        entry["as_of"] = str(as_of)
+    index[symbol] = entry
+
+    if save:
+        save_index(index, cache_dir)
+
+
+def append_bars(cached, new):
+    """
+    Appends freshly downloaded bars to the cached history.
+    Overlapping dates are replaced by the new download, so the last
+    (possibly still forming) cached bar gets corrected.
+    """
+
+    if cached is None or cached.empty:
+        return new
+    if new is None or new.empty:
+        return cached
+
+    new = new[list(cached.columns.intersection(new.columns))]
+
+    merged = pd.concat([cached, new], ignore_index=True)
+    merged["date"] = pd.to_datetime(merged["date"])
+    merged = merged.drop_duplicates("date", keep="last")
+
+    return merged.sort_values("date").reset_index(drop=True)
+
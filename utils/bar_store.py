@@ -0,0 +1,361 @@
+"""
+Memory-mapped store of a whole universe's daily bars.
+
+Worker processes open the store read-only and read one symbol's history
+as NumPy views into the page cache, instead of being sent a pickled
+DataFrame per symbol. Build or refresh it from the repo root:
+
+    python -m utils.bar_store --universe universe/smallcap_250.csv --period 3y
+
+Layout of a store directory:
+    index.json                 dates, symbols, per-symbol extent, capacity
+    <field>.<generation>.npy   float64 (symbol, date) arrays, one per
+                               OHLCV field; NaN where a symbol has no bar
+
+Each symbol's history is one contiguous row, so its arrays are plain
+slices. Rows and columns are allocated with slack, so a new trading day
+(or symbol) is written in place; only when the slack runs out, or a bar
+arrives for a date before the last stored one, is the store rewritten
+under a new generation. Readers that already hold the old files keep
+using them.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.bars import PRICE_COLUMNS
+
+
+STORE_DIR = os.path.join("data", "store")
+INDEX_FILE = "index.json"
+FIELDS = PRICE_COLUMNS + ["volume"]
+
+# Free columns (trading days) and rows (symbols) left for appends
+DATE_SLACK = 260
+SYMBOL_SLACK = 64
+
+logger = logging.getLogger(__name__)
+
+_WRITE_LOCK = threading.Lock()
+
+
+def _array_path(store_dir, field, generation):
+    return os.path.join(store_dir, f"{field}.{generation}.npy")
+
+
+def _read_index(store_dir):
+    with open(os.path.join(store_dir, INDEX_FILE)) as f:
+        return json.load(f)
+
+
+def _write_index(store_dir, index):
+    path = os.path.join(store_dir, INDEX_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(path + ".tmp", path)
+
+
+def _as_datetime(values):
+    return pd.to_datetime(pd.Series(values)).to_numpy()
+
+
+def _extent(row):
+    # (first column, last column, bar count) of one symbol row
+    valid = np.flatnonzero(~np.isnan(row))
+    if len(valid) == 0:
+        return -1, -1, 0
+    return int(valid[0]), int(valid[-1]), len(valid)
+
+
+# -------------------------
+# READ
+# -------------------------
+class BarStore:
+    """
+    An open store. mode="r" maps the arrays read-only (the worker case),
+    mode="r+" is used by append_to_store.
+    """
+
+    def __init__(self, store_dir=None, mode="r"):
+        self.store_dir = store_dir or STORE_DIR
+        self.mode = mode
+
+        index = _read_index(self.store_dir)
+        self.generation = index["generation"]
+        self.symbols = index["symbols"]
+        self.dates = _as_datetime(index["dates"])
+        self.extents = {symbol: tuple(extent) for symbol, extent in zip(self.symbols, index["extents"])}
+        self._position = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        self.arrays = {
+            field: np.load(_array_path(self.store_dir, field, self.generation), mmap_mode=mode)
+            for field in FIELDS
+        }
+
+    def __contains__(self, symbol):
+        return symbol in self._position
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @property
+    def capacity(self):
+        return self.arrays["close"].shape
+
+    def bars(self, symbol):
+        """
+        {"date", "open", "high", "low", "close", "volume"} arrays for one
+        symbol, from its first to its last bar, or None if it has none.
+        These are views into the mapped files (no copy) unless the symbol
+        skipped a day inside its history; those days are dropped from a
+        copy, matching the loaders' frames.
+        """
+
+        first, last, count = self.extents.get(symbol, (-1, -1, 0))
+        if count == 0:
+            return None
+
+        row = self._position[symbol]
+        columns = slice(first, last + 1)
+
+        bars = {"date": self.dates[columns]}
+        bars.update({field: self.arrays[field][row, columns] for field in FIELDS})
+
+        if count != last - first + 1:
+            keep = ~np.isnan(bars["close"])
+            bars = {name: values[keep] for name, values in bars.items()}
+
+        return bars
+
+    def frame(self, symbol):
+        """
+        bars() as a DataFrame in the load_daily_data layout (float64 prices
+        and volume), or None.
+        """
+
+        bars = self.bars(symbol)
+        if bars is None:
+            return None
+        return pd.DataFrame(bars, copy=False)
+
+    def panel(self):
+        """
+        The whole store as a features.panel.Panel (dates x symbols views).
+        """
+
+        from features.panel import Panel
+
+        shape = (len(self.symbols), len(self.dates))
+        fields = {field: self.arrays[field][:shape[0], :shape[1]].T for field in FIELDS}
+        return Panel(pd.DatetimeIndex(self.dates), list(self.symbols), **fields)
+
+
+def open_store(store_dir=None):
+    """
+    Opens a store read-only, or returns None if there is none.
+    """
+
+    store_dir = store_dir or STORE_DIR
+    if not os.path.exists(os.path.join(store_dir, INDEX_FILE)):
+        return None
+    return BarStore(store_dir)
+
+
+# -------------------------
+# BUILD / APPEND
+# -------------------------
+def _write_generation(store_dir, generation, symbols, dates, fill):
+    """
+    Writes fresh arrays for `generation` with slack capacity; fill(field,
+    out) copies the data in. Returns the extents per symbol.
+    """
+
+    shape = (len(symbols) + SYMBOL_SLACK, len(dates) + DATE_SLACK)
+
+    for field in FIELDS:
+        out = np.lib.format.open_memmap(
+            _array_path(store_dir, field, generation), mode="w+", dtype=np.float64, shape=shape
+        )
+        out[:] = np.nan
+        fill(field, out)
+        out.flush()
+        if field == "close":
+            extents = [_extent(out[i, :len(dates)]) for i in range(len(symbols))]
+        del out
+
+    return extents
+
+
+def _remove_generation(store_dir, generation):
+    for field in FIELDS:
+        try:
+            os.remove(_array_path(store_dir, field, generation))
+        except OSError:
+            pass
+
+
+def _commit(store_dir, generation, symbols, dates, extents, previous=None):
+    _write_index(store_dir, {
+        "generation": generation,
+        "symbols": list(symbols),
+        "dates": [pd.Timestamp(d).strftime("%Y-%m-%d") for d in dates],
+        "extents": [list(e) for e in extents],
+    })
+    if previous is not None and previous != generation:
+        _remove_generation(store_dir, previous)
+
+
+def build_store(frames, store_dir=None, generation=0):
+    """
+    Writes {symbol: frame} (load_daily_data layout) as a new store, over
+    any existing one. Returns the store opened read-only.
+    """
+
+    store_dir = store_dir or STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+
+    frames = {s: df for s, df in frames.items() if df is not None and not df.empty}
+    symbols = list(frames)
+    dates = {s: _as_datetime(frames[s]["date"]) for s in symbols}
+    calendar = np.unique(np.concatenate(list(dates.values()))) if symbols else _as_datetime([])
+
+    def fill(field, out):
+        for i, symbol in enumerate(symbols):
+            cols = np.searchsorted(calendar, dates[symbol])
+            # Duplicate dates: the later row wins, as in the bar cache
+            out[i, cols] = frames[symbol][field].to_numpy(dtype=np.float64)
+
+    with _WRITE_LOCK:
+        previous = _read_index(store_dir)["generation"] if os.path.exists(os.path.join(store_dir, INDEX_FILE)) else None
+        if previous is not None and previous >= generation:
+            generation = previous + 1
+
+        extents = _write_generation(store_dir, generation, symbols, calendar, fill)
+        _commit(store_dir, generation, symbols, calendar, extents, previous)
+
+    logger.info(f"Bar store: {len(symbols)} symbols x {len(calendar)} days written to {store_dir}")
+    return BarStore(store_dir)
+
+
+def append_to_store(frames, store_dir=None):
+    """
+    Adds new bars to an existing store: bars for stored dates overwrite
+    them (a corrected last bar), later dates and new symbols go into the
+    free capacity. Falls back to rewriting the store when the capacity
+    runs out or a bar predates the last stored day. Returns the store
+    opened read-only.
+    """
+
+    store_dir = store_dir or STORE_DIR
+    frames = {s: df for s, df in frames.items() if df is not None and not df.empty}
+
+    with _WRITE_LOCK:
+        store = BarStore(store_dir, mode="r+")
+
+        new_dates = {s: _as_datetime(df["date"]) for s, df in frames.items()}
+        incoming = np.unique(np.concatenate(list(new_dates.values()))) if frames else store.dates
+
+        last = store.dates[-1] if len(store.dates) else None
+        added_dates = incoming if last is None else incoming[incoming > last]
+        calendar = np.concatenate([store.dates, added_dates])
+
+        added_symbols = [s for s in frames if s not in store]
+        symbols = store.symbols + added_symbols
+
+        in_place = (
+            np.all(np.isin(incoming, store.dates) | np.isin(incoming, added_dates))
+            and len(symbols) <= store.capacity[0]
+            and len(calendar) <= store.capacity[1]
+        )
+
+        if not in_place:
+            del store
+            return _rewrite(frames, store_dir)
+
+        position = {s: i for i, s in enumerate(symbols)}
+        for field in FIELDS:
+            out = store.arrays[field]
+            for symbol, df in frames.items():
+                cols = np.searchsorted(calendar, new_dates[symbol])
+                out[position[symbol], cols] = df[field].to_numpy(dtype=np.float64)
+            out.flush()
+
+        close = store.arrays["close"]
+        extents = [
+            _extent(close[position[s], :len(calendar)]) if s in frames else store.extents[s]
+            for s in symbols
+        ]
+
+        _commit(store_dir, store.generation, symbols, calendar, extents)
+
+    logger.info(f"Bar store: {len(frames)} symbols updated, {len(added_dates)} new days, "
+                f"{len(added_symbols)} new symbols")
+    return BarStore(store_dir)
+
+
+def _rewrite(frames, store_dir):
+    # Merge the stored histories with the new bars and write them out as
+    # the next generation (caller holds _WRITE_LOCK)
+    from utils.bar_cache import append_bars
+
+    store = BarStore(store_dir)
+    merged = {symbol: store.frame(symbol) for symbol in store.symbols}
+    for symbol, df in frames.items():
+        merged[symbol] = append_bars(merged.get(symbol), df[["date"] + FIELDS])
+
+    generation = store.generation + 1
+    del store
+
+    symbols = [s for s, df in merged.items() if df is not None and not df.empty]
+    dates = {s: _as_datetime(merged[s]["date"]) for s in symbols}
+    calendar = np.unique(np.concatenate(list(dates.values())))
+
+    def fill(field, out):
+        for i, symbol in enumerate(symbols):
+            out[i, np.searchsorted(calendar, dates[symbol])] = merged[symbol][field].to_numpy(dtype=np.float64)
+
+    previous = generation - 1
+    extents = _write_generation(store_dir, generation, symbols, calendar, fill)
+    _commit(store_dir, generation, symbols, calendar, extents, previous)
+
+    logger.info(f"Bar store: rewritten with {len(symbols)} symbols x {len(calendar)} days")
+    return BarStore(store_dir)
+
+
+def update_store(frames, store_dir=None):
+    """
+    build_store for a new store, append_to_store for an existing one.
+    """
+
+    store_dir = store_dir or STORE_DIR
+    if os.path.exists(os.path.join(store_dir, INDEX_FILE)):
+        return append_to_store(frames, store_dir)
+    return build_store(frames, store_dir)
+
+
+if __name__ == "__main__":
+    from utils.instrumentation import configure_logging
+    from utils.yf_loader import load_bulk_daily_data, load_daily_data
+
+    parser = argparse.ArgumentParser(description="Build or refresh the memory-mapped bar store")
+    parser.add_argument("--universe", default="universe/smallcap_250.csv")
+    parser.add_argument("--period", default="3y")
+    parser.add_argument("--dir", default=STORE_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="Write a new store instead of appending")
+    args = parser.parse_args()
+
+    configure_logging("INFO")
+
+    universe = pd.read_csv(args.universe)
+    symbols = list(dict.fromkeys(universe.iloc[:, 0].tolist()))
+
+    frames = load_bulk_daily_data(symbols, period=args.period)
+    frames["^NSEI"] = load_daily_data("^NSEI", period=args.period)
+
+    store = build_store(frames, args.dir) if args.rebuild else update_store(frames, args.dir)
+    print(f"{len(store)} symbols x {len(store.dates)} days in {args.dir}")
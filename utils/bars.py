@@ -0,0 +1,160 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# -------------------------
+# COMPACT BAR FRAMES
+# -------------------------
+# Frames held in memory (a whole universe during a scan), sent to worker
+# processes or written to the bar cache use the compact layout:
+#   date     datetime64, one array shared by every symbol with the same dates
+#   OHLC     float32 when no price moves by more than PRICE_TOLERANCE
+#   volume   int32 / int64 when every value is a whole number
+# Computations never see it: they call working_frame(), which hands back
+# a float64 scratch copy whose added columns (ema_10, atr_14, rsi_14,
+# log_ret, ...) are dropped with it instead of growing the stored frame.
+BAR_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+# Half a paisa: float32 keeps ~7 significant digits, exact enough for
+# NSE prices up to ~50,000
+PRICE_TOLERANCE = 0.005
+
+# Shared date arrays, keyed by (dtype, length, first, last)
+_CALENDARS = {}
+_CALENDARS_MAX = 1024
+_CALENDARS_LOCK = threading.Lock()
+
+
+def shared_dates(dates):
+    """
+    Returns an equal, read-only datetime64 array that is shared with every
+    other frame holding the same dates.
+    """
+
+    dates = np.asarray(dates)
+    if len(dates) == 0:
+        return dates
+
+    key = (dates.dtype.str, len(dates), dates[0], dates[-1])
+
+    with _CALENDARS_LOCK:
+        shared = _CALENDARS.get(key)
+        if shared is not None and np.array_equal(shared, dates):
+            return shared
+
+        if len(_CALENDARS) >= _CALENDARS_MAX:
+            _CALENDARS.clear()
+
+        dates = dates.copy()
+        dates.setflags(write=False)
+        _CALENDARS[key] = dates
+
+    return dates
+
+
+def _compact_prices(df):
+    prices = {col: df[col].to_numpy() for col in PRICE_COLUMNS}
+
+    if all(values.dtype == np.float32 for values in prices.values()):
+        return prices
+
+    compact = {col: values.astype(np.float32) for col, values in prices.items()}
+
+    with np.errstate(invalid="ignore", over="ignore"):
+        safe = all(
+            np.all(np.isclose(compact[col], prices[col], rtol=0, atol=PRICE_TOLERANCE, equal_nan=True))
+            for col in PRICE_COLUMNS
+        )
+
+    return compact if safe else {col: values.astype(np.float64, copy=False) for col, values in prices.items()}
+
+
+def _compact_volume(volume):
+    volume = np.asarray(volume)
+
+    if volume.dtype.kind in "iu":
+        return volume
+
+    with np.errstate(invalid="ignore"):
+        if not np.all(np.isfinite(volume)) or not np.all(volume == np.floor(volume)):
+            return volume.astype(np.float64, copy=False)
+
+    if len(volume) == 0 or (volume.min() >= np.iinfo(np.int32).min and volume.max() <= np.iinfo(np.int32).max):
+        return volume.astype(np.int32)
+
+    return volume.astype(np.int64)
+
+
+def compact_frame(df):
+    """
+    The compact layout of an OHLCV frame (see above). Columns other than
+    BAR_COLUMNS (adj close, indicator columns) are dropped. Returns None
+    for None.
+    """
+
+    if df is None:
+        return None
+
+    dates = df["date"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+
+    columns = {"date": shared_dates(dates.to_numpy())}
+    columns.update(_compact_prices(df))
+    columns["volume"] = _compact_volume(df["volume"].to_numpy())
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def _float64_casts(df):
+    # One dtypes lookup; df[col].dtype builds a Series per column
+    dtypes = df.dtypes.to_dict()
+    return {
+        col: np.float64
+        for col in PRICE_COLUMNS + ["volume"]
+        if col in dtypes and dtypes[col] != np.float64
+    }
+
+
+def working_frame(df):
+    """
+    A float64 scratch copy of a bar frame for computations. Columns added
+    to it do not touch `df`; unchanged columns are shared, not copied.
+    """
+
+    casts = _float64_casts(df)
+    return df.astype(casts) if casts else df.copy(deep=False)
+
+
+def float64_frame(df):
+    """
+    working_frame for read-only use: `df` itself when it already holds
+    float64 prices and volume.
+    """
+
+    casts = _float64_casts(df)
+    return df.astype(casts) if casts else df
+
+
+def frame_nbytes(frames):
+    """
+    Bytes held by {symbol: frame}, counting a shared date array once.
+    """
+
+    seen = set()
+    total = 0
+
+    for df in frames.values():
+        if df is None:
+            continue
+        for col in df.columns:
+            values = df[col].to_numpy()
+            key = (values.__array_interface__["data"][0], values.nbytes)
+            if key not in seen:
+                seen.add(key)
+                total += values.nbytes
+
+    return total
@@ -0,0 +1,114 @@
+import logging
+import os
+import pickle
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+CACHE_DIR = os.path.join("data", "cache", "financials")
+
+# Upper bound on how long any entry is trusted
+DEFAULT_TTL_DAYS = 30
+# Once a new quarter has closed, results can land any day: re-check this often
+RECHECK_DAYS = 3
+# Symbols that returned nothing are retried after this long
+NEGATIVE_TTL_DAYS = 1
+
+
+def _path(symbol, cache_dir):
+    return os.path.join(cache_dir, f"{symbol.replace('^', '_')}.pkl")
+
+
+def latest_quarter_end(financials_df):
+    """
+    Returns the most recent reported quarter end, or None.
+    yfinance labels quarterly_financials columns with the period end date.
+    """
+
+    if financials_df is None or financials_df.empty:
+        return None
+
+    dates = pd.to_datetime(pd.Index(financials_df.columns), errors="coerce").dropna()
+    return dates.max() if len(dates) else None
+
+
+def next_quarter_end(quarter_end):
+    return (pd.Timestamp(quarter_end) + pd.offsets.QuarterEnd(1)).normalize()
+
+
+def compute_expiry(financials_df, fetched_at, ttl_days=DEFAULT_TTL_DAYS):
+    """
+    Decides when a freshly fetched entry goes stale.
+
+    - Empty/None results are negatively cached for NEGATIVE_TTL_DAYS.
+    - Before the next quarter closes no new results can exist, so the
+      entry is kept until then.
+    - After that (the results window) it is re-checked every RECHECK_DAYS.
+    - Nothing is kept longer than ttl_days.
+    """
+
+    fetched_at = pd.Timestamp(fetched_at)
+    cap = fetched_at + pd.Timedelta(days=ttl_days)
+
+    quarter_end = latest_quarter_end(financials_df)
+    if quarter_end is None:
+        return min(cap, fetched_at + pd.Timedelta(days=NEGATIVE_TTL_DAYS))
+
+    expected = next_quarter_end(quarter_end)
+    if fetched_at < expected:
+        return min(cap, expected)
+
+    return min(cap, fetched_at + pd.Timedelta(days=RECHECK_DAYS))
+
+
+def read_entry(symbol, cache_dir=None):
+    """
+    Returns the cached entry {"data", "fetched_at", "expires_at"} or None.
+    """
+
+    path = _path(symbol, cache_dir or CACHE_DIR)
+
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Warning: Could not read cached financials for {symbol}: {e}")
+        return None
+
+
+def write_entry(symbol, financials_df, fetched_at=None, ttl_days=DEFAULT_TTL_DAYS, cache_dir=None):
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    fetched_at = pd.Timestamp(fetched_at) if fetched_at is not None else pd.Timestamp.now()
+
+    if financials_df is not None and financials_df.empty:
+        financials_df = None
+
+    entry = {
+        "data": financials_df,
+        "fetched_at": fetched_at,
+        "expires_at": compute_expiry(financials_df, fetched_at, ttl_days),
+    }
+
+    path = _path(symbol, cache_dir)
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "wb") as f:
+        pickle.dump(entry, f)
+
+    os.replace(tmp_path, path)
+    return entry
+
+
+def is_fresh(entry, now=None):
+    if entry is None:
+        return False
+
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now()
+    return now < entry["expires_at"]
@@ -1,21 +1,61 @@
-import yfinance as yf
+import logging
+
 import pandas as pd
 
-def get_quarterly_financials(symbol):
+from utils import financials_cache, providers
+from utils.instrumentation import count, timed
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_quarterly_financials(symbol):
+    """
+    Downloads quarterly financials from the active data provider
+    (utils/providers.py; no caching, errors propagate).
+    """
+
+    return providers.get_provider().fetch_financials(symbol)
+
+
+@timed("fetch.financials")
+def get_quarterly_financials(symbol, use_cache=True, ttl_days=None, cache_dir=None, fetch=None):
     """
     Fetches quarterly financial data for a given stock symbol.
 
+    Results are cached on disk per symbol until the next quarter's results
+    can be expected (see utils/financials_cache.py). Empty results are
+    cached briefly so symbols without data are not re-requested every run.
+
     Args:
         symbol (str): The stock symbol to fetch data for.
+        use_cache (bool): Serve/populate the on-disk financials cache.
+        ttl_days (int): Maximum age of a cached entry.
+        fetch (callable): Replaces the provider fetch (symbol -> DataFrame).
 
     Returns:
         pd.DataFrame: A DataFrame containing the quarterly financial data,
                       or None if an error occurs.
     """
+    fetch = fetch or fetch_quarterly_financials
+    ttl_days = ttl_days if ttl_days is not None else financials_cache.DEFAULT_TTL_DAYS
+
+    entry = financials_cache.read_entry(symbol, cache_dir) if use_cache else None
+    if financials_cache.is_fresh(entry):
+        count("cache.financials.hit")
+        return entry["data"]
+
+    if use_cache:
+        count("cache.financials.miss")
+
     try:
-        stock = yf.Ticker(symbol)
-        quarterly_financials = stock.quarterly_financials
-        return quarterly_financials
+        quarterly_financials = fetch(symbol)
     except Exception as e:
-        print(f"Error fetching quarterly financials for {symbol}: {e}")
-        return None
+        logger.warning(f"Error fetching quarterly financials for {symbol}: {e}")
+        count("errors.financials")
+        # Errors are not cached; a stale entry beats nothing
+        return entry["data"] if entry is not None else None
+
+    if use_cache:
+        financials_cache.write_entry(symbol, quarterly_financials, ttl_days=ttl_days, cache_dir=cache_dir)
+
+    return quarterly_financials
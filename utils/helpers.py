@@ -1,5 +1,7 @@
 import numpy as np
 
+from features.context import as_context
+
 
 # -----------------------------
 # CANDLE QUALITY
@@ -8,7 +10,7 @@ def has_bullish_candles(df, lookback=3):
     """
     Checks if majority of recent candles are bullish.
     """
-    recent = df.tail(lookback)
+    recent = as_context(df).tail(lookback)
     bullish = (recent["close"] > recent["open"]).sum()
     return bullish >= (lookback // 2 + 1)
 
@@ -20,7 +22,7 @@ def is_consolidating(df, lookback=10, threshold=0.03):
     """
     Checks if price is consolidating (tight range).
     """
-    recent = df.tail(lookback)
+    recent = as_context(df).tail(lookback)
     high = recent["high"].max()
     low = recent["low"].min()
 
@@ -37,11 +39,13 @@ def is_volume_supporting(df, short=5, long=20, min_ratio=1.2):
     """
     Checks if recent volume is higher than baseline volume.
     """
-    if len(df) < long:
+    ctx = as_context(df)
+
+    if len(ctx) < long:
         return False
 
-    recent_vol = df["volume"].tail(short).mean()
-    base_vol = df["volume"].tail(long).mean()
+    recent_vol = ctx.tail(short)["volume"].mean()
+    base_vol = ctx.tail(long)["volume"].mean()
 
     if base_vol == 0:
         return False
@@ -56,7 +60,7 @@ def get_recent_high(df, lookback=50):
     """
     Returns recent swing high.
     """
-    return df["high"].tail(lookback).max()
+    return as_context(df).tail(lookback)["high"].max()
 
 
 def is_near_resistance(df, resistance, threshold=0.03):
@@ -66,7 +70,7 @@ def is_near_resistance(df, resistance, threshold=0.03):
     if resistance == 0:
         return False
 
-    close = df["close"].iloc[-1]
+    close = as_context(df).last("close")
     return abs(resistance - close) / resistance <= threshold
 def volume_supports_breakout(df, lookback=5, threshold=1.2):
     """
@@ -74,11 +78,13 @@ def volume_supports_breakout(df, lookback=5, threshold=1.2):
     Returns 1 if average recent volume > threshold × past average, else 0.
     """
 
-    if len(df) < lookback * 2:
+    ctx = as_context(df)
+
+    if len(ctx) < lookback * 2:
         return 0
 
-    recent_vol = df["volume"].tail(lookback).mean()
-    past_vol = df["volume"].iloc[-(lookback * 2):-lookback].mean()
+    recent_vol = ctx.tail(lookback)["volume"].mean()
+    past_vol = ctx.tail(lookback * 2)["volume"].iloc[:-lookback].mean()
 
     if past_vol == 0:
         return 0
@@ -89,10 +95,7 @@ def compute_resistance(df, lookback=50):
     Computes recent resistance as the max high over a lookback window.
     """
 
-    if len(df) < lookback:
-        return None
-
-    return df["high"].tail(lookback).max()
+    return as_context(df).resistance(lookback)
 
 
 # -----------------------------
@@ -0,0 +1,303 @@
+import cProfile
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# -------------------------
+# RUN STATE
+# -------------------------
+# One process-wide collector. While disabled (the default) timer() hands
+# out a shared no-op context and count() returns at once, so the hooks
+# left in the scan cost a flag check per call.
+class _Collector:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        self.stages = {}    # name -> [calls, total_s, max_s]
+        self.counters = {}  # name -> int
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+
+
+_COLLECTOR = _Collector()
+_NULL = nullcontext()
+
+
+def enable(reset=True):
+    if reset:
+        _COLLECTOR.reset()
+    _COLLECTOR.enabled = True
+
+
+def disable():
+    _COLLECTOR.enabled = False
+
+
+def is_enabled():
+    return _COLLECTOR.enabled
+
+
+def reset():
+    _COLLECTOR.reset()
+
+
+# -------------------------
+# TIMERS AND COUNTERS
+# -------------------------
+class _Timer:
+    __slots__ = ("stage", "started", "outer")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        active = _active_stages()
+        # Re-entrant: a stage nested in itself (prepare_symbol ->
+        # extract_features, both "features") is only timed once
+        self.outer = self.stage not in active
+        if self.outer:
+            active.add(self.stage)
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.outer:
+            elapsed = time.perf_counter() - self.started
+            _active_stages().discard(self.stage)
+            _record(self.stage, elapsed)
+        return False
+
+
+def _active_stages():
+    local = _COLLECTOR.local
+    if not hasattr(local, "active"):
+        local.active = set()
+    return local.active
+
+
+def _record(stage, elapsed):
+    with _COLLECTOR.lock:
+        entry = _COLLECTOR.stages.setdefault(stage, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+
+
+def timer(stage):
+    """
+    Context manager timing one stage ("fetch.bars", "features",
+    "inference", "trade_plan", ...).
+    """
+
+    if not _COLLECTOR.enabled:
+        return _NULL
+    return _Timer(stage)
+
+
+def timed(stage):
+    """
+    Decorator form of timer().
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _COLLECTOR.enabled:
+                return func(*args, **kwargs)
+            with _Timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def count(name, n=1):
+    """
+    Adds n to a counter ("cache.bars.hit", "symbols.scanned", ...).
+    """
+
+    if not _COLLECTOR.enabled:
+        return
+    with _COLLECTOR.lock:
+        _COLLECTOR.counters[name] = _COLLECTOR.counters.get(name, 0) + n
+
+
+def reject(filter_name):
+    """
+    Counts a symbol dropped by a scan filter.
+    """
+
+    count(f"rejected.{filter_name}")
+
+
+# -------------------------
+# SNAPSHOTS (worker processes)
+# -------------------------
+def snapshot():
+    """
+    Raw stage and counter totals, picklable, for merge() in another process.
+    """
+
+    with _COLLECTOR.lock:
+        return {
+            "stages": {name: list(entry) for name, entry in _COLLECTOR.stages.items()},
+            "counters": dict(_COLLECTOR.counters),
+        }
+
+
+def merge(snap):
+    if not _COLLECTOR.enabled or not snap:
+        return
+
+    with _COLLECTOR.lock:
+        for name, (calls, total, longest) in snap["stages"].items():
+            entry = _COLLECTOR.stages.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += calls
+            entry[1] += total
+            entry[2] = max(entry[2], longest)
+        for name, n in snap["counters"].items():
+            _COLLECTOR.counters[name] = _COLLECTOR.counters.get(name, 0) + n
+
+
+# -------------------------
+# RUN REPORT
+# -------------------------
+def report(**meta):
+    """
+    The run report as a dict:
+    - stages: calls, total/mean/max seconds per stage. Stages may nest
+      ("features" includes the "fetch.financials" it triggers); worker
+      process time is summed, so totals can exceed wall time.
+    - counters, plus hit rates for every "cache.<name>.hit/miss" pair
+    - pipeline: passed / rejected per scan stage (ranking/pipeline.py)
+    - wall_s since enable(), and any meta passed in
+    """
+
+    snap = snapshot()
+
+    stages = {}
+    for name, (calls, total, longest) in sorted(snap["stages"].items()):
+        stages[name] = {
+            "calls": calls,
+            "total_s": round(total, 6),
+            "mean_ms": round(total / calls * 1000, 3) if calls else 0.0,
+            "max_ms": round(longest * 1000, 3),
+        }
+
+    counters = dict(sorted(snap["counters"].items()))
+
+    caches = {}
+    for name in counters:
+        prefix, _, outcome = name.rpartition(".")
+        if name.startswith("cache.") and outcome in ("hit", "miss"):
+            cache = prefix[len("cache."):]
+            hits = counters.get(f"{prefix}.hit", 0)
+            misses = counters.get(f"{prefix}.miss", 0)
+            caches[cache] = {"hit": hits, "miss": misses, "hit_rate": round(hits / (hits + misses), 4)}
+
+    rejected = {name[len("rejected."):]: n for name, n in counters.items() if name.startswith("rejected.")}
+
+    pipeline = {}
+    for name, n in counters.items():
+        if name.startswith("pipeline."):
+            stage, _, outcome = name[len("pipeline."):].rpartition(".")
+            pipeline.setdefault(stage, {"passed": 0, "rejected": 0})[outcome] = n
+
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_COLLECTOR.started_at)),
+        "wall_s": round(time.perf_counter() - _COLLECTOR.started, 6),
+        **meta,
+        "stages": stages,
+        "caches": caches,
+        "rejected": rejected,
+        "pipeline": pipeline,
+        "counters": counters,
+    }
+
+
+def write_report(path, **meta):
+    """
+    Writes report() as JSON. Returns the report.
+    """
+
+    result = report(**meta)
+
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+
+    return result
+
+
+@contextmanager
+def profile(path=None):
+    """
+    Runs the block under cProfile and dumps the stats to `path`
+    (inspect with python -m pstats). No-op without a path.
+    """
+
+    if not path:
+        yield None
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        profiler.dump_stats(path)
+
+
+# -------------------------
+# LOGGING
+# -------------------------
+# Library modules log through logging.getLogger(__name__); the entry
+# points call configure_logging once. Records are buffered and written in
+# batches (at once for warnings and errors), so per-symbol debug lines do
+# not cost a console write each.
+_HANDLER = None
+
+
+def configure_logging(level="INFO", buffer_size=200, stream=None):
+    global _HANDLER
+
+    root = logging.getLogger()
+
+    if _HANDLER is not None:
+        _HANDLER.flush()
+        root.removeHandler(_HANDLER)
+
+    console = logging.StreamHandler(stream or sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+
+    _HANDLER = logging.handlers.MemoryHandler(buffer_size, flushLevel=logging.WARNING, target=console)
+    root.addHandler(_HANDLER)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    return _HANDLER
+
+
+def flush_logs():
+    """
+    Writes out buffered log records (before printing tables to the console).
+    """
+
+    if _HANDLER is not None:
+        _HANDLER.flush()
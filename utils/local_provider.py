@@ -0,0 +1,138 @@
+import os
+import random
+import threading
+import time
+
+import pandas as pd
+
+from utils.yf_loader import period_to_offset
+
+
+FIELDS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+
+class LocalDownloader:
+    """
+    Offline stand-in for yf.download.
+
+    Serves OHLCV history from in-memory frames or from <symbol>.csv files
+    in a directory, and returns frames shaped exactly like yfinance does,
+    so the loaders in utils/yf_loader.py can be exercised without network.
+    """
+
+    def __init__(self, frames=None, data_dir=None):
+        self.frames = dict(frames or {})
+        self.data_dir = data_dir
+        self.calls = 0
+
+    def _history(self, symbol):
+        if symbol in self.frames:
+            return self.frames[symbol]
+
+        if self.data_dir is None:
+            return None
+
+        path = os.path.join(self.data_dir, f"{symbol}.csv")
+        if not os.path.exists(path):
+            return None
+
+        df = pd.read_csv(path)
+        self.frames[symbol] = df
+        return df
+
+    def _yf_frame(self, symbol, period=None, start=None, end=None):
+        df = self._history(symbol)
+        if df is None or df.empty:
+            return None
+
+        df = df.copy()
+        df.columns = [c.lower() for c in df.columns]
+        df["date"] = pd.to_datetime(df["date"])
+        if "adj close" not in df.columns:
+            df["adj close"] = df["close"]
+
+        if start is not None:
+            df = df[df["date"] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df["date"] < pd.Timestamp(end)]
+
+        offset = period_to_offset(period) if start is None else None
+        if offset is not None and not df.empty:
+            df = df[df["date"] > df["date"].iloc[-1] - offset]
+
+        out = df.set_index("date")[[f.lower() for f in FIELDS]]
+        out.columns = FIELDS
+        out.index.name = "Date"
+        return out
+
+    def __call__(self, tickers, period=None, start=None, end=None,
+                 group_by="column", **kwargs):
+        self.calls += 1
+
+        single = isinstance(tickers, str)
+        symbols = [tickers] if single else list(tickers)
+
+        parts = {}
+        for symbol in symbols:
+            frame = self._yf_frame(symbol, period=period, start=start, end=end)
+            if frame is not None:
+                parts[symbol] = frame
+
+        if not parts:
+            return pd.DataFrame()
+
+        wide = pd.concat(parts, axis=1, names=["Ticker", "Price"]).sort_index()
+
+        if group_by == "column":
+            wide = wide.swaplevel(0, 1, axis=1)
+            wide.columns.names = ["Price", "Ticker"]
+
+        return wide
+
+
+class FlakyProvider:
+    """
+    Wraps a download callable and a financials fetch with injected
+    latency, failures and hangs, to exercise utils/async_fetch.py offline.
+
+    - latency: (min, max) seconds added to every call
+    - slow_rate / slow_latency: share of calls that take slow_latency instead
+    - failure_rate: share of calls that raise ConnectionError
+    """
+
+    def __init__(self, download, fetch_financials=None, latency=(0.0, 0.0),
+                 slow_rate=0.0, slow_latency=5.0, failure_rate=0.0, seed=0):
+        self._download = download
+        self._fetch_financials = fetch_financials
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def _disturb(self):
+        with self._lock:
+            self.calls += 1
+            slow = self._random.random() < self.slow_rate
+            fail = self._random.random() < self.failure_rate
+            delay = self.slow_latency if slow else self._random.uniform(*self.latency)
+            if fail:
+                self.failures += 1
+
+        time.sleep(delay)
+
+        if fail:
+            raise ConnectionError("injected failure")
+
+    def download(self, *args, **kwargs):
+        self._disturb()
+        return self._download(*args, **kwargs)
+
+    def fetch_financials(self, symbol):
+        self._disturb()
+        if self._fetch_financials is None:
+            return None
+        return self._fetch_financials(symbol)
@@ -0,0 +1,206 @@
+import os
+import pickle
+import threading
+
+
+# -------------------------
+# PROVIDER INTERFACE
+# -------------------------
+class MarketDataProvider:
+    """
+    Source of market data for the loaders.
+
+    - download(tickers, period=None, start=None, end=None, **kwargs):
+      daily bars for stocks and indices (^NSEI), shaped like yf.download
+      (utils/yf_loader.py normalizes the result)
+    - fetch_financials(symbol): quarterly financials shaped like
+      yfinance's quarterly_financials, or None
+
+    The active provider (set_provider) is used whenever a loader is not
+    given an explicit download / fetch.
+    """
+
+    name = "base"
+
+    def download(self, tickers, period=None, start=None, end=None, **kwargs):
+        raise NotImplementedError
+
+    def fetch_financials(self, symbol):
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Live data from Yahoo Finance.
+    """
+
+    name = "yfinance"
+
+    def download(self, tickers, period=None, start=None, end=None, **kwargs):
+        import yfinance as yf
+
+        window = {k: v for k, v in (("period", period), ("start", start), ("end", end)) if v is not None}
+        return yf.download(tickers, **window, **kwargs)
+
+    def fetch_financials(self, symbol):
+        import yfinance as yf
+
+        return yf.Ticker(symbol).quarterly_financials
+
+
+# -------------------------
+# RECORDED DATA
+# -------------------------
+# Layout of a recording directory:
+#   <dir>/bars/<symbol>.csv          date, open, high, low, close, volume
+#   <dir>/financials/<symbol>.pkl    quarterly financials DataFrame (or None)
+def _bars_path(data_dir, symbol):
+    return os.path.join(data_dir, "bars", f"{symbol}.csv")
+
+
+def _financials_path(data_dir, symbol):
+    return os.path.join(data_dir, "financials", f"{symbol.replace('^', '_')}.pkl")
+
+
+class LocalReplayProvider(MarketDataProvider):
+    """
+    Serves a recording made by RecordingProvider, without network access.
+    Symbols missing from the recording come back empty (no bars) or None
+    (no financials), like a failed download.
+    """
+
+    name = "replay"
+
+    def __init__(self, data_dir):
+        from utils.local_provider import LocalDownloader
+
+        self.data_dir = data_dir
+        self._bars = LocalDownloader(data_dir=os.path.join(data_dir, "bars"))
+
+    def download(self, tickers, period=None, start=None, end=None, **kwargs):
+        return self._bars(tickers, period=period, start=start, end=end, **kwargs)
+
+    def fetch_financials(self, symbol):
+        path = _financials_path(self.data_dir, symbol)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+class RecordingProvider(MarketDataProvider):
+    """
+    Passes every request to `inner` and writes what comes back to
+    data_dir, so the run can be replayed with LocalReplayProvider.
+    Bars are merged into the recorded history (newer rows win); failed
+    requests are not recorded.
+    """
+
+    name = "record"
+
+    def __init__(self, inner, data_dir):
+        self.inner = inner
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(data_dir, "bars"), exist_ok=True)
+        os.makedirs(os.path.join(data_dir, "financials"), exist_ok=True)
+
+    def download(self, tickers, period=None, start=None, end=None, **kwargs):
+        wide = self.inner.download(tickers, period=period, start=start, end=end, **kwargs)
+        self._record_bars(tickers, wide, kwargs.get("group_by", "column"))
+        return wide
+
+    def _record_bars(self, tickers, wide, group_by):
+        import pandas as pd
+        from utils.yf_loader import split_bulk_frame, _normalize_frame
+
+        if wide is None or wide.empty:
+            return
+
+        if isinstance(tickers, str):
+            frames = {tickers: _normalize_frame(wide.copy())}
+        else:
+            if group_by == "column" and isinstance(wide.columns, pd.MultiIndex):
+                wide = wide.swaplevel(0, 1, axis=1)
+            frames = split_bulk_frame(wide, list(tickers))
+
+        with self._lock:
+            for symbol, df in frames.items():
+                if df is None:
+                    continue
+
+                path = _bars_path(self.data_dir, symbol)
+                if os.path.exists(path):
+                    recorded = pd.read_csv(path, parse_dates=["date"])
+                    df = pd.concat([recorded, df], ignore_index=True)
+
+                df["date"] = pd.to_datetime(df["date"])
+                df = df.drop_duplicates("date", keep="last").sort_values("date")
+                df.to_csv(path, index=False)
+
+    def fetch_financials(self, symbol):
+        data = self.inner.fetch_financials(symbol)
+
+        path = _financials_path(self.data_dir, symbol)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+        return data
+
+
+# -------------------------
+# ACTIVE PROVIDER
+# -------------------------
+_ACTIVE = None
+
+
+def get_provider():
+    global _ACTIVE
+    if _ACTIVE is None:
+        _ACTIVE = YFinanceProvider()
+    return _ACTIVE
+
+
+def set_provider(provider):
+    """
+    Makes `provider` the default data source. Returns the previous one.
+    """
+
+    global _ACTIVE
+    previous, _ACTIVE = _ACTIVE, provider
+    return previous
+
+
+def configure(record=None, replay=None):
+    """
+    Activates the provider for the CLI flags --record DIR / --replay DIR
+    (live yfinance otherwise) and returns it.
+
+    Recording and replaying use their own bar and financials caches under
+    <dir>/cache: a recording made on top of a warm cache would only
+    capture the bars since the last cached date, and a replay must not
+    be served live data cached by earlier runs.
+    """
+
+    if record and replay:
+        raise ValueError("--record and --replay are mutually exclusive")
+
+    data_dir = replay or record
+    if replay:
+        provider = LocalReplayProvider(replay)
+    elif record:
+        provider = RecordingProvider(YFinanceProvider(), record)
+    else:
+        provider = YFinanceProvider()
+
+    if data_dir:
+        from utils import bar_cache, financials_cache
+
+        bar_cache.CACHE_DIR = os.path.join(data_dir, "cache", "bars")
+        financials_cache.CACHE_DIR = os.path.join(data_dir, "cache", "financials")
+
+    set_provider(provider)
+    return provider
@@ -0,0 +1,175 @@
+"""
+NSE trading calendar: weekends plus the exchange holidays listed in
+data/nse_holidays.csv (one "date,holiday" row per holiday). Add a year's
+rows when the exchange publishes them; for years without rows only the
+weekends are known, which errs towards expecting a session.
+
+Every date operation takes one date or an array of dates (strings,
+datetime, Timestamp, datetime64) and is vectorized over NumPy's
+business-day functions.
+
+Kept free of pandas so run_daily can check the calendar before the
+heavy imports.
+"""
+import csv
+import logging
+import os
+import threading
+from datetime import datetime, time, timedelta, timezone
+
+import numpy as np
+
+
+HOLIDAYS_FILE = os.path.join("data", "nse_holidays.csv")
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Daily bars are final half an hour after the 15:30 close
+BARS_FINAL_AT = time(16, 0)
+
+WEEKMASK = "1111100"
+
+logger = logging.getLogger(__name__)
+
+
+def _days(dates):
+    return np.asarray(dates, dtype="datetime64[D]")
+
+
+def _year(date):
+    return _days(date).item().year
+
+
+def _ist(now):
+    now = now or datetime.now(IST)
+    # Naive times are taken as exchange (IST) time
+    return now.replace(tzinfo=IST) if now.tzinfo is None else now.astimezone(IST)
+
+
+# -------------------------
+# CALENDAR
+# -------------------------
+class TradingCalendar:
+    """
+    Sessions are weekdays that are not holidays. `years` are the years the
+    holiday list covers (by default the years it has rows for).
+    """
+
+    def __init__(self, holidays=None, years=None):
+        holidays = holidays or {}
+        self.names = {np.datetime64(day, "D"): name for day, name in holidays.items()}
+        self.holidays = np.array(sorted(self.names), dtype="datetime64[D]")
+        self.years = set(years) if years is not None else {_year(day) for day in self.names}
+
+        self._busdaycal = np.busdaycalendar(weekmask=WEEKMASK, holidays=self.holidays)
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Reads a "date,holiday" CSV. A missing file gives a weekends-only
+        calendar.
+        """
+
+        path = path or HOLIDAYS_FILE
+        if not os.path.exists(path):
+            logger.warning(f"Warning: No holiday file at {path}, only weekends are treated as closed.")
+            return cls()
+
+        with open(path, newline="") as f:
+            holidays = {row["date"].strip(): row.get("holiday", "").strip() for row in csv.DictReader(f)}
+
+        return cls(holidays)
+
+    def covers(self, date):
+        """
+        True if the holiday list covers the year of `date`.
+        """
+
+        return _year(date) in self.years
+
+    def holiday_name(self, date):
+        """
+        The holiday on `date`, or None.
+        """
+
+        return self.names.get(_days(date)[()])
+
+    # ---- vectorized ----
+    def is_session(self, dates):
+        return np.is_busday(_days(dates), busdaycal=self._busdaycal)
+
+    def next_session(self, dates):
+        """
+        First session strictly after each date.
+        """
+
+        return np.busday_offset(_days(dates), 1, roll="backward", busdaycal=self._busdaycal)
+
+    def previous_session(self, dates):
+        """
+        Last session strictly before each date.
+        """
+
+        return np.busday_offset(_days(dates), -1, roll="forward", busdaycal=self._busdaycal)
+
+    def session_on_or_before(self, dates):
+        return np.busday_offset(_days(dates), 0, roll="backward", busdaycal=self._busdaycal)
+
+    def sessions_between(self, start, end):
+        """
+        Number of sessions in [start, end) for each pair (negative when
+        end comes first), as np.busday_count.
+        """
+
+        return np.busday_count(_days(start), _days(end), busdaycal=self._busdaycal)
+
+    def sessions(self, start, end):
+        """
+        Every session from start to end, both inclusive.
+        """
+
+        days = np.arange(_days(start), _days(end) + 1, dtype="datetime64[D]")
+        return days[self.is_session(days)]
+
+    # ---- freshness ----
+    def last_completed_session(self, now=None):
+        """
+        The latest session whose daily bar is final at `now` (exchange
+        time by default): today after BARS_FINAL_AT on a session day,
+        else the previous session.
+        """
+
+        now = _ist(now)
+        today = np.datetime64(now.date(), "D")
+
+        if self.is_session(today) and now.time() >= BARS_FINAL_AT:
+            return today
+        return self.previous_session(today)
+
+    def is_current(self, as_of, now=None):
+        """
+        True if data downloaded as of session `as_of` (see
+        last_completed_session) already holds every final bar that can
+        exist at `now`, so there is nothing new to download.
+        """
+
+        if as_of is None:
+            return False
+        return bool(_days(as_of) >= self.last_completed_session(now))
+
+
+_CALENDAR = None
+_LOCK = threading.Lock()
+
+
+def get_calendar():
+    """
+    The NSE calendar, loaded from HOLIDAYS_FILE on first use.
+    """
+
+    global _CALENDAR
+
+    with _LOCK:
+        if _CALENDAR is None:
+            _CALENDAR = TradingCalendar.load()
+        return _CALENDAR
@@ -1,23 +1,67 @@
-import yfinance as yf
+import logging
+
 import pandas as pd
 
+from utils import bar_cache, providers
+from utils.bars import compact_frame
+from utils.instrumentation import count, timed
+from utils.trading_calendar import get_calendar
+
+logger = logging.getLogger(__name__)
+
+
+REQUIRED_COLUMNS = {"date", "open", "high", "low", "close", "volume"}
 
-def load_daily_data(symbol, period="2y"):
+
+def period_to_offset(period):
     """
-    Loads daily OHLCV data for NSE stocks using yfinance.
-    Expects symbol to already include .NS
-    Handles MultiIndex columns safely.
+    Converts a yfinance period string ("2y", "6mo", "30d") into a DateOffset.
+    Returns None for "max" or unknown periods.
     """
 
-    df = yf.download(
-        symbol,
-        period=period,
-        interval="1d",
-        auto_adjust=False,
-        group_by="column",
-        progress=False,
-        threads=False
-    )
+    if not period or period == "max":
+        return None
+
+    units = {"y": "years", "mo": "months", "wk": "weeks", "d": "days"}
+
+    for suffix, name in units.items():
+        if period.endswith(suffix):
+            try:
+                value = int(period[: -len(suffix)])
+            except ValueError:
+                return None
+            return pd.DateOffset(**{name: value})
+
+    return None
+
+
+def _period_start(period):
+    offset = period_to_offset(period)
+    if offset is None:
+        return None
+    return pd.Timestamp.now().normalize() - offset
+
+
+def _trim_to_period(df, period):
+    """
+    Cuts a cached (possibly longer) history down to the requested period.
+    Returns the compact layout (utils/bars.py).
+    """
+
+    period_start = _period_start(period)
+    if df is None or period_start is None:
+        return compact_frame(df)
+
+    df = df[df["date"] >= period_start]
+    return compact_frame(df) if not df.empty else None
+
+
+def _normalize_frame(df):
+    """
+    Flattens a raw yfinance frame into the lowercase OHLCV layout
+    used across the project, compacted (utils/bars.py). Returns None if
+    required columns are missing.
+    """
 
     if df is None or df.empty:
         return None
@@ -31,8 +75,241 @@ def load_daily_data(symbol, period="2y"):
     df.columns = [c.lower() for c in df.columns]
 
     # Final safety check
-    required = {"date", "open", "high", "low", "close", "volume"}
-    if not required.issubset(df.columns):
+    if not REQUIRED_COLUMNS.issubset(df.columns):
         return None
 
-    return df
+    return compact_frame(df)
+
+
+def _download_single(symbol, download, **window):
+    df = download(
+        symbol,
+        interval="1d",
+        auto_adjust=False,
+        group_by="column",
+        progress=False,
+        threads=False,
+        **window
+    )
+
+    return _normalize_frame(df)
+
+
+@timed("fetch.bars")
+def load_daily_data(symbol, period="2y", download=None, use_cache=True, cache_dir=None):
+    """
+    Loads daily OHLCV data for NSE stocks (and indices such as ^NSEI)
+    from the active data provider (utils/providers.py, yfinance by default).
+    Expects symbol to already include .NS
+    Handles MultiIndex columns safely.
+
+    With use_cache, history is served from the on-disk bar cache and only
+    the bars since the last cached date are downloaded; nothing is
+    downloaded when the cache is current as of the last completed session
+    (utils/trading_calendar.py). If the download fails, the cached history
+    is returned as is.
+    """
+
+    download = download or providers.get_provider().download
+
+    if not use_cache:
+        return _download_single(symbol, download, period=period)
+
+    index = bar_cache.load_index(cache_dir)
+    period_start = _period_start(period)
+
+    cached = None
+    if bar_cache.covers_period(symbol, period_start, index=index):
+        cached = bar_cache.read_bars(symbol, cache_dir)
+
+    count("cache.bars.miss" if cached is None else "cache.bars.hit")
+
+    # Taken before downloading: a bar that becomes final mid-download is
+    # fetched again next time
+    as_of = get_calendar().last_completed_session()
+
+    if cached is None:
+        df = _download_single(symbol, download, period=period)
+        if df is None:
+            # Provider unreachable: fall back to whatever is cached
+            return _trim_to_period(bar_cache.read_bars(symbol, cache_dir), period)
+
+        bar_cache.write_bars(symbol, df, since=period_start, cache_dir=cache_dir, as_of=as_of)
+        return _trim_to_period(df, period)
+
+    if bar_cache.is_current(symbol, index=index):
+        count("cache.bars.current")
+        return _trim_to_period(cached, period)
+
+    # Re-download from the last cached bar (inclusive) so a bar cached
+    # while still forming gets corrected
+    last_date = bar_cache.last_cached_date(symbol, index=index)
+    try:
+        tail = _download_single(symbol, download, start=last_date.strftime("%Y-%m-%d"))
+    except Exception as e:
+        logger.warning(f"Warning: Could not update {symbol}, serving cached bars: {e}")
+        tail = None
+
+    df = bar_cache.append_bars(cached, tail)
+    if tail is not None:
+        bar_cache.write_bars(symbol, df, cache_dir=cache_dir, as_of=as_of)
+
+    return _trim_to_period(df, period)
+
+
+# -------------------------
+# BULK LOADER
+# -------------------------
+def split_bulk_frame(wide_df, symbols):
+    """
+    Splits a wide (ticker, field) MultiIndex frame from a multi-ticker
+    download into per-symbol frames with the load_daily_data layout.
+    Symbols with no rows are left out.
+    """
+
+    frames = {}
+
+    if wide_df is None or wide_df.empty:
+        return frames
+
+    if not isinstance(wide_df.columns, pd.MultiIndex):
+        # yfinance returns flat columns when only one ticker was requested
+        df = _normalize_frame(wide_df.copy())
+        if df is not None and len(symbols) == 1:
+            frames[symbols[0]] = df
+        return frames
+
+    tickers = set(wide_df.columns.get_level_values(0))
+
+    for symbol in symbols:
+        if symbol not in tickers:
+            continue
+
+        sub = wide_df[symbol].dropna(how="all")
+        sub.columns.name = None
+
+        df = _normalize_frame(sub.copy())
+        if df is not None:
+            frames[symbol] = df
+
+    return frames
+
+
+def _download_chunks(symbols, download, chunk_size, **window):
+    """
+    Downloads symbols in chunks of one multi-ticker request each.
+    """
+
+    frames = {}
+
+    for start in range(0, len(symbols), chunk_size):
+        chunk = symbols[start:start + chunk_size]
+
+        try:
+            wide_df = download(
+                chunk,
+                interval="1d",
+                auto_adjust=False,
+                group_by="ticker",
+                progress=False,
+                threads=True,
+                **window
+            )
+        except Exception as e:
+            logger.warning(f"Bulk download failed for chunk starting {chunk[0]}: {e}")
+            count("errors.download")
+            continue
+
+        frames.update(split_bulk_frame(wide_df, chunk))
+
+    return frames
+
+
+@timed("fetch.bars")
+def load_bulk_daily_data(symbols, period="2y", chunk_size=50, download=None,
+                         use_cache=True, cache_dir=None):
+    """
+    Loads daily OHLCV data for many symbols with one request per chunk.
+
+    With use_cache, symbols already in the bar cache only download their
+    missing tail (grouped by last cached date so each request shares one
+    start date), unless they are current as of the last completed session;
+    the rest are downloaded in full and seeded into the cache.
+
+    Returns:
+        dict: symbol -> DataFrame (same columns as load_daily_data).
+              Symbols that failed to download are missing from the dict.
+    """
+
+    download = download or providers.get_provider().download
+    symbols = list(dict.fromkeys(symbols))
+
+    if not use_cache:
+        return _download_chunks(symbols, download, chunk_size, period=period)
+
+    index = bar_cache.load_index(cache_dir)
+    period_start = _period_start(period)
+
+    cached = {}
+    missing = []
+
+    for symbol in symbols:
+        df = None
+        if bar_cache.covers_period(symbol, period_start, index=index):
+            df = bar_cache.read_bars(symbol, cache_dir)
+
+        if df is None:
+            missing.append(symbol)
+        else:
+            cached[symbol] = df
+
+    count("cache.bars.hit", len(cached))
+    count("cache.bars.miss", len(missing))
+
+    frames = {}
+    as_of = get_calendar().last_completed_session()
+
+    # 1. Seed symbols that are not cached yet
+    fetched = _download_chunks(missing, download, chunk_size, period=period)
+    for symbol, df in fetched.items():
+        bar_cache.write_bars(symbol, df, since=period_start, cache_dir=cache_dir, index=index, as_of=as_of)
+        frames[symbol] = df
+
+    # Provider unreachable for uncached symbols: serve any partial cache
+    for symbol in missing:
+        if symbol not in frames:
+            df = bar_cache.read_bars(symbol, cache_dir)
+            if df is not None:
+                frames[symbol] = df
+
+    # 2. Append the missing tail for cached symbols; no request at all for
+    # those already current (e.g. a second run after the close)
+    by_last_date = {}
+    for symbol in cached:
+        if bar_cache.is_current(symbol, index=index):
+            count("cache.bars.current")
+            frames[symbol] = cached[symbol]
+            continue
+
+        last_date = bar_cache.last_cached_date(symbol, index=index)
+        by_last_date.setdefault(last_date.strftime("%Y-%m-%d"), []).append(symbol)
+
+    for last_date, group in sorted(by_last_date.items()):
+        tails = _download_chunks(group, download, chunk_size, start=last_date)
+
+        for symbol in group:
+            tail = tails.get(symbol)
+            df = bar_cache.append_bars(cached[symbol], tail)
+            if tail is not None:
+                bar_cache.write_bars(symbol, df, cache_dir=cache_dir, index=index, as_of=as_of)
+            frames[symbol] = df
+
+    bar_cache.save_index(index, cache_dir)
+
+    result = {}
+    for symbol in symbols:
+        df = _trim_to_period(frames.get(symbol), period)
+        if df is not None:
+            result[symbol] = df
+
+    return result